@@ -0,0 +1,180 @@
+"""Wheelchair accessibility coverage of expected polling places.
+
+Every current booth is given the great-circle distance to the nearest booth
+with full wheelchair access, by one KD-tree query against all "Full" booths in
+the country. Divisions are then ranked by the estimated voters
+(``OrdVoteEst`` + ``DecVoteEst``) at booths further than ``far_km`` from full
+access. The gazette only locates booths, so census collection district
+(``CCD``) coverage is aggregated from the booths in each district.
+"""
+
+import numpy as np
+import pandas as pd
+
+from polling_places.profiling import traced
+from polling_places.spatial import BoothTree, valid_coordinates
+
+# WheelchairAccess of booths counted as accessible
+ACCESSIBLE = "Full"
+
+# Voters at booths further than this from full access are flagged
+DEFAULT_FAR_KM = 5.0
+
+# Divisions with at least this share of voters far from access are flagged
+DEFAULT_FLAG_SHARE = 0.1
+
+# Coverage map colours: accessible booths, others within ``far_km``, the rest
+COVERAGE_COLOURS = {"accessible": "blue", "near": "grey", "far": "red"}
+
+
+@traced
+def nearest_accessible(df_expected: pd.DataFrame) -> pd.DataFrame:
+    """Return current booths with the distance to their nearest accessible booth.
+
+    Adds ``Voters``, ``AccessibleKm`` (0 for accessible booths, NaN without
+    coordinates or accessible booths) and the ``NearestAccessible`` premises
+    and its ``NearestAccessibleDivision``.
+    """
+    df = df_expected[df_expected["Status"] != "Abolition"].copy()
+    df["Voters"] = df["OrdVoteEst"] + df["DecVoteEst"]
+    located = valid_coordinates(df["Lat"], df["Long"])
+    accessible = df[located & (df["WheelchairAccess"] == ACCESSIBLE).to_numpy()]
+
+    df["AccessibleKm"] = np.nan
+    df["NearestAccessible"] = pd.Series(np.nan, index=df.index, dtype=object)
+    df["NearestAccessibleDivision"] = pd.Series(np.nan, index=df.index, dtype=object)
+    if accessible.empty:
+        return df
+
+    distance, index = BoothTree(accessible["Lat"], accessible["Long"]).nearest(
+        df.loc[located, "Lat"], df.loc[located, "Long"]
+    )
+    df.loc[located, "AccessibleKm"] = distance
+    df.loc[located, "NearestAccessible"] = accessible["PremisesName"].to_numpy()[index]
+    df.loc[located, "NearestAccessibleDivision"] = (
+        accessible["DivName"].astype(object).to_numpy()[index]
+    )
+    return df
+
+
+def division_coverage(
+    df_coverage: pd.DataFrame,
+    far_km: float = DEFAULT_FAR_KM,
+    flag_share: float = DEFAULT_FLAG_SHARE,
+) -> pd.DataFrame:
+    """Rank divisions by estimated voters at booths far from full access.
+
+    ``df_coverage`` comes from ``nearest_accessible``. Returns one row per
+    division with its booths, accessible booths, voters, voters further than
+    ``far_km`` and their share, the voter-weighted mean and the largest
+    distance, and ``Flagged`` when the share reaches ``flag_share``.
+    """
+    df = df_coverage[df_coverage["AccessibleKm"].notna()]
+    voters = df["Voters"].astype(float)
+    grouped = df.assign(
+        AccessibleBooths=(df["WheelchairAccess"] == ACCESSIBLE).to_numpy(),
+        VotersFar=voters.where(df["AccessibleKm"] > far_km, 0.0),
+        VoterKm=voters * df["AccessibleKm"],
+    ).groupby(["StateAb", "DivName"], observed=True)
+    report = grouped.agg(
+        Booths=("Voters", "size"),
+        AccessibleBooths=("AccessibleBooths", "sum"),
+        Voters=("Voters", "sum"),
+        VotersFar=("VotersFar", "sum"),
+        VoterKm=("VoterKm", "sum"),
+        MaxKm=("AccessibleKm", "max"),
+    )
+    report["ShareFar"] = report["VotersFar"] / report["Voters"].where(
+        report["Voters"] > 0
+    )
+    report["MeanKm"] = report.pop("VoterKm") / report["Voters"].where(
+        report["Voters"] > 0
+    )
+    report["Flagged"] = report["ShareFar"] >= flag_share
+    return report.sort_values(["VotersFar", "MaxKm"], ascending=False).reset_index()
+
+
+def ccd_coverage(df_coverage: pd.DataFrame) -> pd.DataFrame:
+    """Voters and voter-weighted distance to full access by census district."""
+    df = df_coverage[df_coverage["AccessibleKm"].notna()]
+    voters = df["Voters"].astype(float)
+    report = (
+        df.assign(VoterKm=voters * df["AccessibleKm"])
+        .groupby(["StateAb", "CCD"], observed=True)
+        .agg(
+            Booths=("Voters", "size"),
+            Voters=("Voters", "sum"),
+            VoterKm=("VoterKm", "sum"),
+            MaxKm=("AccessibleKm", "max"),
+        )
+    )
+    report["MeanKm"] = report.pop("VoterKm") / report["Voters"].where(
+        report["Voters"] > 0
+    )
+    return report.sort_values("MeanKm", ascending=False).reset_index()
+
+
+def coverage_colours(
+    df_coverage: pd.DataFrame, far_km: float = DEFAULT_FAR_KM
+) -> pd.Series:
+    """Colour each booth by whether it, or an accessible booth within ``far_km``, has access."""
+    colours = np.where(
+        df_coverage["WheelchairAccess"] == ACCESSIBLE,
+        COVERAGE_COLOURS["accessible"],
+        np.where(
+            df_coverage["AccessibleKm"] <= far_km,
+            COVERAGE_COLOURS["near"],
+            COVERAGE_COLOURS["far"],
+        ),
+    )
+    return pd.Series(colours, index=df_coverage.index)
+
+
+def coverage_legend_html(far_km: float = DEFAULT_FAR_KM) -> str:
+    """Return the legend of a coverage map."""
+    labels = {
+        "accessible": "Full Wheelchair Access",
+        "near": f"Full access within {far_km:g} km",
+        "far": f"No full access within {far_km:g} km",
+    }
+    rows = "".join(
+        f"""
+        <div style="display: flex; align-items: center;">
+            <div style="background:{COVERAGE_COLOURS[key]}; width: 15px; height: 15px; border-radius: 50%; margin-right: 5px;"></div>
+            {label}
+        </div>"""
+        for key, label in labels.items()
+    )
+    return f"""
+    <div style="position: fixed;
+                bottom: 40px; left: 40px; width: 250px; height: auto;
+                background-color: white; z-index:9999;
+                font-size:14px; padding: 10px;
+                border-radius: 8px; box-shadow: 2px 2px 5px rgba(0,0,0,0.3);">
+        <b>Accessibility Coverage</b><br>{rows}
+    </div>
+    """
+
+
+def create_coverage_map(
+    df_coverage: pd.DataFrame, name: str, far_km: float = DEFAULT_FAR_KM
+) -> None:
+    """Map booths coloured by coverage, with a toggleable layer per division."""
+    from polling_places.region_maps import create_region_map
+
+    notes = np.where(
+        df_coverage["AccessibleKm"] > 0,
+        "Nearest full access: "
+        + df_coverage["NearestAccessible"].fillna("").astype(str)
+        + " ("
+        + df_coverage["AccessibleKm"].round(1).astype(str)
+        + " km)",
+        "",
+    )
+    create_region_map(
+        df_coverage,
+        name,
+        colours=coverage_colours(df_coverage, far_km),
+        notes=pd.Series(notes, index=df_coverage.index),
+        legend_html=coverage_legend_html(far_km),
+    )
@@ -0,0 +1,234 @@
+"""Offline address-to-coordinate index built from AEC premises data.
+
+Premises addresses from the polling places download and the gazette are
+normalised into street words and house numbers and blocked by postcode and
+suburb, so a lookup only scores the handful of premises sharing its postcode or
+suburb. A premises numbered differently on the same street, including by a
+letter suffix ("260A" is not "260"), is another building and never matches.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import pandas as pd
+
+from polling_places.geocode import Coordinates, GeocodeProvider
+
+# Street-type and common words mapped to the abbreviations the AEC uses
+ABBREVIATIONS: Dict[str, str] = {
+    "street": "st",
+    "road": "rd",
+    "avenue": "ave",
+    "av": "ave",
+    "drive": "dr",
+    "parade": "pde",
+    "place": "pl",
+    "crescent": "cres",
+    "court": "ct",
+    "circuit": "cct",
+    "highway": "hwy",
+    "terrace": "tce",
+    "boulevard": "bvd",
+    "boulevarde": "bvd",
+    "lane": "ln",
+    "close": "cl",
+    "corner": "cnr",
+    "centre": "ctr",
+    "center": "ctr",
+    "shopping": "shop",
+    "mount": "mt",
+    "parkway": "pkwy",
+    "square": "sq",
+    # Plurals of corner addresses ("Cnr Macquarie & Main Rds")
+    "sts": "st",
+    "rds": "rd",
+    "aves": "ave",
+    "drs": "dr",
+}
+
+STOPWORDS = frozenset({"and", "the", "of", "cnr", "nsw", "vic", "qld", "sa", "wa"})
+STOPWORDS |= frozenset({"tas", "act", "nt"})
+
+# Longest house number range expanded, so "1 - 2000" is not every number
+MAX_RANGE = 200
+
+# Lookups scoring below this are left to the next provider
+DEFAULT_MIN_CONFIDENCE = 0.85
+
+POSTCODE = re.compile(r"\b(\d{4})\s*$")
+
+# House numbers and ranges with their suffixes ("24", "260A", "80 - 98", "24–26"),
+# but not shop, level, suite, unit or lot numbers or ordinals ("1st")
+HOUSE_NUMBER = re.compile(
+    r"(?<!shop )(?<!level )(?<!suite )(?<!unit )(?<!lot )(?<![a-z0-9])"
+    r"(\d+)([a-z]?)(?:\s*[-–]\s*(\d+)([a-z]?))?(?![a-z0-9])"
+)
+
+
+def address_tokens(text: str) -> FrozenSet[str]:
+    """Return the normalised words of an address fragment, without numbers."""
+    words = re.findall(r"[a-z0-9]+", text.lower().replace("'", ""))
+    return frozenset(
+        ABBREVIATIONS.get(word, word)
+        for word in words
+        if word not in STOPWORDS and not word[0].isdigit()
+    )
+
+
+def house_numbers(text: str) -> FrozenSet[str]:
+    """Return every house number of a street address, expanding ranges.
+
+    Numbers keep their suffix, so "260A" is ``{"260a"}`` and "2A - 6" is
+    ``{"2a", "3", "4", "5", "6"}``.
+    """
+    numbers = set()
+    for first, first_suffix, last, last_suffix in HOUSE_NUMBER.findall(text.lower()):
+        numbers.add(first + first_suffix)
+        if not last or int(last) < int(first) or int(last) - int(first) > MAX_RANGE:
+            continue
+        numbers.update(str(number) for number in range(int(first) + 1, int(last)))
+        numbers.add(last + last_suffix)
+    return frozenset(numbers)
+
+
+def street_line(street: str) -> str:
+    """Drop building or centre names before the numbered or corner part of a street.
+
+    "Moil Primary School, 37 Lanyon Tce" becomes "37 Lanyon Tce", so the name
+    does not dilute the street words; streets with neither are kept whole.
+    """
+    parts = street.split(",")
+    for i, part in enumerate(parts):
+        if house_numbers(part) or re.match(r"\s*(cnr|corner)\b", part.lower()):
+            return ",".join(parts[i:])
+    return street
+
+
+def split_address(address: str) -> Tuple[str, str, Optional[str]]:
+    """Split a free-text address into (street, suburb, postcode)."""
+    address = address.strip()
+    match = POSTCODE.search(address)
+    postcode = match.group(1) if match else None
+    if match:
+        address = address[: match.start()]
+    parts = [part.strip() for part in address.split(",") if part.strip()]
+    if parts and address_tokens(parts[-1]) <= STOPWORDS:
+        parts = parts[:-1]  # trailing state abbreviation
+    if len(parts) < 2:
+        return ", ".join(parts), "", postcode
+    return ", ".join(parts[:-1]), parts[-1], postcode
+
+
+class LocalAddressIndex(GeocodeProvider):
+    """Street index of known premises addresses with postcode/suburb blocking."""
+
+    name = "local"
+
+    def __init__(
+        self,
+        streets: List[FrozenSet[str]],
+        numbers: List[FrozenSet[str]],
+        suburbs: List[FrozenSet[str]],
+        postcodes: List[str],
+        coordinates: List[Coordinates],
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    ) -> None:
+        self.streets = streets
+        self.numbers = numbers
+        self.suburbs = suburbs
+        self.coordinates = coordinates
+        self.min_confidence = min_confidence
+        self.by_postcode: Dict[str, List[int]] = defaultdict(list)
+        self.by_suburb: Dict[FrozenSet[str], List[int]] = defaultdict(list)
+        for i, (suburb, postcode) in enumerate(zip(suburbs, postcodes)):
+            self.by_postcode[postcode].append(i)
+            self.by_suburb[suburb].append(i)
+
+    @classmethod
+    def from_frames(
+        cls,
+        df_last_polling_places: Optional[pd.DataFrame] = None,
+        df_expected: Optional[pd.DataFrame] = None,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+    ) -> "LocalAddressIndex":
+        """Build the index from AEC polling places and/or gazette frames."""
+        frames = []
+        if df_last_polling_places is not None:
+            frames.append(
+                df_last_polling_places.rename(
+                    columns={
+                        "PremisesAddress1": "Address1",
+                        "PremisesAddress2": "Address2",
+                        "PremisesAddress3": "Address3",
+                        "PremisesSuburb": "Locality",
+                        "PremisesPostCode": "Postcode",
+                        "Latitude": "Lat",
+                        "Longitude": "Long",
+                    }
+                )
+            )
+        if df_expected is not None:
+            frames.append(df_expected)
+
+        columns = ["Address1", "Address2", "Address3", "Locality", "Postcode"]
+        df = pd.concat([frame[columns + ["Lat", "Long"]] for frame in frames])
+        df = df.dropna(subset=["Lat", "Long", "Address1"])
+        df = df[(df["Lat"] != 0) & (df["Long"] != 0)]
+        # Postcodes are read as numbers, so NT "0800" arrives as 800.0
+        postcodes = pd.to_numeric(df["Postcode"], errors="coerce").astype("Int64")
+        df["Postcode"] = postcodes.astype(str).str.zfill(4).where(postcodes.notna(), "")
+        df["Street"] = (
+            df[["Address1", "Address2", "Address3"]].fillna("").agg(", ".join, axis=1)
+        )
+        df = df.drop_duplicates(subset=["Street", "Locality", "Postcode"])
+
+        return cls(
+            streets=[address_tokens(street_line(street)) for street in df["Street"]],
+            numbers=[house_numbers(street) for street in df["Street"]],
+            suburbs=[address_tokens(str(locality)) for locality in df["Locality"]],
+            postcodes=list(df["Postcode"]),
+            coordinates=list(zip(df["Lat"].astype(float), df["Long"].astype(float))),
+            min_confidence=min_confidence,
+        )
+
+    def lookup(self, address: str) -> Optional[Tuple[Coordinates, float]]:
+        """Return the best matching coordinates and a confidence in [0, 1].
+
+        Candidates numbered differently from the address are skipped. Confidence
+        is the Jaccard similarity of street words, weighted 0.6, plus 0.2 when
+        the suburb also matches and 0.2 when a house number does or neither is
+        numbered (corners), so a number on only one side is unconfirmed. Addresses
+        with no candidate sharing their postcode or suburb return None.
+        """
+        street, suburb, postcode = split_address(address)
+        street_tokens = address_tokens(street_line(street))
+        numbers = house_numbers(street)
+        suburb_tokens = address_tokens(suburb)
+        candidates = set(self.by_postcode.get(postcode, ()))
+        candidates.update(self.by_suburb.get(suburb_tokens, ()))
+        if not candidates or not street_tokens:
+            return None
+
+        best_score, best = 0.0, -1
+        for i in sorted(candidates):
+            if numbers and self.numbers[i] and not numbers & self.numbers[i]:
+                continue
+            tokens = self.streets[i]
+            score = 0.6 * len(street_tokens & tokens) / len(street_tokens | tokens)
+            if suburb_tokens and suburb_tokens == self.suburbs[i]:
+                score += 0.2
+            if numbers & self.numbers[i] or not (numbers or self.numbers[i]):
+                score += 0.2
+            if score > best_score:
+                best_score, best = score, i
+        if best < 0:
+            return None
+        return self.coordinates[best], best_score
+
+    def geocode(self, address: str) -> Optional[Coordinates]:
+        """Return coordinates when the best match reaches ``min_confidence``."""
+        match = self.lookup(address)
+        if match is None or match[1] < self.min_confidence:
+            return None
+        return match[0]
@@ -0,0 +1,473 @@
+"""Stage-by-stage benchmarks of the map pipeline, on bundled or synthetic data.
+
+Each stage of a division run is timed separately: parsing each source, cached
+loads, streaming votes, neighbours, premises matching and the whole of
+``load_sources``, then per division the whole of ``prepare_division`` (with
+projection) and each map task it returns. The steps within
+``prepare_division`` (filter, party mapping, pivot, merge, vote transfer, queue
+simulation and projection) are taken from its traced spans. Results are written
+as JSON so runs can be compared::
+
+    python -m polling_places.benchmark generate /tmp/synthetic-10 --scale 10
+    python -m polling_places.benchmark run /tmp/synthetic-10 -o before.json
+    python -m polling_places.benchmark compare before.json after.json
+
+``startup`` times the command line entry point itself: each data-only command
+is run in a fresh interpreter and should not import the rendering libraries.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from polling_places import polling_places as pp
+from polling_places import profiling
+from polling_places.matching import match_premises
+from polling_places.spatial import neighbouring_divisions
+from polling_places.synthetic import generate_dataset
+
+# Stages in report order
+STAGES = [
+    "parse_expected",
+    "parse_last_polling_places",
+    "parse_votes",
+    "load_cached",
+    "stream_votes",
+    "neighbours",
+    "match_premises",
+    "load_sources",
+    "prepare",
+    "filter",
+    "party_mapping",
+    "pivot",
+    "merge",
+    "transfer",
+    "queues",
+    "projection",
+    "render_markers",
+    "render_primary_vote",
+    "render_pre_polling",
+    "render_projected_vote",
+]
+
+# Stages within prepare_division, by the name of their traced span
+PREPARE_SPANS = {
+    "filter_division": "filter",
+    "party_colours": "party_mapping",
+    "party_votes_table": "pivot",
+    "merge_party_votes": "merge",
+    "transfer_votes": "transfer",
+    "simulate_queues": "queues",
+    "project_votes": "projection",
+}
+
+# Dataset sizes for the suite, relative to the bundled data
+SCALES = [1, 10, 100]
+
+DEFAULT_DIVISIONS = 5
+
+# Command line invocations timed by the startup benchmark
+STARTUP_COMMANDS = {
+    "help": ["--help"],
+    "load": ["load"],
+    "analyse": ["analyse"],
+    "render": ["render"],
+}
+
+# Modules only the render command should import
+RENDER_MODULES = ["folium", "branca", "matplotlib"]
+
+
+def find_sources(directory: pathlib.Path) -> Dict[str, pathlib.Path]:
+    """Return the latest gazette snapshot and the polling places file in a directory."""
+    gazettes = sorted(directory.glob("prdelms.gaz.statics.*.csv"))
+    last = sorted(directory.glob("GeneralPollingPlacesDownload-*.csv"))
+    if not gazettes or not last:
+        raise FileNotFoundError(f"No gazette or polling places file in {directory}")
+    return {"expected": gazettes[-1], "last_polling_places": last[-1]}
+
+
+@contextlib.contextmanager
+def _quiet_in(directory: str) -> Iterator[None]:
+    """Run with ``directory`` as the working directory and stdout discarded."""
+    previous = os.getcwd()
+    os.chdir(directory)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        os.chdir(previous)
+
+
+def _timed(times: Dict[str, List[float]], stage: str, fn: Callable, *args):
+    """Call ``fn(*args)``, adding its wall time to ``times[stage]``."""
+    start = time.perf_counter()
+    result = fn(*args)
+    times.setdefault(stage, []).append(time.perf_counter() - start)
+    return result
+
+
+def choose_divisions(
+    df_expected: pd.DataFrame, votes: pp.VotesRegistry, count: int
+) -> List[str]:
+    """Return ``count`` divisions spread through the alphabet, all with votes files."""
+    df = df_expected[df_expected["Status"] != "Abolition"]
+    states = dict(zip(df["DivName"], df["StateAb"]))
+    divisions = sorted(d for d, state in states.items() if state in votes)
+    if len(divisions) <= count:
+        return divisions
+    return [divisions[i] for i in np.linspace(0, len(divisions) - 1, count).astype(int)]
+
+
+def _timed_prepare(
+    times: Dict[str, List[float]], division: str, sources: pp.Sources
+) -> List[tuple]:
+    """Time ``prepare_division`` with projection, and its steps from their spans."""
+    enabled = profiling.is_enabled()
+    if not enabled:
+        profiling.enable(memory=False)
+    start = len(profiling.records())
+    try:
+        tasks = _timed(
+            times, "prepare", pp.prepare_division, division, sources, "svg", True
+        )
+    finally:
+        if not enabled:
+            profiling.disable()
+    for record in profiling.records()[start:]:
+        stage = PREPARE_SPANS.get(record["name"])
+        if stage:
+            times.setdefault(stage, []).append(record["wall_s"])
+    return tasks
+
+
+def run_once(
+    files: Dict[str, pathlib.Path],
+    votes: pp.VotesRegistry,
+    divisions: List[str],
+    times: Dict[str, List[float]],
+    errors: Dict[str, int],
+) -> None:
+    """Run every stage once, appending each stage's time to ``times``.
+
+    Per-division stages are summed over ``divisions``. Render failures are
+    counted in ``errors`` rather than stopping the run.
+    """
+    _timed(
+        times, "parse_expected", pp._parse_expected_polling_places, files["expected"]
+    )
+    _timed(
+        times,
+        "parse_last_polling_places",
+        pp._parse_last_polling_places,
+        files["last_polling_places"],
+    )
+    _timed(
+        times,
+        "parse_votes",
+        lambda: [pp.parse_votes(path) for path in votes.files.values()],
+    )
+
+    def load_cached():
+        df_expected = pp.read_expected_polling_places(files["expected"])
+        df_last = pp.read_last_polling_places(files["last_polling_places"])
+        for path in votes.files.values():
+            pp.read_votes(path)
+        return df_expected, df_last
+
+    df_expected, df_last = _timed(times, "load_cached", load_cached)
+    df_expected = df_expected[df_expected["Status"] != "Abolition"]
+
+    wanted = df_last.loc[df_last["DivisionNm"].isin(divisions)]
+    _timed(
+        times,
+        "stream_votes",
+        lambda: [
+            votes.stream(state, wanted["PollingPlaceID"])
+            for state in wanted["State"].unique()
+            if state in votes
+        ],
+    )
+    neighbours = _timed(
+        times, "neighbours", neighbouring_divisions, df_last, df_expected
+    )
+    _timed(
+        times,
+        "match_premises",
+        lambda: match_premises(
+            df_expected,
+            df_last[~df_last["PollingPlaceNm"].str.contains("PP")],
+            divisions=neighbours,
+        ),
+    )
+    sources = _timed(
+        times,
+        "load_sources",
+        lambda: pp.load_sources(
+            divisions,
+            expected_polling_places_file=files["expected"],
+            last_polling_places_file=files["last_polling_places"],
+            votes=votes,
+        ),
+    )
+
+    division_times: Dict[str, List[float]] = {}
+    with tempfile.TemporaryDirectory() as output, _quiet_in(output):
+        for division in divisions:
+            tasks = _timed_prepare(division_times, division, sources)
+            for name, render, args in tasks:
+                stage = f"render_{name}"
+                error = _timed(division_times, stage, pp._run_task, render, args)
+                if error:
+                    errors[stage] = errors.get(stage, 0) + 1
+
+    for stage, values in division_times.items():
+        times.setdefault(stage, []).append(sum(values))
+
+
+def summarise(values: List[float]) -> Dict[str, object]:
+    """Return the min, median and mean of a stage's times, and the times."""
+    return {
+        "min": min(values),
+        "median": statistics.median(values),
+        "mean": statistics.fmean(values),
+        "runs": values,
+    }
+
+
+def run_benchmarks(
+    directory: str,
+    divisions: Optional[List[str]] = None,
+    count: int = DEFAULT_DIVISIONS,
+    repeat: int = 3,
+) -> Dict[str, object]:
+    """Benchmark every stage on the data in ``directory`` and return the results.
+
+    ``divisions`` defaults to ``count`` divisions with votes files. The first,
+    untimed pass warms the on-disk cache so ``load_cached`` measures cache hits.
+    """
+    directory = pathlib.Path(directory)
+    files = find_sources(directory)
+    votes = pp.VotesRegistry.from_directory(directory)
+    df_expected = pp.read_expected_polling_places(files["expected"])
+    divisions = divisions or choose_divisions(df_expected, votes, count)
+
+    run_once(files, votes, divisions, {}, {})
+    times: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for _ in range(repeat):
+        # Fresh registry each run, so votes are loaded rather than memoised
+        run_once(files, pp.VotesRegistry(votes.files), divisions, times, errors)
+
+    manifest = directory / "synthetic.json"
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "directory": str(directory.resolve()),
+            "synthetic": json.loads(manifest.read_text())
+            if manifest.exists()
+            else None,
+            "rows": {
+                "expected": len(df_expected),
+                "last_polling_places": len(
+                    pp.read_last_polling_places(files["last_polling_places"])
+                ),
+                "votes": sum(len(pp.read_votes(p)) for p in votes.files.values()),
+            },
+            "divisions": divisions,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "stages": {
+            stage: summarise(times[stage]) for stage in STAGES if stage in times
+        },
+        "errors": errors,
+    }
+
+
+def _imports(stderr: str) -> Dict[str, float]:
+    """Return the cumulative import time in seconds of each top-level module."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not name.startswith("  ") and cumulative.strip().isdigit():
+            imports[name.strip()] = int(cumulative) / 1e6
+    return imports
+
+
+def run_startup(
+    directory: str, divisions: Optional[List[str]] = None, repeat: int = 5
+) -> pd.DataFrame:
+    """Time each command line command in a fresh interpreter on ``directory``.
+
+    ``divisions`` default to the first in the gazette. Reports the median wall
+    time, the time spent importing modules and whether any of
+    ``RENDER_MODULES`` were imported. A first untimed run warms the cache.
+    """
+    directory = pathlib.Path(directory).resolve()
+    files = find_sources(directory)
+    divisions = divisions or choose_divisions(
+        pp.read_expected_polling_places(files["expected"]),
+        pp.VotesRegistry.from_directory(directory),
+        1,
+    )
+    paths = [
+        "--data-dir",
+        str(directory),
+        "--expected",
+        str(files["expected"]),
+        "--last",
+        str(files["last_polling_places"]),
+    ]
+    # The package's parent directory, for when it is run without being installed
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(pathlib.Path(__file__).parents[1]), env.get("PYTHONPATH")])
+    )
+    rows = []
+    with tempfile.TemporaryDirectory() as output:
+        for command, args in STARTUP_COMMANDS.items():
+            if args[0] in ("analyse", "render"):
+                args = args + divisions
+            if args[0] != "--help":
+                args = args + paths
+            argv = [sys.executable, "-X", "importtime", "-m", "polling_places.cli"]
+            times = []
+            for i in range(repeat + 1):
+                start = time.perf_counter()
+                process = subprocess.run(
+                    argv + args, cwd=output, env=env, capture_output=True, text=True
+                )
+                if i:
+                    times.append(time.perf_counter() - start)
+                if process.returncode:
+                    raise RuntimeError(f"{command} failed:\n{process.stderr}")
+            imports = _imports(process.stderr)
+            rows.append(
+                {
+                    "command": command,
+                    "median_s": statistics.median(times),
+                    "import_s": sum(imports.values()),
+                    "render_imports": ", ".join(
+                        m for m in RENDER_MODULES if m in imports
+                    ),
+                }
+            )
+    return pd.DataFrame(rows).set_index("command")
+
+
+def compare_results(old: Dict, new: Dict) -> pd.DataFrame:
+    """Compare the median stage times of two result files (ratio < 1 is faster)."""
+    stages = [s for s in STAGES if s in old["stages"] and s in new["stages"]]
+    df = pd.DataFrame(
+        {
+            "old_median_s": [old["stages"][s]["median"] for s in stages],
+            "new_median_s": [new["stages"][s]["median"] for s in stages],
+        },
+        index=pd.Index(stages, name="stage"),
+    )
+    df["ratio"] = df["new_median_s"] / df["old_median_s"]
+    return df
+
+
+def _write(results: Dict, output: Optional[str]) -> None:
+    df = pd.DataFrame(
+        {
+            stage: {"median_s": r["median"], "min_s": r["min"]}
+            for stage, r in results["stages"].items()
+        }
+    ).T
+    print(df.round(4).to_string())
+    if results["errors"]:
+        print(f"Render failures: {results['errors']}")
+    if output:
+        pathlib.Path(output).parent.mkdir(parents=True, exist_ok=True)
+        pathlib.Path(output).write_text(json.dumps(results, indent=2))
+        print(f"Results written to {output}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the map pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Write a synthetic dataset.")
+    generate.add_argument("directory")
+    generate.add_argument("--scale", type=float, default=1.0)
+    generate.add_argument("--seed", type=int, default=0)
+
+    run = commands.add_parser("run", help="Benchmark the data in a directory.")
+    run.add_argument("directory")
+    run.add_argument("-d", "--division", action="append", dest="divisions")
+    run.add_argument("-n", "--count", type=int, default=DEFAULT_DIVISIONS)
+    run.add_argument("-r", "--repeat", type=int, default=3)
+    run.add_argument("-o", "--output", help="Write the JSON results here.")
+
+    suite = commands.add_parser(
+        "suite", help="Generate and benchmark synthetic data at several scales."
+    )
+    suite.add_argument("directory", help="Where the datasets are generated.")
+    suite.add_argument("--scales", type=float, nargs="+", default=SCALES)
+    suite.add_argument("-r", "--repeat", type=int, default=3)
+    suite.add_argument("-o", "--output", default="benchmarks")
+
+    startup = commands.add_parser(
+        "startup", help="Time the command line entry point's commands."
+    )
+    startup.add_argument("directory")
+    startup.add_argument("-d", "--division", action="append", dest="divisions")
+    startup.add_argument("-r", "--repeat", type=int, default=5)
+
+    compare = commands.add_parser("compare", help="Compare two JSON results.")
+    compare.add_argument("old")
+    compare.add_argument("new")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        generate_dataset(args.directory, args.scale, args.seed)
+    elif args.command == "run":
+        _write(
+            run_benchmarks(args.directory, args.divisions, args.count, args.repeat),
+            args.output,
+        )
+    elif args.command == "suite":
+        for scale in args.scales:
+            directory = pathlib.Path(args.directory) / f"scale-{scale:g}"
+            generate_dataset(directory, scale)
+            print(f"Scale {scale:g}x:")
+            _write(
+                run_benchmarks(directory, repeat=args.repeat),
+                pathlib.Path(args.output) / f"benchmark-{scale:g}x.json",
+            )
+    elif args.command == "startup":
+        print(
+            run_startup(args.directory, args.divisions, args.repeat)
+            .round(3)
+            .to_string()
+        )
+    else:
+        old = json.loads(pathlib.Path(args.old).read_text())
+        new = json.loads(pathlib.Path(args.new).read_text())
+        print(compare_results(old, new).round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Persistent on-disk cache for parsed AEC and gazette CSV files.
+
+Parsed frames are written next to their source in a ``.cache`` directory as
+pandas pickles, which store each column block as a raw NumPy array. A cached
+frame is reused while the source file keeps the same size and mtime; if either
+changes the file is re-hashed and only re-parsed when its content differs.
+Entries are written atomically, and entries of older parser versions are
+removed when a new one is written. Where the cache cannot be written (a
+read-only data directory) sources are parsed every time.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+from typing import Callable, Dict, Optional, Union
+
+import pandas as pd
+
+# Bump when a parser changes shape so stale caches are not reused.
+CACHE_VERSION = 3
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+
+def file_digest(file_path: PathLike, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_paths(
+    file_path: PathLike, name: str, cache_dir: Optional[PathLike] = None
+) -> Dict[str, pathlib.Path]:
+    """Return the data and metadata paths caching ``file_path`` under ``name``."""
+    source = pathlib.Path(file_path).resolve()
+    directory = pathlib.Path(cache_dir) if cache_dir else source.parent / ".cache"
+    key = hashlib.sha1(f"{source}|{name}|{CACHE_VERSION}".encode()).hexdigest()[:16]
+    stem = f"{source.stem}.{name}.{key}"
+    return {
+        "data": directory / f"{stem}.pkl",
+        "meta": directory / f"{stem}.json",
+    }
+
+
+def _write_atomic(path: pathlib.Path, write: Callable[[str], None]) -> None:
+    """Call ``write`` on a temporary file next to ``path``, then move it there."""
+    fd, temp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    os.close(fd)
+    try:
+        write(temp)
+        os.replace(temp, path)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def _write_text(path: pathlib.Path, text: str) -> None:
+    def write(temp: str) -> None:
+        with open(temp, "w") as f:
+            f.write(text)
+
+    _write_atomic(path, write)
+
+
+def _remove_stale(paths: Dict[str, pathlib.Path], source: str) -> None:
+    """Remove other cache entries of the same source and parser name."""
+    stem = paths["data"].stem.rsplit(".", 1)[0]
+    for meta_path in paths["meta"].parent.glob(f"{stem}.*.json"):
+        if meta_path == paths["meta"]:
+            continue
+        try:
+            if json.loads(meta_path.read_text()).get("source") != source:
+                continue
+        except ValueError:
+            continue
+        meta_path.with_suffix(".pkl").unlink(missing_ok=True)
+        meta_path.unlink(missing_ok=True)
+
+
+def cached_frame(
+    file_path: PathLike,
+    parse: Callable[[PathLike], pd.DataFrame],
+    name: str,
+    cache_dir: Optional[PathLike] = None,
+) -> pd.DataFrame:
+    """Return ``parse(file_path)``, reusing a cached copy when the source is unchanged.
+
+    The cache entry is keyed by the resolved source path and ``name`` (which
+    identifies the parser), and validated against the source size, mtime and
+    SHA-256 content hash. If the cache cannot be written the parsed frame is
+    still returned.
+    """
+    stat = os.stat(file_path)
+    paths = cache_paths(file_path, name, cache_dir)
+
+    meta = None
+    if paths["meta"].exists() and paths["data"].exists():
+        try:
+            meta = json.loads(paths["meta"].read_text())
+        except ValueError:
+            meta = None
+
+    if meta is not None:
+        if meta["size"] == stat.st_size and meta["mtime_ns"] == stat.st_mtime_ns:
+            return pd.read_pickle(paths["data"])
+        if meta["size"] == stat.st_size:
+            # Touched but possibly unchanged: fall back to the content hash.
+            sha256 = file_digest(file_path)
+            if meta["sha256"] == sha256:
+                meta["mtime_ns"] = stat.st_mtime_ns
+                try:
+                    _write_text(paths["meta"], json.dumps(meta))
+                except OSError:
+                    pass
+                return pd.read_pickle(paths["data"])
+
+    df = parse(file_path)
+    source = str(pathlib.Path(file_path).resolve())
+    try:
+        paths["data"].parent.mkdir(parents=True, exist_ok=True)
+        # Data before metadata, so a metadata file always has its data
+        _write_atomic(paths["data"], df.to_pickle)
+        _write_text(
+            paths["meta"],
+            json.dumps(
+                {
+                    "source": source,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha256": file_digest(file_path),
+                }
+            ),
+        )
+        _remove_stale(paths, source)
+    except OSError as e:
+        print(f"Not caching {pathlib.Path(file_path).name}: {e}")
+    return df
+
+
+def clear_cache(file_path: PathLike, cache_dir: Optional[PathLike] = None) -> int:
+    """Remove every cache entry for ``file_path`` and return how many were removed."""
+    source = pathlib.Path(file_path).resolve()
+    directory = pathlib.Path(cache_dir) if cache_dir else source.parent / ".cache"
+    removed = 0
+    for path in directory.glob(f"{source.stem}.*"):
+        path.unlink()
+        removed += 1
+    return removed
@@ -0,0 +1,722 @@
+"""Command line entry point: ``polling-places <command>``, one of ``load``,
+``memory``, ``analyse``, ``prepoll``, ``project``, ``access``, ``queues``,
+``render``, ``regions``, ``snapshots``, ``feed`` and ``serve``.
+
+Modules are imported inside each command, and rendering libraries (folium,
+branca) only when maps are built, so ``load`` and ``analyse`` start without
+them::
+
+    polling-places load --data-dir data
+    polling-places memory NSW --data-dir data
+    polling-places analyse Sydney Wentworth --data-dir data
+    polling-places prepoll NSW -o nsw-prepoll.csv --data-dir data
+    polling-places project NSW -o nsw-projection.csv --data-dir data
+    polling-places access --map access.html --data-dir data
+    polling-places queues NSW -o nsw-queues.csv --data-dir data
+    polling-places render Sydney -j 4 --data-dir data
+    polling-places regions NSW AUS --data-dir data
+    polling-places snapshots gazettes/
+    polling-places snapshots old.csv new.csv --render --data-dir data
+    polling-places feed --all --watch incoming --data-dir data
+    polling-places serve --port 8000 --data-dir data
+"""
+
+import argparse
+from typing import List, Optional
+
+# Divisions built when none are given
+DEFAULT_DIVISIONS = ["Sydney", "Wentworth", "Bennelong", "Moreton", "Ryan"]
+
+
+def _configure(args: argparse.Namespace) -> None:
+    from polling_places.polling_places import configure
+
+    configure(args.data_dir, args.expected, args.last, args.votes_dir)
+
+
+def _divisions(args: argparse.Namespace) -> List[str]:
+    from polling_places.polling_places import all_divisions
+
+    return all_divisions() if args.all else args.divisions or DEFAULT_DIVISIONS
+
+
+def load(args: argparse.Namespace) -> None:
+    """Read every source into the on-disk cache and report its size."""
+    from polling_places.polling_places import (
+        CONFIG,
+        VotesRegistry,
+        read_expected_polling_places,
+        read_last_polling_places,
+    )
+    from polling_places.schema import memory_report
+
+    votes = VotesRegistry.from_directory(CONFIG["votes_dir"])
+    states = args.states or sorted(votes.files)
+    if args.clear_cache:
+        from polling_places.cache import clear_cache
+
+        files = [
+            CONFIG["expected_polling_places_file"],
+            CONFIG["last_polling_places_file"],
+            *(votes.files[state] for state in states if state in votes),
+        ]
+        removed = sum(clear_cache(file_path) for file_path in files)
+        print(f"Removed {removed} cache files.")
+    frames = {
+        "expected": read_expected_polling_places(
+            CONFIG["expected_polling_places_file"]
+        ),
+        "last_polling_places": read_last_polling_places(
+            CONFIG["last_polling_places_file"]
+        ),
+    }
+    for state in states:
+        if state not in votes:
+            print(f"No votes file found for {state}.")
+            continue
+        frames[f"votes_{state}"] = votes.read(state)
+    print(memory_report(frames).round(2).to_string())
+
+
+def memory(args: argparse.Namespace) -> None:
+    """Compare the memory of each source read untyped and with its schema."""
+    import pandas as pd
+
+    from polling_places.polling_places import (
+        CONFIG,
+        VotesRegistry,
+        read_expected_polling_places,
+        read_last_polling_places,
+        read_votes,
+    )
+    from polling_places.schema import memory_report
+
+    votes = VotesRegistry.from_directory(CONFIG["votes_dir"])
+    sources = {
+        "expected": (
+            CONFIG["expected_polling_places_file"],
+            0,
+            read_expected_polling_places,
+        ),
+        "last_polling_places": (
+            CONFIG["last_polling_places_file"],
+            1,
+            read_last_polling_places,
+        ),
+    }
+    for state in args.states or sorted(votes.files):
+        if state not in votes:
+            print(f"No votes file found for {state}.")
+            continue
+        sources[f"votes_{state}"] = (votes.files[state], 1, read_votes)
+    default = memory_report(
+        {
+            name: pd.read_csv(file_path, skiprows=skiprows)
+            for name, (file_path, skiprows, _) in sources.items()
+        }
+    )
+    typed = memory_report(
+        {name: read(file_path) for name, (file_path, _, read) in sources.items()}
+    )
+    report = default[["rows", "columns"]].assign(
+        default_mb=default["memory_mb"],
+        typed_mb=typed["memory_mb"],
+        reduction=default["memory_mb"] / typed["memory_mb"],
+    )
+    print(report.round(2).to_string())
+
+
+def analyse(args: argparse.Namespace) -> None:
+    """Print each division's last-election primary votes at the booths it keeps."""
+    import pandas as pd
+
+    from polling_places.polling_places import (
+        filter_division,
+        load_sources,
+        party_colours,
+        party_votes_table,
+    )
+
+    divisions = _divisions(args)
+    sources = load_sources(divisions, stream=args.stream)
+    rows = []
+    for division in divisions:
+        frames = filter_division(division, sources)
+        Party_to_colour = party_colours(frames.votes["PartyNm"].unique())
+        for voting, df_votes in (
+            ("Polling day", frames.votes),
+            ("Pre-poll", frames.votes_prepolling),
+        ):
+            totals = party_votes_table(df_votes, Party_to_colour).sum()
+            for party, votes in totals.items():
+                rows.append(
+                    {
+                        "Division": division,
+                        "Voting": voting,
+                        "Party": party,
+                        "Votes": votes,
+                        "Share": votes / totals.sum() if totals.sum() else 0.0,
+                    }
+                )
+    df = pd.DataFrame(rows, columns=["Division", "Voting", "Party", "Votes", "Share"])
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"Analysis written to {args.output}")
+    else:
+        print(df.round({"Share": 3}).to_string(index=False))
+
+
+def prepoll(args: argparse.Namespace) -> None:
+    """Break down home and absentee votes at each pre-poll centre of some states."""
+    import pandas as pd
+
+    from polling_places.polling_places import (
+        CONFIG,
+        VotesRegistry,
+        read_last_polling_places,
+    )
+    from polling_places.prepoll import premises_votes, prepoll_centres
+
+    df_last = read_last_polling_places(CONFIG["last_polling_places_file"])
+    votes = VotesRegistry.from_directory(CONFIG["votes_dir"])
+    frames = []
+    for state in args.states or sorted(votes.files):
+        if state not in votes:
+            print(f"No votes file found for {state}.")
+            continue
+        premises = args.premises or prepoll_centres(df_last, state)
+        frames.append(premises_votes(votes.read(state), df_last, premises))
+    if not frames:
+        return
+    df = pd.concat(frames, ignore_index=True)
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"Breakdown written to {args.output}")
+    else:
+        print(
+            df.pivot_table(
+                index=["PremisesNm", "HomeDivision"],
+                columns=["Voting", "Voters"],
+                values="Votes",
+                aggfunc="sum",
+                fill_value=0,
+            ).to_string()
+        )
+
+
+def project(args: argparse.Namespace) -> None:
+    """Project votes at every current booth of a state, as a table or a map."""
+    from polling_places.projection import project_state, projection_table
+
+    df, Party_to_colour = project_state(
+        args.state, swing_carry=args.swing_carry, z=args.z
+    )
+    if args.map:
+        from polling_places.polling_places import create_map_with_pie_charts
+
+        create_map_with_pie_charts(
+            df, Party_to_colour, args.map, pie_mode="client", label="Projected"
+        )
+    df_table = projection_table(df, Party_to_colour)
+    if args.output:
+        df_table.to_csv(args.output, index=False)
+        print(f"Projection written to {args.output}")
+    elif not args.map:
+        print(
+            df_table.groupby(["DivName", "Party"], sort=False)[
+                ["Projected", "Low", "High"]
+            ]
+            .sum()
+            .to_string()
+        )
+
+
+def access(args: argparse.Namespace) -> None:
+    """Rank divisions by voters far from booths with full wheelchair access."""
+    from polling_places.accessibility import (
+        ccd_coverage,
+        create_coverage_map,
+        division_coverage,
+        nearest_accessible,
+    )
+    from polling_places.polling_places import CONFIG, read_expected_polling_places
+
+    # Searched nationally, so booths near a border may be served across it
+    df_coverage = nearest_accessible(
+        read_expected_polling_places(CONFIG["expected_polling_places_file"])
+    )
+    if args.states:
+        df_coverage = df_coverage[df_coverage["StateAb"].isin(args.states)]
+    report = division_coverage(df_coverage, args.far_km, args.flag_share)
+    if args.output:
+        report.to_csv(args.output, index=False)
+        print(f"Report written to {args.output}")
+    else:
+        print(report.head(args.top).round(3).to_string(index=False))
+    if args.ccd:
+        ccd_coverage(df_coverage).to_csv(args.ccd, index=False)
+        print(f"Census district report written to {args.ccd}")
+    if args.map:
+        create_coverage_map(df_coverage, args.map, args.far_km)
+
+
+def queues(args: argparse.Namespace) -> None:
+    """Simulate polling-day queues and list the booths with the longest waits."""
+    from polling_places.polling_places import CONFIG, read_expected_polling_places
+    from polling_places.queues import simulate_queues
+
+    df_expected = read_expected_polling_places(CONFIG["expected_polling_places_file"])
+    df_expected = df_expected[df_expected["Status"] != "Abolition"]
+    if args.states:
+        df_expected = df_expected[df_expected["StateAb"].isin(args.states)]
+    report = df_expected[
+        [
+            "StateAb",
+            "DivName",
+            "PremisesName",
+            "OrdVoteEst",
+            "NoOrdIssuingOff",
+            "DecVoteEst",
+            "NoOfDecIssuingOff",
+        ]
+    ].join(
+        simulate_queues(
+            df_expected,
+            args.max_wait,
+            args.runs,
+            ordinary_per_hour=args.ordinary_rate,
+            declaration_per_hour=args.declaration_rate,
+        )
+    )
+    report = report.sort_values("PeakWaitMin", ascending=False)
+    print(
+        f"{report['Understaffed'].sum()} understaffed booths, "
+        f"{report['NoIssuingOfficers'].sum()} without issuing officers."
+    )
+    if args.output:
+        report.to_csv(args.output, index=False)
+        print(f"Report written to {args.output}")
+    else:
+        print(report.head(args.top).round(1).to_string(index=False))
+
+
+def render(args: argparse.Namespace) -> None:
+    """Build the markers and pie chart maps for each division."""
+    from polling_places.polling_places import run_divisions
+
+    run_divisions(
+        _divisions(args),
+        jobs=args.jobs,
+        stream=args.stream,
+        pie_mode=args.pie_mode,
+        projection=args.projection,
+    )
+
+
+def regions(args: argparse.Namespace) -> None:
+    """Build the state-wide or national markers maps."""
+    from polling_places.region_maps import build_region_maps
+
+    build_region_maps(args.regions)
+
+
+def snapshots(args: argparse.Namespace) -> None:
+    """Summarise a directory of gazette snapshots, or compare two of them."""
+    from polling_places.snapshots import (
+        change_summary,
+        diff_files,
+        refresh_changed,
+        timeline,
+    )
+
+    if args.new is None:
+        print(timeline(args.old).to_string(index=False))
+        return
+
+    df_diff = diff_files(args.old, args.new)
+    print(change_summary(df_diff).to_string())
+    if args.output:
+        df_diff.to_csv(args.output, index=False)
+    if args.render:
+        refresh_changed(df_diff, args.new, jobs=args.jobs)
+
+
+def feed(args: argparse.Namespace) -> None:
+    """Re-render the divisions affected by each results snapshot as it arrives."""
+    from polling_places.feed import DirectoryFeed, HttpFeed, ResultsFeed, watch
+    from polling_places.polling_places import load_sources
+
+    feeds = [DirectoryFeed(directory) for directory in args.watch or []]
+    if args.url:
+        feeds.append(HttpFeed(args.url))
+    if not feeds:
+        print("Nothing to watch: give --watch or --url.")
+        return
+
+    divisions = _divisions(args)
+    # Votes come only from the feed, so no votes files are read up front
+    sources = load_sources(divisions, with_votes=False)
+    try:
+        watch(
+            ResultsFeed(divisions, sources, args.jobs, args.pie_mode),
+            feeds,
+            args.interval,
+            args.once,
+        )
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+def serve(args: argparse.Namespace) -> None:
+    """Serve every division's maps over HTTP, rendering each on first request."""
+    from polling_places.server import serve as serve_maps
+
+    serve_maps(
+        args.host,
+        args.port,
+        args.pie_mode,
+        int(args.cache_mb * 2**20),
+        args.gazette_dir,
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--data-dir",
+        help="Directory of AEC downloads (default: $POLLING_PLACES_DATA).",
+    )
+    common.add_argument("--expected", help="Gazette of expected polling places.")
+    common.add_argument("--last", help="Polling places file of the last election.")
+    common.add_argument(
+        "--votes-dir",
+        help="Directory of first preferences files (default: the data directory).",
+    )
+    common.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Record per-stage spans and write them to PATH "
+        "(folded stacks for .folded or .txt, otherwise JSON).",
+    )
+
+    divisions = argparse.ArgumentParser(add_help=False)
+    divisions.add_argument(
+        "divisions",
+        nargs="*",
+        help=f"Divisions to use (default: {', '.join(DEFAULT_DIVISIONS)}).",
+    )
+    divisions.add_argument(
+        "--all", action="store_true", help="Use every division in every state."
+    )
+    divisions.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream only the needed rows of the votes files instead of caching them.",
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="polling-places", description="Polling place data and maps."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load_parser = commands.add_parser(
+        "load", parents=[common], help="Read and cache the source files."
+    )
+    load_parser.add_argument(
+        "states", nargs="*", help="States whose votes to load (default: all)."
+    )
+    load_parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Remove the cached copies of the sources first, then re-parse them.",
+    )
+    load_parser.set_defaults(func=load)
+
+    memory_parser = commands.add_parser(
+        "memory",
+        parents=[common],
+        help="Compare source memory use without and with the column schema.",
+    )
+    memory_parser.add_argument(
+        "states", nargs="*", help="States whose votes to compare (default: all)."
+    )
+    memory_parser.set_defaults(func=memory)
+
+    analyse_parser = commands.add_parser(
+        "analyse",
+        parents=[common, divisions],
+        help="Summarise primary votes by division.",
+    )
+    analyse_parser.add_argument("-o", "--output", help="Write the table as CSV.")
+    analyse_parser.set_defaults(func=analyse)
+
+    prepoll_parser = commands.add_parser(
+        "prepoll",
+        parents=[common],
+        help="Break down home and absentee votes at pre-poll centres.",
+    )
+    prepoll_parser.add_argument(
+        "states", nargs="*", help="States to analyse (default: all with votes)."
+    )
+    prepoll_parser.add_argument(
+        "--premises",
+        action="append",
+        help="Premises to analyse instead of every pre-poll centre (repeatable).",
+    )
+    prepoll_parser.add_argument(
+        "-o", "--output", help="Write the tidy breakdown as CSV."
+    )
+    prepoll_parser.set_defaults(func=prepoll)
+
+    project_parser = commands.add_parser(
+        "project",
+        parents=[common],
+        help="Project votes at every current booth of a state.",
+    )
+    project_parser.add_argument("state", help="State abbreviation (NSW, VIC, ...).")
+    project_parser.add_argument(
+        "--swing-carry",
+        type=float,
+        default=0.5,
+        help="Fraction of the last swing carried forward (default: 0.5).",
+    )
+    project_parser.add_argument(
+        "-z",
+        type=float,
+        default=1.96,
+        help="Band half-width in standard deviations (default: 1.96).",
+    )
+    project_parser.add_argument("-o", "--output", help="Write the table as CSV.")
+    project_parser.add_argument("--map", help="Also draw the projection to this HTML.")
+    project_parser.set_defaults(func=project)
+
+    access_parser = commands.add_parser(
+        "access",
+        parents=[common],
+        help="Rank divisions by voters far from full wheelchair access.",
+    )
+    access_parser.add_argument(
+        "states", nargs="*", help="States to report on (default: all)."
+    )
+    access_parser.add_argument(
+        "--far-km",
+        type=float,
+        default=5.0,
+        help="Distance from full access counted as far (default: 5).",
+    )
+    access_parser.add_argument(
+        "--flag-share",
+        type=float,
+        default=0.1,
+        help="Share of far voters that flags a division (default: 0.1).",
+    )
+    access_parser.add_argument(
+        "--top", type=int, default=20, help="Divisions to print (default: 20)."
+    )
+    access_parser.add_argument("-o", "--output", help="Write the report as CSV.")
+    access_parser.add_argument("--ccd", help="Write census district coverage as CSV.")
+    access_parser.add_argument("--map", help="Draw the coverage map to this HTML.")
+    access_parser.set_defaults(func=access)
+
+    queues_parser = commands.add_parser(
+        "queues",
+        parents=[common],
+        help="Simulate polling-day queues from issuing officer counts.",
+    )
+    queues_parser.add_argument(
+        "states", nargs="*", help="States to simulate (default: all)."
+    )
+    queues_parser.add_argument(
+        "--max-wait",
+        type=float,
+        default=20.0,
+        help="Peak wait in minutes above which a booth is understaffed (default: 20).",
+    )
+    queues_parser.add_argument(
+        "--runs", type=int, default=20, help="Simulated polling days (default: 20)."
+    )
+    queues_parser.add_argument(
+        "--ordinary-rate",
+        type=float,
+        default=60.0,
+        help="Ordinary votes one officer issues per hour (default: 60).",
+    )
+    queues_parser.add_argument(
+        "--declaration-rate",
+        type=float,
+        default=20.0,
+        help="Declaration votes one officer issues per hour (default: 20).",
+    )
+    queues_parser.add_argument(
+        "--top", type=int, default=20, help="Booths to print (default: 20)."
+    )
+    queues_parser.add_argument("-o", "--output", help="Write the report as CSV.")
+    queues_parser.set_defaults(func=queues)
+
+    render_parser = commands.add_parser(
+        "render", parents=[common, divisions], help="Build maps by division."
+    )
+    render_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes rendering maps in parallel.",
+    )
+    render_parser.add_argument(
+        "--pie-mode",
+        # polling_places.PIE_MODES, not imported so that --help stays fast
+        choices=["svg", "client"],
+        default="svg",
+        help="Embed pie icons per booth (svg) or draw them in the browser (client).",
+    )
+    render_parser.add_argument(
+        "--projection",
+        action="store_true",
+        help="Also build maps of projected votes at the expected booths.",
+    )
+    render_parser.set_defaults(func=render)
+
+    regions_parser = commands.add_parser(
+        "regions",
+        parents=[common],
+        help="Build state-wide or national markers maps.",
+    )
+    regions_parser.add_argument(
+        "regions",
+        nargs="*",
+        # region_maps.NATIONAL, not imported so that --help stays fast
+        default=["AUS"],
+        help="State abbreviations (NSW, VIC, ...) or AUS for all booths.",
+    )
+    regions_parser.set_defaults(func=regions)
+
+    snapshots_parser = commands.add_parser(
+        "snapshots",
+        parents=[common],
+        help="Compare gazette snapshots.",
+    )
+    snapshots_parser.add_argument(
+        "old", help="Older gazette snapshot CSV, or a directory."
+    )
+    snapshots_parser.add_argument("new", nargs="?", help="Newer gazette snapshot CSV.")
+    snapshots_parser.add_argument(
+        "-o", "--output", help="Write the booth-level change report to this CSV."
+    )
+    snapshots_parser.add_argument(
+        "--render",
+        action="store_true",
+        help="Re-render maps for the divisions that changed.",
+    )
+    snapshots_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes rendering maps in parallel.",
+    )
+    snapshots_parser.set_defaults(func=snapshots)
+
+    feed_parser = commands.add_parser(
+        "feed",
+        parents=[common],
+        help="Re-render maps as results snapshots arrive.",
+    )
+    feed_parser.add_argument(
+        "divisions",
+        nargs="*",
+        help=f"Divisions to keep up to date (default: {', '.join(DEFAULT_DIVISIONS)}).",
+    )
+    feed_parser.add_argument(
+        "--all", action="store_true", help="Keep every division up to date."
+    )
+    feed_parser.add_argument(
+        "--watch",
+        action="append",
+        metavar="DIR",
+        help="Directory that snapshots are written to (repeatable).",
+    )
+    feed_parser.add_argument(
+        "--url",
+        action="append",
+        help="URL serving a state's latest snapshot (repeatable).",
+    )
+    feed_parser.add_argument(
+        "--interval",
+        type=float,
+        default=5.0,
+        help="Seconds between polls (default: 5).",
+    )
+    feed_parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Poll until the files present have settled, then exit.",
+    )
+    feed_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes rendering maps in parallel.",
+    )
+    feed_parser.add_argument(
+        "--pie-mode",
+        choices=["svg", "client"],
+        default="svg",
+        help="Embed pie icons per booth (svg) or draw them in the browser (client).",
+    )
+    feed_parser.set_defaults(func=feed)
+
+    serve_parser = commands.add_parser(
+        "serve",
+        parents=[common],
+        help="Serve maps over HTTP, rendering each division on demand.",
+    )
+    serve_parser.add_argument(
+        "--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)."
+    )
+    serve_parser.add_argument(
+        "--port", type=int, default=8000, help="Port to listen on (default: 8000)."
+    )
+    serve_parser.add_argument(
+        "--cache-mb",
+        type=float,
+        default=256,
+        help="Size of rendered maps kept in memory, in MB (default: 256).",
+    )
+    serve_parser.add_argument(
+        "--gazette-dir",
+        help="Serve the latest gazette snapshot in this directory, following new ones.",
+    )
+    serve_parser.add_argument(
+        "--pie-mode",
+        choices=["svg", "client"],
+        default="svg",
+        help="Embed pie icons per booth (svg) or draw them in the browser (client).",
+    )
+    serve_parser.set_defaults(func=serve)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    _configure(args)
+    if args.profile:
+        from polling_places import profiling
+
+        profiling.enable()
+    try:
+        args.func(args)
+    except FileNotFoundError as e:
+        raise SystemExit(
+            f"Error: The file '{e.filename}' was not found. "
+            "Please check --data-dir, --expected, --last and --votes-dir."
+        ) from e
+    if args.profile:
+        profiling.write_report(args.profile)
+        print(profiling.summary().to_string())
+        print(f"Profile written to {args.profile}")
+
+
+if __name__ == "__main__":
+    main()
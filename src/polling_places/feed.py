@@ -0,0 +1,295 @@
+"""Election-night ingestion of successive first preferences snapshots.
+
+A results snapshot is an AEC ``HouseStateFirstPrefsByPollingPlaceDownload``
+file for one state, whose banner names the state and carries the ``Generated``
+time and ``Cycle`` of the tally-room export. Snapshots are picked up by polling
+a directory (``DirectoryFeed``) or local HTTP URLs (``HttpFeed``) and applied
+to a ``ResultsFeed``. It holds the gazette, last polling places and premises
+matches loaded once, and compares each new snapshot with the previous one
+for its state. Only the vote partitions of divisions with changed polling
+places are replaced. Only the divisions whose maps draw on them are
+re-rendered. Snapshots are told apart by a hash of their content, so a
+corrected export of the same ``Cycle`` is still applied.
+"""
+
+import hashlib
+import io
+import pathlib
+import re
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+import pandas as pd
+
+from polling_places.polling_places import (
+    RenderResult,
+    Sources,
+    parse_votes,
+    render_divisions,
+)
+from polling_places.profiling import traced
+
+BANNER_PATTERN = re.compile(
+    r"First Preferences By Candidate By Polling Place for ([A-Z]+) \[(.*)\]"
+)
+
+# Seconds between polls of the feed sources
+DEFAULT_POLL_SECONDS = 5.0
+
+KEY = ["PollingPlaceID", "CandidateID"]
+
+
+class Snapshot(NamedTuple):
+    """One state's first preferences as of one tally-room export."""
+
+    state: str
+    generated: str
+    cycle: str
+    votes: pd.DataFrame
+    # SHA-256 of the file content
+    digest: str
+
+
+def parse_banner(line: str) -> Optional[Dict[str, str]]:
+    """Return the state and ``Key:Value`` fields of a first preferences banner.
+
+    Returns None for lines that are not such a banner (other AEC downloads,
+    gazettes).
+    """
+    match = BANNER_PATTERN.search(line)
+    if not match:
+        return None
+    fields = dict(item.split(":", 1) for item in match.group(2).split() if ":" in item)
+    fields["State"] = match.group(1)
+    return fields
+
+
+@traced
+def read_snapshot(content: bytes) -> Optional[Snapshot]:
+    """Parse a first preferences download, or return None if it is not one."""
+    banner = parse_banner(content.split(b"\n", 1)[0].decode("utf-8-sig"))
+    if banner is None:
+        return None
+    return Snapshot(
+        banner["State"],
+        banner.get("Generated", ""),
+        banner.get("Cycle", ""),
+        parse_votes(io.BytesIO(content)),
+        hashlib.sha256(content).hexdigest(),
+    )
+
+
+def latest_snapshots(snapshots: List[Snapshot]) -> List[Snapshot]:
+    """Keep only the most recently generated snapshot of each state."""
+    latest: Dict[str, Snapshot] = {}
+    for snapshot in snapshots:
+        current = latest.get(snapshot.state)
+        if current is None or snapshot.generated > current.generated:
+            latest[snapshot.state] = snapshot
+    return [latest[state] for state in sorted(latest)]
+
+
+def changed_polling_places(
+    df_old: Optional[pd.DataFrame], df_new: pd.DataFrame
+) -> pd.Index:
+    """Return the ``PollingPlaceID`` of booths whose votes differ between snapshots.
+
+    Booths with candidates added, removed or recounted all count as changed;
+    without an old snapshot every booth is new.
+    """
+    if df_old is None:
+        return pd.Index(df_new["PollingPlaceID"].unique())
+    merged = df_old[KEY + ["OrdinaryVotes"]].merge(
+        df_new[KEY + ["OrdinaryVotes"]],
+        on=KEY,
+        how="outer",
+        suffixes=("_old", "_new"),
+    )
+    changed = merged["OrdinaryVotes_old"] != merged["OrdinaryVotes_new"]
+    return pd.Index(merged.loc[changed, "PollingPlaceID"].unique())
+
+
+class ResultsFeed:
+    """Maps of ``divisions`` kept up to date with incoming results snapshots.
+
+    ``sources`` are loaded once (see ``load_sources``) and their vote
+    partitions are replaced division by division as snapshots arrive.
+    """
+
+    def __init__(
+        self,
+        divisions: List[str],
+        sources: Sources,
+        jobs: int = 1,
+        pie_mode: str = "svg",
+        projection: bool = False,
+    ) -> None:
+        self.divisions = divisions
+        self.sources = sources
+        self.jobs = jobs
+        self.pie_mode = pie_mode
+        self.projection = projection
+        self.snapshots: Dict[str, Snapshot] = {}
+
+    def affected_divisions(self, changed: Set[str]) -> List[str]:
+        """Return the divisions whose maps use votes of the ``changed`` divisions."""
+        return [
+            division
+            for division in self.divisions
+            if changed.intersection(self.sources.neighbours.get(division, [division]))
+        ]
+
+    @traced
+    def update(self, snapshot: Snapshot) -> Tuple[pd.Index, List[str]]:
+        """Take in a snapshot, returning its changed booths and affected divisions.
+
+        Snapshots with the content of the one last applied for their state, or
+        generated before it, change nothing.
+        """
+        previous = self.snapshots.get(snapshot.state)
+        if previous is not None and (
+            snapshot.digest == previous.digest
+            or snapshot.generated < previous.generated
+        ):
+            return pd.Index([]), []
+        df_old = previous.votes if previous is not None else None
+        booths = changed_polling_places(df_old, snapshot.votes)
+
+        changed: Set[str] = set()
+        for df in (df_old, snapshot.votes):
+            if df is not None:
+                changed.update(
+                    df.loc[df["PollingPlaceID"].isin(booths), "DivisionNm"].astype(str)
+                )
+        df_changed = snapshot.votes[snapshot.votes["DivisionNm"].isin(changed)]
+        for division in changed:
+            self.sources.votes.pop(division, None)
+        self.sources.votes.update(
+            {
+                division: group
+                for division, group in df_changed.groupby(
+                    "DivisionNm", sort=False, observed=True
+                )
+            }
+        )
+        self.snapshots[snapshot.state] = snapshot
+        return booths, self.affected_divisions(changed)
+
+    def apply(self, snapshot: Snapshot) -> List[RenderResult]:
+        """Take in a snapshot and re-render the divisions it affects."""
+        start = time.perf_counter()
+        booths, divisions = self.update(snapshot)
+        results = (
+            render_divisions(
+                divisions, self.sources, self.jobs, self.pie_mode, self.projection
+            )
+            if divisions
+            else []
+        )
+        print(
+            f"{snapshot.state} generated {snapshot.generated}: "
+            f"{len(booths)} polling places changed, {len(divisions)} divisions "
+            f"re-rendered in {time.perf_counter() - start:.1f}s"
+        )
+        return results
+
+
+class DirectoryFeed:
+    """Snapshots written to a directory, found by polling its ``.csv`` files.
+
+    A new or changed file is only read once its size and modification time are
+    the same on two polls in a row, so a file still being written is not taken
+    for a complete snapshot even when it parses. Writers that write to another
+    name and rename into place are picked up just the same. Files that fail to
+    parse are retried on the next poll.
+    """
+
+    def __init__(self, directory: Union[str, pathlib.Path]) -> None:
+        self.directory = pathlib.Path(directory)
+        self._seen: Dict[pathlib.Path, Tuple[int, int]] = {}
+        self._pending: Dict[pathlib.Path, Tuple[int, int]] = {}
+
+    def poll(self) -> List[Snapshot]:
+        snapshots = []
+        for path in sorted(self.directory.glob("*.csv")):
+            stat = path.stat()
+            version = (stat.st_size, stat.st_mtime_ns)
+            if self._seen.get(path) == version:
+                continue
+            if self._pending.get(path) != version:
+                # Changed since the last poll: wait for it to settle
+                self._pending[path] = version
+                continue
+            try:
+                snapshot = read_snapshot(path.read_bytes())
+            except (OSError, ValueError) as e:
+                print(f"Skipping {path.name} for now: {e}")
+                continue
+            self._seen[path] = version
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+
+class HttpFeed:
+    """Snapshots served at fixed URLs, fetched with conditional requests."""
+
+    def __init__(self, urls: List[str]) -> None:
+        self.urls = urls
+        self._validators: Dict[str, Dict[str, str]] = {}
+
+    def poll(self) -> List[Snapshot]:
+        snapshots = []
+        for url in self.urls:
+            request = urllib.request.Request(url, headers=self._validators.get(url, {}))
+            try:
+                with urllib.request.urlopen(request) as response:
+                    content = response.read()
+                    headers = response.headers
+            except urllib.error.HTTPError as e:
+                if e.code != 304:
+                    print(f"Skipping {url} for now: {e}")
+                continue
+            except urllib.error.URLError as e:
+                print(f"Skipping {url} for now: {e.reason}")
+                continue
+            try:
+                snapshot = read_snapshot(content)
+            except ValueError as e:
+                print(f"Skipping {url} for now: {e}")
+                continue
+            self._validators[url] = {
+                request_header: headers[response_header]
+                for request_header, response_header in (
+                    ("If-None-Match", "ETag"),
+                    ("If-Modified-Since", "Last-Modified"),
+                )
+                if headers.get(response_header)
+            }
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+
+def watch(
+    feed: ResultsFeed,
+    sources: List[Union[DirectoryFeed, HttpFeed]],
+    interval: float = DEFAULT_POLL_SECONDS,
+    once: bool = False,
+) -> None:
+    """Poll ``sources`` every ``interval`` seconds and apply new snapshots to ``feed``.
+
+    With ``once`` the sources are polled twice, ``interval`` apart, so that
+    files in a watched directory can settle (see ``DirectoryFeed``).
+    """
+    polls = 0
+    while True:
+        snapshots = [snapshot for source in sources for snapshot in source.poll()]
+        for snapshot in latest_snapshots(snapshots):
+            feed.apply(snapshot)
+        polls += 1
+        if once and polls == 2:
+            return
+        time.sleep(interval)
@@ -0,0 +1,235 @@
+"""Cached, de-duplicated and rate-limited batch geocoding.
+
+Addresses are normalised, resolved offline where possible, looked up in a
+persistent SQLite cache and only the misses are sent to a remote provider,
+from a small thread pool that shares one requests-per-second limit and retries
+transient failures with backoff. An address that fails for good is reported
+and left unresolved without losing the rest of the batch.
+"""
+
+import abc
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from geopy.exc import GeocoderRateLimited, GeocoderTimedOut, GeocoderUnavailable
+from geopy.geocoders import Nominatim
+
+Coordinates = Tuple[float, float]
+
+# Errors worth retrying; anything else from a provider is treated as final
+RETRYABLE_ERRORS = (GeocoderTimedOut, GeocoderUnavailable, GeocoderRateLimited)
+
+
+def normalise_address(address: str) -> str:
+    """Normalise an address for de-duplication and cache keys."""
+    address = address.lower().replace("–", "-").replace("—", "-")
+    address = re.sub(r"\s*-\s*", "-", address)
+    address = re.sub(r"\s*,\s*", ", ", address)
+    return re.sub(r"\s+", " ", address).strip(" ,")
+
+
+class GeocodeProvider(abc.ABC):
+    """Base class for geocoders; ``geocode`` returns None when nothing matches."""
+
+    name = "provider"
+
+    @abc.abstractmethod
+    def geocode(self, address: str) -> Optional[Coordinates]:
+        """Return the coordinates of ``address``, or None if it is not found."""
+
+
+class NominatimProvider(GeocodeProvider):
+    """Geocode with Nominatim; ``domain`` and ``scheme`` can point at a local stub."""
+
+    name = "nominatim"
+
+    def __init__(
+        self,
+        user_agent: str = "polling_places",
+        domain: str = "nominatim.openstreetmap.org",
+        scheme: str = "https",
+        timeout: float = 10,
+    ) -> None:
+        self.geolocator = Nominatim(
+            user_agent=user_agent, domain=domain, scheme=scheme, timeout=timeout
+        )
+
+    def geocode(self, address: str) -> Optional[Coordinates]:
+        location = self.geolocator.geocode(address)
+        if location:
+            return location.latitude, location.longitude
+        return None
+
+
+class GeocodeCache:
+    """Persistent SQLite cache of geocoding results, including misses."""
+
+    def __init__(self, path: str = "geocode_cache.sqlite") -> None:
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes ("
+            "provider TEXT, address TEXT, lat REAL, lon REAL, "
+            "PRIMARY KEY (provider, address))"
+        )
+
+    def get_many(
+        self, provider: str, addresses: Iterable[str]
+    ) -> Dict[str, Optional[Coordinates]]:
+        """Return cached results for the normalised addresses that have one."""
+        found = {}
+        for address in addresses:
+            row = self.connection.execute(
+                "SELECT lat, lon FROM geocodes WHERE provider = ? AND address = ?",
+                (provider, address),
+            ).fetchone()
+            if row is not None:
+                found[address] = None if row[0] is None else (row[0], row[1])
+        return found
+
+    def put_many(
+        self, provider: str, results: Dict[str, Optional[Coordinates]]
+    ) -> None:
+        """Store results for normalised addresses; None records a confirmed miss."""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?)",
+                [
+                    (provider, address, *(coords if coords else (None, None)))
+                    for address, coords in results.items()
+                ],
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls at most ``rate`` per second."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def _geocode_with_retry(
+    provider: GeocodeProvider,
+    address: str,
+    limiter: RateLimiter,
+    retries: int,
+    backoff: float,
+) -> Tuple[bool, Optional[Coordinates]]:
+    """Geocode one address, returning (final, coordinates).
+
+    ``final`` is False when every attempt failed with a transient error, or the
+    provider raised any other error, so the miss is not cached.
+    """
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            return True, provider.geocode(address)
+        except RETRYABLE_ERRORS:
+            if attempt < retries:
+                time.sleep(backoff * 2**attempt)
+        except Exception as e:
+            print(f"Geocoding failed: {address}: {type(e).__name__}: {e}")
+            return False, None
+    print(f"Geocoding failed after {retries + 1} attempts: {address}")
+    return False, None
+
+
+def _fetch(
+    pending: Dict[str, str],
+    provider: GeocodeProvider,
+    cache: Optional[GeocodeCache],
+    limiter: RateLimiter,
+    workers: int,
+    retries: int,
+    backoff: float,
+) -> Dict[str, Optional[Coordinates]]:
+    """Geocode ``{key: address}`` from a thread pool, caching each final result.
+
+    The cache is written from the calling thread only, as SQLite requires, and
+    as each result arrives, so an interruption loses only the lookups in flight.
+    """
+    fetched: Dict[str, Optional[Coordinates]] = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                _geocode_with_retry, provider, address, limiter, retries, backoff
+            ): key
+            for key, address in pending.items()
+        }
+        try:
+            for future in as_completed(futures):
+                final, coords = future.result()
+                if final:
+                    fetched[futures[future]] = coords
+                    if cache:
+                        cache.put_many(provider.name, {futures[future]: coords})
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return fetched
+
+
+def geocode_addresses(
+    addresses: List[str],
+    provider: GeocodeProvider,
+    cache: Optional[GeocodeCache] = None,
+    rate: float = 1.0,
+    workers: int = 4,
+    retries: int = 3,
+    backoff: float = 1.0,
+    local: Optional[GeocodeProvider] = None,
+) -> List[Optional[Coordinates]]:
+    """Geocode a batch of addresses, returning coordinates in input order.
+
+    Duplicate addresses (after normalisation) are looked up once. A ``local``
+    provider such as ``LocalAddressIndex`` is tried first; of the rest, cached
+    results are reused and the remainder are sent to ``provider`` from
+    ``workers`` threads limited to ``rate`` requests per second overall. Each
+    result is cached as it arrives, so an interrupted run keeps what it fetched.
+    """
+    keys = [normalise_address(address) for address in addresses]
+    originals = dict(zip(keys, addresses))
+
+    results: Dict[str, Optional[Coordinates]] = {}
+    if local:
+        for key, address in originals.items():
+            coords = local.geocode(address)
+            if coords:
+                results[key] = coords
+    unresolved = [key for key in originals if key not in results]
+
+    if cache:
+        results.update(cache.get_many(provider.name, unresolved))
+    pending = [key for key in unresolved if key not in results]
+
+    if pending:
+        results.update(
+            _fetch(
+                {key: originals[key] for key in pending},
+                provider,
+                cache,
+                RateLimiter(rate),
+                workers,
+                retries,
+                backoff,
+            )
+        )
+
+    return [results.get(key) for key in keys]
@@ -0,0 +1,231 @@
+"""Matching expected premises to last-election premises by name and location.
+
+Names are normalised once and turned into sparse character-trigram vectors
+(the columns of the CSR matrix are an inverted index from trigram to names).
+Candidate pairs come from the spatial index, every candidate is scored by the
+Dice similarity of its trigram sets in one sparse operation, and the best
+match per expected premises wins, with distance breaking ties.
+
+Similar names a few kilometres apart are usually different premises ("St
+John's" and "St Joseph's Primary School"), so inexact names only match on the
+same site; identical normalised names may match further away.
+"""
+
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from polling_places.profiling import traced
+from polling_places.spatial import BoothTree, haversine_km, valid_coordinates
+
+if TYPE_CHECKING:
+    from scipy import sparse
+
+# Identically named premises further apart than this never match
+DEFAULT_MAX_DISTANCE_KM = 5.0
+
+# Inexactly named premises must be this close to match
+DEFAULT_SAME_SITE_KM = 0.25
+
+# Inexact matches scoring below this similarity are treated as new premises
+DEFAULT_MIN_SCORE = 0.7
+
+
+def normalise_name(name: str) -> str:
+    """Normalise a premises name: lower case, punctuation and street numbers removed."""
+    name = name.lower().replace("&", " and ").replace("'", "")
+    name = re.sub(r"[^a-z0-9]+", " ", name)
+    name = re.sub(r"^\d+[a-z]? ", "", name.strip())  # "3A Joynton Avenue ..."
+    return re.sub(r"\s+", " ", name).strip()
+
+
+def trigrams(name: str) -> List[str]:
+    """Return the distinct character trigrams of a normalised, padded name."""
+    padded = f"  {name} "
+    return sorted({padded[i : i + 3] for i in range(len(padded) - 2)})
+
+
+class TrigramIndex:
+    """Binary name-by-trigram sparse matrix over a fixed vocabulary."""
+
+    def __init__(self, names: List[str]) -> None:
+        self.vocabulary: Dict[str, int] = {}
+        self.matrix = self.vectorise(names, grow=True)
+
+    def vectorise(self, names: List[str], grow: bool = False) -> "sparse.csr_matrix":
+        """Return the trigram matrix of ``names``; unseen trigrams are dropped."""
+        indptr, indices = [0], []
+        for name in names:
+            for gram in trigrams(name):
+                column = self.vocabulary.get(gram)
+                if column is None and grow:
+                    column = self.vocabulary[gram] = len(self.vocabulary)
+                if column is not None:
+                    indices.append(column)
+            indptr.append(len(indices))
+        from scipy import sparse
+
+        data = np.ones(len(indices), dtype=np.float32)
+        return sparse.csr_matrix(
+            (data, indices, indptr), shape=(len(names), max(len(self.vocabulary), 1))
+        )
+
+
+def dice_scores(
+    left: "sparse.csr_matrix",
+    right: "sparse.csr_matrix",
+    left_rows: np.ndarray,
+    right_rows: np.ndarray,
+    left_sizes: np.ndarray,
+    right_sizes: np.ndarray,
+) -> np.ndarray:
+    """Dice similarity of trigram sets for each (left_rows[k], right_rows[k]) pair."""
+    shared = np.asarray(left[left_rows].multiply(right[right_rows]).sum(axis=1)).ravel()
+    total = left_sizes[left_rows] + right_sizes[right_rows]
+    return np.divide(2 * shared, total, out=np.zeros_like(shared), where=total > 0)
+
+
+@traced
+def match_premises(
+    df_expected: pd.DataFrame,
+    df_last_polling_places: pd.DataFrame,
+    max_distance_km: float = DEFAULT_MAX_DISTANCE_KM,
+    same_site_km: float = DEFAULT_SAME_SITE_KM,
+    min_score: float = DEFAULT_MIN_SCORE,
+    divisions: Optional[Dict[str, List[str]]] = None,
+) -> pd.DataFrame:
+    """Match each expected premises to its best last-election premises.
+
+    Candidates are last-election booths with the same normalised name within
+    ``max_distance_km`` (or anywhere, when either side lacks coordinates), or
+    scoring at least ``min_score`` within ``same_site_km``. When ``divisions``
+    maps stripped ``DivName`` to allowed ``DivisionNm`` values, candidates must
+    be in one of those divisions and identical names match at any distance.
+    Returns a frame indexed like ``df_expected`` with the matched ``PremisesNm``
+    (NaN when there is no match), its ``MatchScore`` and ``MatchDistanceKm``. Any number of
+    divisions, up to the whole country, is matched in one batched call.
+    """
+    expected_names = df_expected["PremisesName"].fillna("").map(normalise_name)
+    last_names = df_last_polling_places["PremisesNm"].fillna("").map(normalise_name)
+
+    index = TrigramIndex(list(last_names))
+    last_vectors = index.matrix
+    expected_vectors = index.vectorise(list(expected_names))
+    # Set sizes over the full trigram sets, so unseen trigrams still count
+    expected_sizes = np.array([len(trigrams(n)) for n in expected_names], dtype=float)
+    last_sizes = np.asarray(last_vectors.sum(axis=1), dtype=float).ravel()
+
+    expected_valid = valid_coordinates(df_expected["Lat"], df_expected["Long"])
+    last_valid = valid_coordinates(
+        df_last_polling_places["Latitude"], df_last_polling_places["Longitude"]
+    )
+    expected_positions = np.flatnonzero(expected_valid)
+    last_positions = np.flatnonzero(last_valid)
+
+    pairs = BoothTree(
+        df_last_polling_places["Latitude"].to_numpy()[last_valid],
+        df_last_polling_places["Longitude"].to_numpy()[last_valid],
+    ).pairs_within(
+        df_expected["Lat"].to_numpy()[expected_valid],
+        df_expected["Long"].to_numpy()[expected_valid],
+        max_distance_km,
+    )
+    candidates = pd.DataFrame(
+        {
+            "expected": expected_positions[pairs[:, 0].astype(int)],
+            "last": last_positions[pairs[:, 1].astype(int)],
+            "distance": pairs[:, 2],
+        }
+    )
+
+    # Identical names are candidates wherever they are, so booths missing
+    # coordinates can still match
+    same_name = (
+        pd.DataFrame(
+            {"expected": np.arange(len(expected_names)), "name": expected_names}
+        )
+        .merge(
+            pd.DataFrame({"last": np.arange(len(last_names)), "name": last_names}),
+            on="name",
+        )
+        .drop(columns="name")
+    )
+    same_name["distance"] = haversine_km(
+        df_expected["Lat"].to_numpy()[same_name["expected"]],
+        df_expected["Long"].to_numpy()[same_name["expected"]],
+        df_last_polling_places["Latitude"].to_numpy()[same_name["last"]],
+        df_last_polling_places["Longitude"].to_numpy()[same_name["last"]],
+    )
+    same_name.loc[
+        ~(expected_valid[same_name["expected"]] & last_valid[same_name["last"]]),
+        "distance",
+    ] = np.nan
+    candidates = pd.concat([candidates, same_name], ignore_index=True).drop_duplicates(
+        ["expected", "last"]
+    )
+
+    if divisions is not None:
+        allowed = pd.DataFrame(
+            [(d, n) for d, ns in divisions.items() for n in ns],
+            columns=["DivName", "DivisionNm"],
+        )
+        keys = pd.DataFrame(
+            {
+                "DivName": df_expected["DivName"]
+                .str.strip()
+                .to_numpy()[candidates["expected"]],
+                "DivisionNm": df_last_polling_places["DivisionNm"].to_numpy()[
+                    candidates["last"]
+                ],
+            }
+        )
+        keep = keys.merge(allowed, how="left", indicator=True)["_merge"] == "both"
+        candidates = candidates[keep.to_numpy()]
+
+    candidates = candidates.assign(
+        score=dice_scores(
+            expected_vectors,
+            last_vectors,
+            candidates["expected"].to_numpy(),
+            candidates["last"].to_numpy(),
+            expected_sizes,
+            last_sizes,
+        )
+    )
+    exact = (
+        expected_names.to_numpy()[candidates["expected"]]
+        == last_names.to_numpy()[candidates["last"]]
+    )
+    distance = candidates["distance"]
+    # Within allowed divisions, identical names match even when the gazette
+    # coordinates are wrong
+    near = (
+        distance.isna() | (distance <= max_distance_km) | (divisions is not None)
+    ).to_numpy()
+    same_site = (distance <= same_site_km).to_numpy()
+    acceptable = (exact & near) | (
+        same_site & (candidates["score"] >= min_score).to_numpy()
+    )
+    best = (
+        candidates[acceptable]
+        .sort_values(["expected", "score", "distance"], ascending=[True, False, True])
+        .drop_duplicates("expected")
+    )
+
+    result = pd.DataFrame(
+        {
+            "PremisesNm": np.nan,
+            "MatchScore": np.nan,
+            "MatchDistanceKm": np.nan,
+        },
+        index=df_expected.index,
+    ).astype({"PremisesNm": object})
+    rows = result.index[best["expected"].to_numpy()]
+    result.loc[rows, "PremisesNm"] = df_last_polling_places["PremisesNm"].to_numpy()[
+        best["last"].to_numpy()
+    ]
+    result.loc[rows, "MatchScore"] = best["score"].to_numpy()
+    result.loc[rows, "MatchDistanceKm"] = best["distance"].to_numpy()
+    return result
@@ -0,0 +1,74 @@
+"""Compact SVG pie glyphs for map markers, drawn without matplotlib."""
+
+import functools
+import math
+from typing import Sequence, Tuple
+
+# Vote shares are quantised to this many parts before rendering and caching
+RESOLUTION = 1000
+
+
+def quantise(values: Sequence[float], resolution: int = RESOLUTION) -> Tuple[int, ...]:
+    """Quantise values to integer shares of ``resolution`` that sum exactly to it.
+
+    NaN and negative values count as zero. All-zero input gives all-zero shares.
+    """
+    cleaned = [v if v > 0 else 0.0 for v in values]  # NaN > 0 is False
+    total = sum(cleaned)
+    if total == 0:
+        return tuple(0 for _ in cleaned)
+    shares = []
+    previous = 0
+    running = 0.0
+    for v in cleaned:
+        running += v
+        edge = round(running / total * resolution)
+        shares.append(edge - previous)
+        previous = edge
+    return tuple(shares)
+
+
+@functools.lru_cache(maxsize=4096)
+def _pie_svg(shares: Tuple[int, ...], colors: Tuple[str, ...], radius: float) -> str:
+    """Render quantised shares as SVG wedges, starting at 12 o'clock anticlockwise."""
+    size = f"{2 * radius:g}"
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+        f'viewBox="0 0 {size} {size}">'
+    ]
+    total = sum(shares)
+    drawn = [(share, color) for share, color in zip(shares, colors) if share > 0]
+    if len(drawn) == 1:
+        parts.append(
+            f'<circle cx="{radius:g}" cy="{radius:g}" r="{radius:g}" '
+            f'fill="{drawn[0][1]}"/>'
+        )
+    else:
+        start = 0
+        for share, color in drawn:
+            end = start + share
+            a0 = math.pi / 2 + 2 * math.pi * start / total
+            a1 = math.pi / 2 + 2 * math.pi * end / total
+            x0 = radius + radius * math.cos(a0)
+            y0 = radius - radius * math.sin(a0)
+            x1 = radius + radius * math.cos(a1)
+            y1 = radius - radius * math.sin(a1)
+            large_arc = 1 if share * 2 > total else 0
+            parts.append(
+                f'<path d="M{radius:g},{radius:g}L{x0:.2f},{y0:.2f}'
+                f'A{radius:g},{radius:g} 0 {large_arc} 0 {x1:.2f},{y1:.2f}Z" '
+                f'fill="{color}"/>'
+            )
+            start = end
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def pie_svg(values: Sequence[float], colors: Sequence[str], radius: float) -> str:
+    """Return an SVG pie of ``values`` in ``colors`` with the given radius in pixels.
+
+    The glyph is ``2 * radius`` pixels square so it fills a marker icon of the
+    same size. Values are quantised to ``RESOLUTION`` parts and the radius to
+    half pixels, and glyphs are memoised on that quantised key.
+    """
+    return _pie_svg(quantise(values), tuple(colors), round(radius * 2) / 2)
@@ -0,0 +1,187 @@
+"""Client-side pie chart layer for folium maps.
+
+Instead of one SVG icon and popup per booth, the booth data is embedded once as
+a columnar JSON payload and a shared script draws the pies and builds the
+popups in the browser, so the saved HTML grows with booths times parties rather
+than with inline markup.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from branca.element import MacroElement, Template
+
+from polling_places.polling_places import (
+    LAST_ELECTION_LABEL,
+    TRANSFERRED_COLUMN,
+    band_columns,
+)
+
+PIE_LAYER_TEMPLATE = """
+{% macro script(this, kwargs) %}
+(function () {
+    var data = {{ this.payload }};
+    var map = {{ this._parent.get_name() }};
+
+    function escape(text) {
+        return String(text).replace(/[&<>"']/g, function (c) {
+            return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+        });
+    }
+
+    function show(value) {
+        return value === null ? "nan" : value;
+    }
+
+    // Wedges start at 12 o'clock and run anticlockwise, as in pie.py
+    function pie(values, r) {
+        var total = 0, drawn = [];
+        values.forEach(function (v, k) {
+            if (v > 0) { total += v; drawn.push([v, data.colours[k]]); }
+        });
+        var size = 2 * r;
+        var svg = '<svg xmlns="http://www.w3.org/2000/svg" width="' + size +
+            '" height="' + size + '" viewBox="0 0 ' + size + ' ' + size + '">';
+        if (drawn.length === 1) {
+            svg += '<circle cx="' + r + '" cy="' + r + '" r="' + r +
+                '" fill="' + drawn[0][1] + '"/>';
+        } else {
+            var start = 0;
+            drawn.forEach(function (wedge) {
+                var end = start + wedge[0];
+                var a0 = Math.PI / 2 + 2 * Math.PI * start / total;
+                var a1 = Math.PI / 2 + 2 * Math.PI * end / total;
+                svg += '<path d="M' + r + ',' + r +
+                    'L' + (r + r * Math.cos(a0)).toFixed(2) + ',' +
+                    (r - r * Math.sin(a0)).toFixed(2) +
+                    'A' + r + ',' + r + ' 0 ' + (wedge[0] * 2 > total ? 1 : 0) +
+                    ' 0 ' + (r + r * Math.cos(a1)).toFixed(2) + ',' +
+                    (r - r * Math.sin(a1)).toFixed(2) +
+                    'Z" fill="' + wedge[1] + '"/>';
+                start = end;
+            });
+        }
+        return svg + "</svg>";
+    }
+
+    for (var i = 0; i < data.lat.length; i++) {
+        if (data.lat[i] === null || data.long[i] === null) { continue; }
+        var votes = data.votes[i];
+        var radius = data.radius[i] || 0;
+        var popup = '<div style="font-family: Arial; font-size: 14px;">' +
+            '<b style="font-size: 16px; color: darkblue;">' +
+            escape(data.name[i]) + "</b><br>";
+        if (data.ord) {
+            popup += "<b>Estimated Ordinary Votes:</b> " + show(data.ord[i]) + "<br>" +
+                "<b>Estimated Declaration Votes:</b> " + show(data.dec[i]) + "<br>" +
+                "<b>Wheelchair Access:</b> " + escape(show(data.wheelchair[i])) + "<br>";
+        } else {
+            popup += "<b>Total votes:</b> " + show(data.total[i]) + "<br>";
+        }
+        if (data.transferred && data.transferred[i]) {
+            popup += "<i>Includes votes transferred from nearby booths</i><br>";
+        }
+        data.parties.forEach(function (party, k) {
+            popup += "<b>" + escape(data.label) + " " + escape(party) + " primary:</b> " +
+                show(votes[k]);
+            if (data.low && data.low[i][k] !== null) {
+                popup += " (" + data.low[i][k] + "&ndash;" + data.high[i][k] + ")";
+            }
+            popup += "<br>";
+        });
+        popup += "</div>";
+
+        var marker;
+        if (votes[0] === null || votes.every(function (v) { return v === 0; })) {
+            marker = L.circleMarker([data.lat[i], data.long[i]], {
+                radius: radius, fill: true, fillColor: "grey", color: "black",
+                fillOpacity: 0.6
+            });
+        } else {
+            marker = L.marker([data.lat[i], data.long[i]], {
+                icon: L.divIcon({
+                    html: "<div>" + pie(votes, radius) + "</div>",
+                    iconSize: [radius * 2, radius * 2],
+                    className: "empty"
+                })
+            });
+        }
+        marker.bindPopup(popup, {maxWidth: 300}).addTo(map);
+    }
+})();
+{% endmacro %}
+"""
+
+
+def _column(values: pd.Series, decimals: Optional[int] = None) -> List:
+    """Return a JSON-ready list, with NaN as None and floats optionally rounded."""
+    if decimals is not None:
+        values = values.astype(float).round(decimals)
+    values = values.astype(object)
+    return values.where(values.notna(), None).tolist()
+
+
+def _rows(votes: pd.DataFrame) -> List[List]:
+    """Return vote counts row by row, as integers with missing ones as None."""
+    return [
+        [None if np.isnan(v) else int(v) for v in row]
+        for row in votes.astype(float).to_numpy()
+    ]
+
+
+def pie_payload(
+    df: pd.DataFrame, Party_to_colour: Dict[str, str], label: str = LAST_ELECTION_LABEL
+) -> Dict:
+    """Return the columnar booth data drawn by ``PieLayer``.
+
+    Expected booths carry their vote estimates and wheelchair access; last
+    election booths (without ``OrdVoteEst``) carry their total votes instead.
+    Projected votes also carry their ``low`` and ``high`` bands, and booths
+    with transferred votes are flagged in ``transferred``. Marker radii
+    follow ``create_map_with_pie_charts``: total votes / 100.
+    """
+    parties = list(Party_to_colour)
+    votes = df.reindex(columns=parties).astype(float)
+    rows = _rows(votes)
+
+    payload = {
+        "label": label,
+        "parties": parties,
+        "colours": list(Party_to_colour.values()),
+        "lat": _column(df["Lat"], 6),
+        "long": _column(df["Long"], 6),
+        "name": _column(df["PremisesName"]),
+        "votes": rows,
+    }
+    if "OrdVoteEst" in df:
+        total = df["OrdVoteEst"] + df["DecVoteEst"]
+        payload.update(
+            ord=_column(df["OrdVoteEst"]),
+            dec=_column(df["DecVoteEst"]),
+            wheelchair=_column(df["WheelchairAccess"]),
+        )
+    else:
+        total = votes.sum(axis=1, skipna=False)
+        payload["total"] = [None if np.isnan(v) else int(v) for v in total]
+    payload["radius"] = _column(total / 100, 2)
+    if TRANSFERRED_COLUMN in df:
+        payload["transferred"] = df[TRANSFERRED_COLUMN].astype(bool).tolist()
+    low, high = zip(*(band_columns(party) for party in parties))
+    if set(low) <= set(df.columns):
+        payload["low"] = _rows(df[list(low)])
+        payload["high"] = _rows(df[list(high)])
+    return payload
+
+
+class PieLayer(MacroElement):
+    """Folium element drawing booth pies and popups from a ``pie_payload``."""
+
+    _template = Template(PIE_LAYER_TEMPLATE)
+
+    def __init__(self, payload: Dict) -> None:
+        super().__init__()
+        self._name = "PieLayer"
+        # "</" would end the script element early if a name contained it
+        self.payload = json.dumps(payload, separators=(",", ":")).replace("</", "<\\/")
@@ -1,7 +1,13 @@
 import folium
 import pandas as pd
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
+
+from polling_places.address_index import LocalAddressIndex
+from polling_places.geocode import GeocodeCache, NominatimProvider, geocode_addresses
+from polling_places.polling_places import (
+    CONFIG,
+    read_expected_polling_places,
+    read_last_polling_places,
+)
 
 # Sample list of addresses
 addresses_raw = [
@@ -140,28 +146,25 @@ for address in addresses_raw:
 addresses = [address.split(", ", maxsplit=1)[1] for address in addresses_raw]
 
 
-# Initialize geocoder
-geolocator = Nominatim(user_agent="address_mapper")
-
-
-# Function to get latitude and longitude
-def get_lat_lon(address):
-    try:
-        location = geolocator.geocode(address)
-        if location:
-            return location.latitude, location.longitude
-        else:
-            return None, None
-    except GeocoderTimedOut:
-        return None, None
-
+# Geocode the addresses, trying known AEC premises first and reusing cached
+# results from earlier runs
+local_index = LocalAddressIndex.from_frames(
+    read_last_polling_places(CONFIG["last_polling_places_file"]),
+    read_expected_polling_places(CONFIG["expected_polling_places_file"]),
+)
+coordinates = geocode_addresses(
+    addresses,
+    NominatimProvider(user_agent="address_mapper"),
+    GeocodeCache("geocode_cache.sqlite"),
+    local=local_index,
+)
 
 # Create a DataFrame
 data = {"Address": addresses}
 df = pd.DataFrame(data)
-
-# Get coordinates
-df["Latitude"], df["Longitude"] = zip(*df["Address"].apply(get_lat_lon))
+df["Latitude"], df["Longitude"] = zip(
+    *[coords if coords else (None, None) for coords in coordinates]
+)
 
 # Initialize a map centered around the first valid location
 valid_locations = df.dropna(subset=["Latitude", "Longitude"])
@@ -1,39 +1,266 @@
 # %%
+import os
 import pathlib
+import re
 import pandas as pd
-import folium
-from branca.element import Template, MacroElement
-import matplotlib.pyplot as plt
-import io
 import numpy as np
-from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from polling_places import profiling, schema
+from polling_places.cache import cached_frame
+from polling_places.matching import match_premises
+from polling_places.profiling import span, traced
+from polling_places.queues import simulate_queues
+from polling_places.schema import apply_schema, csv_dtypes
+from polling_places.spatial import DEFAULT_NEIGHBOUR_DISTANCE_KM, neighbouring_divisions
+
+if TYPE_CHECKING:
+    # Rendering libraries are imported where maps are built, so that data-only
+    # commands start without them
+    import folium
 
 # Configuration for file paths
 
-data = pathlib.Path("/mnt/c/Users/marco/polling places/data")
+# Directory of AEC downloads; set POLLING_PLACES_DATA or call configure to move it
+data = pathlib.Path(
+    os.environ.get("POLLING_PLACES_DATA", "/mnt/c/Users/marco/polling places/data")
+)
 CONFIG: Dict[str, str] = {
     "expected_polling_places_file": data / "prdelms.gaz.statics.250405.09.00.02.csv",
     "last_polling_places_file": data / "GeneralPollingPlacesDownload-27966.csv",
     "votes_file": data / "HouseStateFirstPrefsByPollingPlaceDownload-27966-NSW.csv",
+    # First preferences files for every state, routed by their StateAb suffix
+    "votes_dir": data,
 }
 
 
-# %%
-def load_expected_polling_places(file_path: str, division: str) -> pd.DataFrame:
-    """Load the expected polling places file and filter by division."""
-    try:
-        df = pd.read_csv(file_path)
-    except FileNotFoundError:
-        print(
-            f"Error: The file '{file_path}' was not found. Please check the file path."
+def configure(
+    data_dir: Optional[str] = None,
+    expected_polling_places_file: Optional[str] = None,
+    last_polling_places_file: Optional[str] = None,
+    votes_dir: Optional[str] = None,
+) -> None:
+    """Point ``CONFIG`` at another data directory and/or individual files.
+
+    ``data_dir`` keeps the configured file names but looks for them, and for
+    votes files, in that directory; the other arguments override single paths.
+    """
+    if data_dir:
+        data_dir = pathlib.Path(data_dir)
+        for key in (
+            "expected_polling_places_file",
+            "last_polling_places_file",
+            "votes_file",
+        ):
+            CONFIG[key] = data_dir / pathlib.Path(CONFIG[key]).name
+        CONFIG["votes_dir"] = data_dir
+    if expected_polling_places_file:
+        CONFIG["expected_polling_places_file"] = pathlib.Path(
+            expected_polling_places_file
         )
-        exit()
-    df = df[df["DivName"].str.contains(division) & (df["Status"] != "Abolition")]
-    df["PremisesName"] = df["PremisesName"].str.strip()
-    df["PremisesName"].replace(
-        {"TAFE NSW (Ultimo Campus)": "TAFE NSW Ultimo Campus"}, inplace=True
+    if last_polling_places_file:
+        CONFIG["last_polling_places_file"] = pathlib.Path(last_polling_places_file)
+    if votes_dir:
+        CONFIG["votes_dir"] = pathlib.Path(votes_dir)
+
+
+VOTES_FILE_PATTERN = re.compile(
+    r"HouseStateFirstPrefsByPollingPlaceDownload-\d+-([A-Z]+)\.csv$"
+)
+
+# Map colours by party category (see generate_party_mapping), in legend order;
+# parties outside these categories are grouped as "Other"
+PARTY_COLOURS: Dict[str, str] = {
+    "Labor": "red",
+    "Liberal": "blue",
+    "Greens": "green",
+    "Nationals": "darkgreen",
+    "Independent": "lightseagreen",
+    "One Nation": "orange",
+    "United Australia": "yellow",
+}
+
+# First preferences columns used by the maps and analyses; candidate names and
+# election flags are not read when streaming
+VOTES_COLUMNS: List[str] = [
+    "StateAb",
+    "DivisionID",
+    "DivisionNm",
+    "PollingPlaceID",
+    "PollingPlace",
+    "CandidateID",
+    "PartyAb",
+    "PartyNm",
+    "OrdinaryVotes",
+    "Swing",
+]
+
+# Ways create_map_with_pie_charts can draw its pies
+PIE_MODES = ["svg", "client"]
+
+# Maps built for each division by prepare_division; the last needs projection
+MAP_NAMES = ["markers", "primary_vote", "pre_polling", "projected_vote"]
+
+# What the party votes on a pie map are, in its popups
+LAST_ELECTION_LABEL = "Last election"
+
+# Flags booths whose votes were transferred from nearby booths (see transfer.py)
+TRANSFERRED_COLUMN = "VotesTransferred"
+
+# Rows per chunk when streaming a first preferences file
+VOTES_CHUNKSIZE = 50_000
+
+
+# %%
+@traced
+def _parse_expected_polling_places(file_path: str) -> pd.DataFrame:
+    """Parse the gazette of expected polling places into its compact schema."""
+    return apply_schema(pd.read_csv(file_path), schema.EXPECTED_POLLING_PLACES)
+
+
+@traced
+def _parse_last_polling_places(file_path: str) -> pd.DataFrame:
+    """Parse the AEC polling places download into its compact schema."""
+    return apply_schema(pd.read_csv(file_path, skiprows=1), schema.LAST_POLLING_PLACES)
+
+
+@traced
+def parse_votes(file_path: Union[str, IO[bytes]]) -> pd.DataFrame:
+    """Parse an AEC first preferences by polling place download, or its content."""
+    return apply_schema(
+        pd.read_csv(file_path, skiprows=1, dtype=csv_dtypes(schema.VOTES)),
+        schema.VOTES,
     )
-    return df
+
+
+@traced
+def stream_votes(
+    file_path: str,
+    polling_place_ids: Iterable[int],
+    columns: Optional[List[str]] = None,
+    chunksize: int = VOTES_CHUNKSIZE,
+) -> pd.DataFrame:
+    """Read only the votes rows for ``polling_place_ids`` from a first preferences file.
+
+    The file is read ``chunksize`` rows at a time, parsing only ``columns``
+    (default ``VOTES_COLUMNS``) with their compact dtypes, and each chunk is
+    filtered against the wanted IDs before being kept, so peak memory follows
+    the selection rather than the file.
+    """
+    columns = columns or VOTES_COLUMNS
+    wanted = pd.Index(pd.unique(np.asarray(list(polling_place_ids), dtype=np.int64)))
+    chunks = [
+        chunk[chunk["PollingPlaceID"].isin(wanted)]
+        for chunk in pd.read_csv(
+            file_path,
+            skiprows=1,
+            usecols=columns,
+            dtype=csv_dtypes(schema.VOTES, columns),
+            chunksize=chunksize,
+        )
+    ]
+    return apply_schema(pd.concat(chunks, ignore_index=True), schema.VOTES)
+
+
+@traced
+def read_expected_polling_places(file_path: str) -> pd.DataFrame:
+    """Read the full gazette of expected polling places, via the on-disk cache."""
+    return cached_frame(file_path, _parse_expected_polling_places, "expected")
+
+
+@traced
+def read_last_polling_places(file_path: str) -> pd.DataFrame:
+    """Read the full last polling places download, via the on-disk cache."""
+    return cached_frame(file_path, _parse_last_polling_places, "last_polling_places")
+
+
+@traced
+def read_votes(file_path: str) -> pd.DataFrame:
+    """Read a full first preferences download, via the on-disk cache."""
+    return cached_frame(file_path, parse_votes, "votes")
+
+
+class VotesRegistry:
+    """First preferences files by state (``StateAb``), each read only when needed.
+
+    A state's frame is read through the on-disk cache the first time it is
+    asked for and kept for later requests, so every state can be served in one
+    run without loading any file twice.
+    """
+
+    def __init__(self, files: Dict[str, Union[str, pathlib.Path]]) -> None:
+        self.files = {state: pathlib.Path(path) for state, path in files.items()}
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    @classmethod
+    def from_directory(cls, directory: Union[str, pathlib.Path]) -> "VotesRegistry":
+        """Register the first preferences file of each state found in ``directory``."""
+        files = {}
+        directory = pathlib.Path(directory)
+        if directory.is_dir():
+            for path in sorted(directory.iterdir()):
+                match = VOTES_FILE_PATTERN.search(path.name)
+                if match:
+                    files[match.group(1)] = path
+        return cls(files)
+
+    def __contains__(self, state: str) -> bool:
+        return state in self.files
+
+    def read(self, state: str) -> pd.DataFrame:
+        """Return a state's full votes frame, reading it on first use."""
+        if state not in self._frames:
+            self._frames[state] = read_votes(self.files[state])
+        return self._frames[state]
+
+    def stream(self, state: str, polling_place_ids: Iterable[int]) -> pd.DataFrame:
+        """Return only the given booths' votes from a state's file (see ``stream_votes``)."""
+        return stream_votes(self.files[state], polling_place_ids)
+
+
+@traced
+def load_expected_polling_places(file_path: str, division: str) -> pd.DataFrame:
+    """Load the expected polling places file and filter by division.
+
+    Raises FileNotFoundError if the file does not exist.
+    """
+    df = read_expected_polling_places(file_path)
+    return df[(df["DivName"] == division) & (df["Status"] != "Abolition")]
+
+
+@traced
+def filter_last_polling_places(
+    df_last_polling_places: pd.DataFrame,
+    df_expected: pd.DataFrame,
+    divisions: List[str],
+    not_prepoll: bool,
+) -> pd.DataFrame:
+    """Filter last polling places to the expected premises in the given divisions.
+
+    Expected premises are identified by their matched last-election
+    ``PremisesNm`` when ``df_expected`` has one (see ``load_sources``), and by
+    ``PremisesName`` otherwise.
+    """
+    premises = df_expected.get("PremisesNm", df_expected["PremisesName"])
+    df_subset = df_last_polling_places[
+        df_last_polling_places["PremisesNm"].isin(premises)
+        & df_last_polling_places["DivisionNm"].isin(divisions)
+    ]
+    if not_prepoll:
+        df_subset = df_subset[~df_subset["PollingPlaceNm"].str.contains("PP")]
+    return df_subset
 
 
 def load_last_polling_places(
@@ -44,43 +271,169 @@ def load_last_polling_places(
     not_prepoll: bool,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """Load the last polling places file and filter by division and premises."""
-    df_last_polling_places = pd.read_csv(file_path, skiprows=1)
-    df_last_polling_places["PremisesNm"] = df_last_polling_places["PremisesNm"].replace(
-        {"3A Joynton Avenue Creative Centre": "Joynton Avenue Creative Centre"}
+    df_last_polling_places = read_last_polling_places(file_path)
+    df_subset = filter_last_polling_places(
+        df_last_polling_places,
+        df_expected,
+        neighbouring_division[division],
+        not_prepoll,
     )
-    df_subset = df_last_polling_places[
-        df_last_polling_places["PremisesNm"].isin(df_expected["PremisesName"])
-        & df_last_polling_places["DivisionNm"].isin(neighbouring_division[division])
-    ]
-    if not_prepoll:
-        df_subset = df_subset[~df_subset["PollingPlaceNm"].str.contains("PP")]
     return df_last_polling_places, df_subset
 
 
-def load_votes(
-    file_path: str, df_last_polling_places_subset: pd.DataFrame
+@traced
+def filter_votes(
+    df_votes: pd.DataFrame, df_last_polling_places_subset: pd.DataFrame
 ) -> pd.DataFrame:
-    """Load the votes file and filter by polling places."""
-    df_votes = pd.read_csv(file_path, skiprows=1)
-    df_votes_subset = df_votes[
+    """Filter votes by polling places and attach their premises names."""
+    return df_votes[
         df_votes["PollingPlaceID"].isin(df_last_polling_places_subset["PollingPlaceID"])
     ].merge(
         df_last_polling_places_subset[["PremisesNm", "PollingPlaceID"]],
         on="PollingPlaceID",
     )
-    return df_votes_subset
+
+
+@traced
+def load_votes(
+    file_path: str, df_last_polling_places_subset: pd.DataFrame, stream: bool = False
+) -> pd.DataFrame:
+    """Load the votes file and filter by polling places.
+
+    With ``stream`` only the subset's rows are read, in chunks (see
+    ``stream_votes``), instead of the full cached file.
+    """
+    if stream:
+        df_votes = stream_votes(
+            file_path, df_last_polling_places_subset["PollingPlaceID"]
+        )
+    else:
+        df_votes = read_votes(file_path)
+    return filter_votes(df_votes, df_last_polling_places_subset)
+
+
+class Sources(NamedTuple):
+    """Source frames loaded once and partitioned by division name."""
+
+    expected: Dict[str, pd.DataFrame]
+    last_polling_places: Dict[str, pd.DataFrame]
+    votes: Dict[str, pd.DataFrame]
+    states: Dict[str, str]
+    neighbours: Dict[str, List[str]]
+
+
+def _partition(df: pd.DataFrame, by) -> Dict[str, pd.DataFrame]:
+    """Split a frame into a dict of frames keyed by ``by``."""
+    return {key: group for key, group in df.groupby(by, sort=False, observed=True)}
+
+
+def _select(partitions: Dict[str, pd.DataFrame], keys: List[str]) -> pd.DataFrame:
+    """Concatenate the partitions for ``keys``, keeping columns if none exist."""
+    if not partitions:
+        raise KeyError(f"No data loaded for {', '.join(keys)}")
+    frames = [partitions[key] for key in keys if key in partitions]
+    if not frames:
+        return next(iter(partitions.values())).iloc[:0]
+    return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+
+@traced
+def load_sources(
+    divisions: List[str],
+    expected_polling_places_file: Optional[str] = None,
+    last_polling_places_file: Optional[str] = None,
+    votes: Optional[VotesRegistry] = None,
+    neighbour_distance_km: float = DEFAULT_NEIGHBOUR_DISTANCE_KM,
+    stream: bool = False,
+    with_votes: bool = True,
+) -> Sources:
+    """Load each source file once and partition it for the given divisions.
+
+    The gazette is partitioned by ``DivName``, the last polling places and votes
+    by ``DivisionNm``. Votes files are only read from ``votes`` for the states
+    of the requested divisions and their neighbours. Paths and the votes
+    directory default to ``CONFIG``. Each division's neighbours are the
+    last-election divisions with booths within ``neighbour_distance_km`` of its
+    expected premises, and
+    every expected premises is matched to a last-election ``PremisesNm`` among
+    those neighbours in one batched call (see ``match_premises``). With
+    ``stream`` the votes files are streamed for just the booths of the
+    requested divisions and their neighbours (see ``stream_votes``). Without
+    ``with_votes`` no votes are read and the votes partitions start empty, for
+    votes that arrive later (see ``feed.ResultsFeed``).
+    """
+    expected_polling_places_file = (
+        expected_polling_places_file or CONFIG["expected_polling_places_file"]
+    )
+    last_polling_places_file = (
+        last_polling_places_file or CONFIG["last_polling_places_file"]
+    )
+    if not with_votes:
+        votes = VotesRegistry({})
+    elif votes is None:
+        votes = VotesRegistry.from_directory(CONFIG["votes_dir"])
+
+    df_expected = read_expected_polling_places(expected_polling_places_file)
+    df_expected = df_expected[df_expected["Status"] != "Abolition"]
+    states = dict(zip(df_expected["DivName"], df_expected["StateAb"]))
+
+    df_last_polling_places = read_last_polling_places(last_polling_places_file)
+    neighbours = neighbouring_divisions(
+        df_last_polling_places, df_expected, neighbour_distance_km
+    )
+    df_expected = df_expected.join(
+        match_premises(
+            df_expected,
+            df_last_polling_places[
+                ~df_last_polling_places["PollingPlaceNm"].str.contains("PP")
+            ],
+            divisions=neighbours,
+        )
+    )
+
+    wanted_divisions = {n for d in divisions for n in neighbours.get(d, [d])}
+    df_wanted = df_last_polling_places[
+        df_last_polling_places["DivisionNm"].isin(wanted_divisions)
+    ]
+
+    partitions: Dict[str, pd.DataFrame] = {}
+    for state in sorted(df_wanted["State"].unique()):
+        if state not in votes:
+            if with_votes:
+                print(f"No votes file found for {state}.")
+            continue
+        if stream:
+            df_votes = votes.stream(state, df_wanted["PollingPlaceID"])
+        else:
+            df_votes = votes.read(state)
+        partitions.update(_partition(df_votes, "DivisionNm"))
+
+    return Sources(
+        expected=_partition(df_expected, "DivName"),
+        last_polling_places=_partition(df_last_polling_places, "DivisionNm"),
+        votes=partitions,
+        states=states,
+        neighbours=neighbours,
+    )
 
 
 def generate_party_mapping(parties: List[str]) -> Dict[str, str]:
-    """Generate a mapping of party names to categories."""
+    """Generate a mapping of party names to categories.
+
+    Missing party names (informal votes and some independents) are skipped.
+    """
     party_mapping = {}
     for party in parties:
+        if not isinstance(party, str):
+            continue
         if "Labor" in party:
             party_mapping["Labor"] = party
         elif "Greens" in party:
             party_mapping["Greens"] = party
         elif "Liberal" in party and "Democrats" not in party:
             party_mapping["Liberal"] = party
+        elif "National" in party:
+            party_mapping["Nationals"] = party
         elif "Independent" in party:
             party_mapping["Independent"] = party
         elif "One Nation" in party:
@@ -90,65 +443,63 @@ def generate_party_mapping(parties: List[str]) -> Dict[str, str]:
     return party_mapping
 
 
-def pivot_table(df: pd.DataFrame, Party_to_colour: Dict[str, str]) -> pd.Series:
-    """Create a pivot table summarizing votes by party."""
-    votes = {
-        party: df.loc[df["PartyNm"] == party, "OrdinaryVotes"].sum()
-        for party in Party_to_colour
-        if party != "Other"
+@traced
+def party_colours(parties: Iterable[str]) -> Dict[str, str]:
+    """Map the parties present to their map colours, ending with "Other".
+
+    Categories in ``PARTY_COLOURS`` without a candidate are left out, so a seat
+    without, say, a Liberal candidate still gets a map.
+    """
+    party_mapping = generate_party_mapping(parties)
+    Party_to_colour = {
+        party_mapping[category]: colour
+        for category, colour in PARTY_COLOURS.items()
+        if category in party_mapping
     }
-    votes.update(
-        {
-            "Other": df.loc[
-                ~df["PartyNm"].isin(Party_to_colour.keys()), "OrdinaryVotes"
-            ].sum()
-        }
-    )
-    return pd.Series(votes)
+    Party_to_colour["Other"] = "grey"
+    return Party_to_colour
 
 
-def create_map_with_markers(df: pd.DataFrame, division: str) -> None:
-    """Create a map with circle markers for expected polling places."""
-    if df.empty:
-        print("No valid locations found.")
-        exit()
+@traced
+def party_votes_table(
+    df: pd.DataFrame,
+    Party_to_colour: Dict[str, str],
+    by: Union[str, List[str]] = "PremisesNm",
+) -> pd.DataFrame:
+    """Sum ordinary votes by party for each group, bucketing other parties.
 
-    my_map = folium.Map(
-        location=[df["Lat"].median(), df["Long"].median()], zoom_start=13.5
+    Returns one row per group of ``by`` and one column per party in
+    ``Party_to_colour`` (in order) plus "Other", computed with a single
+    ``np.bincount`` over (group, party) codes.
+    """
+    parties = [party for party in Party_to_colour if party != "Other"]
+    columns = parties + ["Other"]
+
+    grouped = df.groupby(by, sort=True, observed=True)
+    group_codes = grouped.ngroup().to_numpy()
+    index = grouped.size().index
+
+    # Parties outside the mapping get code -1, which is moved to the "Other" slot
+    party_codes = pd.Categorical(df["PartyNm"], categories=parties).codes.astype(
+        np.int64
     )
+    party_codes[party_codes < 0] = len(parties)
 
-    for _, row in df.iterrows():
-        total_votes = row["OrdVoteEst"] + row["DecVoteEst"]
-        radius = total_votes / 100
-        wheelchair = row["WheelchairAccess"]
-        color = (
-            "blue"
-            if wheelchair == "Full"
-            else "grey"
-            if wheelchair == "Assisted"
-            else "red"
-        )
-        popup_html = f"""
-            <div style="font-family: Arial; font-size: 14px;">
-                <b style="font-size: 16px; color: darkblue;">{row["PremisesName"]}</b><br>
-                <b>Estimated Ordinary Votes:</b> {row["OrdVoteEst"]}<br>
-                <b>Estimated Declaration Votes:</b> {row["DecVoteEst"]}<br>
-                <b>Wheelchair Access:</b> {row["WheelchairAccess"]}
-            </div>
-        """
-        folium.CircleMarker(
-            location=[row["Lat"], row["Long"]],
-            radius=radius,
-            popup=folium.Popup(popup_html, max_width=300),
-            fill=True,
-            fill_color=color,
-            color=color,
-            fill_opacity=0.6,
-        ).add_to(my_map)
+    valid = group_codes >= 0
+    counts = np.bincount(
+        group_codes[valid] * len(columns) + party_codes[valid],
+        weights=df["OrdinaryVotes"].to_numpy()[valid],
+        minlength=len(index) * len(columns),
+    )
+    return pd.DataFrame(
+        counts.reshape(len(index), len(columns)).astype(df["OrdinaryVotes"].dtype),
+        index=index,
+        columns=columns,
+    )
 
-    # Legend HTML (for both color & size)
 
-    legend_html = """
+# Legend for the booth markers maps (colour & size)
+MARKERS_LEGEND_HTML = """
     <div style="position: fixed; 
                 bottom: 40px; left: 40px; width: 250px; height: 240px; 
                 background-color: white; z-index:9999; 
@@ -184,7 +535,40 @@ def create_map_with_markers(df: pd.DataFrame, division: str) -> None:
     </div>
     """
 
-    # Add legend to the map
+
+# Legend for understaffed booths on markers maps with simulated queues
+QUEUES_LEGEND_HTML = """
+    <div style="position: fixed;
+                bottom: 40px; right: 40px; width: 250px; height: auto;
+                background-color: white; z-index:9999;
+                font-size:14px; padding: 10px;
+                border-radius: 8px; box-shadow: 2px 2px 5px rgba(0,0,0,0.3);">
+        <b>Queues</b><br>
+        <div style="display: flex; align-items: center;">
+            <div style="border: 4px solid black; width: 11px; height: 11px; border-radius: 50%; margin-right: 5px;"></div>
+            Understaffed (long expected peak wait)
+        </div>
+    </div>
+    """
+
+
+def band_columns(party: str) -> Tuple[str, str]:
+    """Return the columns of a party's low and high projected votes, if present."""
+    return f"{party} low", f"{party} high"
+
+
+def _band_html(row: pd.Series, party: str) -> str:
+    """Return a party's projected vote band for a popup, or "" without one."""
+    low, high = band_columns(party)
+    if low not in row or np.isnan(row[low]):
+        return ""
+    return f" ({row[low]:.0f}&ndash;{row[high]:.0f})"
+
+
+def add_legend(my_map: "folium.Map", legend_html: str) -> None:
+    """Add a fixed-position HTML legend to a map."""
+    from branca.element import MacroElement, Template
+
     legend = MacroElement()
     legend._template = Template(f"""
         {{% macro html(this, kwargs) %}}
@@ -194,46 +578,92 @@ def create_map_with_markers(df: pd.DataFrame, division: str) -> None:
 
     my_map.get_root().add_child(legend)
 
-    my_map.save(f"Division_of_{division}_expected_polling_day_locations.html")
-    print("Map with markers has been saved.")
 
+def _queue_html(row: pd.Series) -> str:
+    """Return a booth's simulated peak wait for a popup, or "" without one."""
+    if "PeakWaitMin" not in row:
+        return ""
+    if row["NoIssuingOfficers"]:
+        return "<br><b>Expected peak wait:</b> no issuing officers yet"
+    return f"<br><b>Expected peak wait:</b> {row['PeakWaitMin']:.0f} min"
 
-def create_map_with_pie_charts(
-    df: pd.DataFrame, Party_to_colour: Dict[str, str], name: str
+
+@traced
+def create_map_with_markers(
+    df: pd.DataFrame, division: str, name: Optional[str] = None
 ) -> None:
-    """Create a map with pie chart markers for primary votes."""
+    """Create a map with circle markers for expected polling places.
+
+    The map is saved to ``name``, by default
+    ``Division_of_{division}_expected_polling_day_locations.html``. With the
+    columns of ``simulate_queues`` in ``df``, popups show the expected peak
+    wait and understaffed booths are outlined in black.
+    """
+    import folium
+
     if df.empty:
-        print("No valid locations found.")
-        exit()
+        raise ValueError("No valid locations found.")
 
     my_map = folium.Map(
         location=[df["Lat"].median(), df["Long"].median()], zoom_start=13.5
     )
 
-    def create_pie_chart(row: pd.Series, radius: float) -> str:
-        """Generate a pie chart as an SVG string."""
-        diameter = radius * 2
-        scale_factor = 2
-        px = 1 / plt.rcParams["figure.dpi"]
-        fig, ax = plt.subplots(
-            figsize=(diameter * px * scale_factor, diameter * px * scale_factor)
+    for _, row in df.iterrows():
+        total_votes = row["OrdVoteEst"] + row["DecVoteEst"]
+        radius = total_votes / 100
+        wheelchair = row["WheelchairAccess"]
+        color = (
+            "blue"
+            if wheelchair == "Full"
+            else "grey"
+            if wheelchair == "Assisted"
+            else "red"
         )
-        values = [
-            row.get(party, 0) if not np.isnan(row.get(party, 0)) else 0
-            for party in Party_to_colour.keys()
-        ]
-        colors = list(Party_to_colour.values())
+        popup_html = f"""
+            <div style="font-family: Arial; font-size: 14px;">
+                <b style="font-size: 16px; color: darkblue;">{row["PremisesName"]}</b><br>
+                <b>Estimated Ordinary Votes:</b> {row["OrdVoteEst"]}<br>
+                <b>Estimated Declaration Votes:</b> {row["DecVoteEst"]}<br>
+                <b>Wheelchair Access:</b> {row["WheelchairAccess"]}{_queue_html(row)}
+            </div>
+        """
+        outline = (
+            {"color": "black", "weight": 4}
+            if row.get("Understaffed", False)
+            else {"color": color}
+        )
+        folium.CircleMarker(
+            location=[row["Lat"], row["Long"]],
+            radius=radius,
+            popup=folium.Popup(popup_html, max_width=300),
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.6,
+            **outline,
+        ).add_to(my_map)
+
+    add_legend(my_map, MARKERS_LEGEND_HTML)
+    if "Understaffed" in df:
+        add_legend(my_map, QUEUES_LEGEND_HTML)
+
+    with span("save"):
+        my_map.save(
+            name or f"Division_of_{division}_expected_polling_day_locations.html"
+        )
+    print("Map with markers has been saved.")
+
 
-        ax.pie(values, labels=None, colors=colors, startangle=90)
-        ax.set_xticks([])
-        ax.set_yticks([])
+@traced
+def _add_svg_pies(
+    my_map: "folium.Map",
+    df: pd.DataFrame,
+    Party_to_colour: Dict[str, str],
+    label: str = LAST_ELECTION_LABEL,
+) -> None:
+    """Add a pie chart icon and popup to ``my_map`` for each booth in ``df``."""
+    import folium
 
-        buff = io.StringIO()
-        plt.savefig(buff, format="svg", bbox_inches="tight", transparent=True)
-        buff.seek(0)
-        svg = buff.getvalue()
-        plt.close(fig)
-        return svg
+    from polling_places.pie import pie_svg
 
     for _, row in df.iterrows():
         popup_html = f"""
@@ -255,11 +685,13 @@ def create_map_with_pie_charts(
             popup_html += f"""
                 <b>Total votes:</b> {total_votes}<br>
                 """
+        if row.get(TRANSFERRED_COLUMN, False):
+            popup_html += "<i>Includes votes transferred from nearby booths</i><br>"
 
         radius = total_votes / 100
 
         votes = [
-            f"<b>Last election {party} primary:</b> {row[party]}<br>"
+            f"<b>{label} {party} primary:</b> {row[party]}{_band_html(row, party)}<br>"
             for party in Party_to_colour.keys()
         ]
         popup_html += f"""
@@ -281,7 +713,11 @@ def create_map_with_pie_charts(
                 fill_opacity=0.6,
             ).add_to(my_map)
         else:
-            pie_chart_svg = create_pie_chart(row, radius)
+            pie_chart_svg = pie_svg(
+                [row.get(party, 0) for party in Party_to_colour.keys()],
+                list(Party_to_colour.values()),
+                radius,
+            )
             icon_html = f"<div>{pie_chart_svg}</div>"
             folium.Marker(
                 location=[row["Lat"], row["Long"]],
@@ -289,6 +725,42 @@ def create_map_with_pie_charts(
                 icon=folium.DivIcon(html=icon_html, icon_size=(radius * 2, radius * 2)),
             ).add_to(my_map)
 
+
+@traced
+def create_map_with_pie_charts(
+    df: pd.DataFrame,
+    Party_to_colour: Dict[str, str],
+    name: str,
+    pie_mode: str = "svg",
+    label: str = LAST_ELECTION_LABEL,
+) -> None:
+    """Create a map with pie chart markers for primary votes.
+
+    ``pie_mode`` "svg" embeds a pie icon and popup per booth; "client" embeds
+    the booth data once and draws the pies in the browser (see ``PieLayer``),
+    which keeps the HTML small for large maps. ``label`` says in the popups
+    what the votes are; projected votes (see ``projection.project_votes``) also
+    show their bands.
+    """
+    import folium
+
+    from polling_places.pie_layer import PieLayer, pie_payload
+
+    if pie_mode not in PIE_MODES:
+        raise ValueError(f"Unknown pie mode: {pie_mode}")
+    if df.empty:
+        raise ValueError("No valid locations found.")
+
+    my_map = folium.Map(
+        location=[df["Lat"].median(), df["Long"].median()], zoom_start=13.5
+    )
+
+    if pie_mode == "client":
+        with span("pie_layer"):
+            PieLayer(pie_payload(df, Party_to_colour, label)).add_to(my_map)
+    else:
+        _add_svg_pies(my_map, df, Party_to_colour, label)
+
     party_html = ""
     for party, colour in Party_to_colour.items():
         party_html += f"""
@@ -327,129 +799,402 @@ def create_map_with_pie_charts(
     </div>
 """
 
-    # Add legend to the map
-    legend = MacroElement()
-    legend._template = Template(f"""
-        {{% macro html(this, kwargs) %}}
-        {legend_html}
-        {{% endmacro %}}
-    """)
-
-    my_map.get_root().add_child(legend)
+    add_legend(my_map, legend_html)
 
-    my_map.save(name)
+    with span("save"):
+        my_map.save(name)
     print("Map with pie charts has been saved.")
 
 
-def main(division: str) -> None:
-    neighbouring_division: Dict[str, List[str]] = {
-        "Sydney": ["Sydney", "Grayndler"],
-        "Wentworth": ["Sydney", "Wentworth", "Kingsford Smith"],
-        "Bennelong": ["Bennelong", "North Sydney"],
-        "Ryan": ["Ryan"],
-        "Moreton": ["Moreton"],
-    }
+class RenderResult(NamedTuple):
+    """Outcome of one render task; ``error`` is None when it succeeded."""
 
-    # Load data
-    df_expected = load_expected_polling_places(
-        CONFIG["expected_polling_places_file"], division
-    )
-    df_last_polling_places, df_last_polling_places_subset = load_last_polling_places(
-        CONFIG["last_polling_places_file"],
+    division: str
+    map_name: str
+    error: Optional[str]
+
+
+class DivisionFrames(NamedTuple):
+    """One division's frames, filtered from pre-loaded sources."""
+
+    expected: pd.DataFrame
+    # Polling-day booths at the expected premises, in neighbouring divisions
+    last_polling_places: pd.DataFrame
+    votes: pd.DataFrame
+    # The division's own pre-poll booths
+    last_prepolling_places: pd.DataFrame
+    votes_prepolling: pd.DataFrame
+
+
+@traced
+def filter_division(division: str, sources: Sources) -> DivisionFrames:
+    """Select one division's expected premises, last booths and their votes."""
+    neighbours = sources.neighbours.get(division, [division])
+
+    df_expected = sources.expected[division]
+    df_last_polling_places_subset = filter_last_polling_places(
+        _select(sources.last_polling_places, neighbours),
         df_expected,
-        division,
-        neighbouring_division,
+        neighbours,
         not_prepoll=True,
     )
-    df_votes_subset = load_votes(CONFIG["votes_file"], df_last_polling_places_subset)
+    df_votes_subset = filter_votes(
+        _select(sources.votes, neighbours), df_last_polling_places_subset
+    )
 
-    df_last_prepolling_places_subset = df_last_polling_places.loc[
-        (df_last_polling_places["DivisionNm"] == division)
-        & (df_last_polling_places["PollingPlaceNm"].str.contains("PP"))
+    df_last_division = _select(sources.last_polling_places, [division])
+    df_last_prepolling_places_subset = df_last_division.loc[
+        df_last_division["PollingPlaceNm"].str.contains("PP")
     ]
-
-    df_votes_prepolling = load_votes(
-        CONFIG["votes_file"], df_last_prepolling_places_subset
+    df_votes_prepolling = filter_votes(
+        _select(sources.votes, [division]), df_last_prepolling_places_subset
     )
-
-    # Generate party mapping
-    parties = df_votes_subset["PartyNm"].unique()
-    party_mapping = generate_party_mapping(parties)
-    Party_to_colour = {
-        party_mapping["Labor"]: "red",
-        party_mapping["Liberal"]: "blue",
-        party_mapping["Greens"]: "green",
-    }
-    if "Independent" in party_mapping:
-        Party_to_colour.update(
-            {
-                party_mapping["Independent"]: "lightseagreen",
-            }
-        )
-    if "One Nation" in party_mapping:
-        Party_to_colour.update(
-            {
-                party_mapping["One Nation"]: "orange",
-            }
-        )
-    if "United Australia" in party_mapping:
-        Party_to_colour.update(
-            {
-                party_mapping["United Australia"]: "yellow",
-            }
-        )
-    Party_to_colour.update(
-        {
-            "Other": "grey",
-        }
+    return DivisionFrames(
+        df_expected,
+        df_last_polling_places_subset,
+        df_votes_subset,
+        df_last_prepolling_places_subset,
+        df_votes_prepolling,
     )
 
-    # Process votes by party
-    df_votes_by_party = (
-        df_votes_subset.groupby("PremisesNm", group_keys=False)
-        .apply(lambda x: pivot_table(x, Party_to_colour), include_groups=False)
-        .reset_index()
-        .rename(columns={"PremisesNm": "PremisesName"})
-    )
-    df_primary_votes = df_expected.merge(
-        df_votes_by_party, on="PremisesName", how="left"
-    )
 
-    df_pre_poll_votes_by_party = (
-        df_votes_prepolling.groupby("PremisesNm", group_keys=False)
-        .apply(lambda x: pivot_table(x, Party_to_colour), include_groups=False)
-        .reset_index()
-        # .rename(columns={"PremisesNm": "PremisesName"})
+@traced
+def merge_party_votes(
+    frames: DivisionFrames,
+    df_votes_by_party: pd.DataFrame,
+    df_pre_poll_votes_by_party: pd.DataFrame,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Attach party vote tables to the expected and pre-poll premises to map."""
+    df_primary_votes = frames.expected.merge(
+        df_votes_by_party, on="PremisesNm", how="left"
     )
-    df_primary_votes_prepolling = df_last_prepolling_places_subset.merge(
+    df_primary_votes_prepolling = frames.last_prepolling_places.merge(
         df_pre_poll_votes_by_party, on="PremisesNm", how="left"
     ).rename(
         columns={"Latitude": "Lat", "Longitude": "Long", "PremisesNm": "PremisesName"}
     )
+    return df_primary_votes, df_primary_votes_prepolling
 
-    # Create maps
-    create_map_with_markers(df_expected, division)
-    create_map_with_pie_charts(
-        df_primary_votes,
-        Party_to_colour,
-        name=f"Division_of_{division}_expected_polling_day_locations_primary_vote_last_election.html",
+
+def fill_transferred_votes(
+    df_primary_votes: pd.DataFrame, df_transferred: pd.DataFrame
+) -> pd.DataFrame:
+    """Add the votes transferred to each booth to its own last-election votes.
+
+    ``df_transferred`` is indexed like ``df_primary_votes`` with a column per
+    party (see ``transfer.transfer_votes``). Totals are rounded to whole votes
+    and booths receiving votes are flagged in ``TRANSFERRED_COLUMN``; booths
+    with neither own nor transferred votes stay missing.
+    """
+    parties = list(df_transferred.columns)
+    received = (df_transferred.sum(axis=1) >= 0.5).to_numpy()
+    df = df_primary_votes.copy()
+    df.loc[received, parties] = np.round(
+        df.loc[received, parties].fillna(0).to_numpy()
+        + df_transferred.loc[received, parties].to_numpy()
+    )
+    df[TRANSFERRED_COLUMN] = received
+    return df
+
+
+@traced
+def _transferred_votes(
+    division: str,
+    sources: Sources,
+    df_expected: pd.DataFrame,
+    Party_to_colour: Dict[str, str],
+) -> pd.DataFrame:
+    """Return the votes transferred to each expected booth of ``division``.
+
+    Unmatched polling-day booths of the neighbours are shared among the
+    expected booths of the state without a matched premises, so that boundary
+    booths only get their share and booths with their own history get none.
+    """
+    from polling_places.transfer import transfer_votes, unmatched_polling_places
+
+    neighbours = sources.neighbours.get(division, [division])
+    df_nearby = _select(sources.last_polling_places, neighbours)
+    df_nearby = df_nearby[~df_nearby["PollingPlaceNm"].str.contains("PP")]
+    df_state = _select(
+        sources.expected,
+        [d for d, state in sources.states.items() if state == sources.states[division]],
     )
-    create_map_with_pie_charts(
-        df_primary_votes_prepolling,
+    df_transferred = transfer_votes(
+        df_state[df_state["PremisesNm"].isna()],
+        unmatched_polling_places(df_nearby, df_state, sources.neighbours),
+        _select(sources.votes, neighbours),
         Party_to_colour,
-        name=f"Division_of_{division}_pre_polling_primary_vote_last_election.html",
     )
+    return df_transferred.reindex(df_expected.index, fill_value=0.0)
 
 
-if __name__ == "__main__":
-    main("Sydney")
-    main("Wentworth")
-    main("Bennelong")
-    CONFIG.update(
-        {
-            "votes_file": data
-            / "HouseStateFirstPrefsByPollingPlaceDownload-27966-QLD.csv",
-        }
+def _missing_votes(message: str) -> None:
+    """Render task standing in for a vote map whose votes were not loaded."""
+    raise ValueError(message)
+
+
+def prepare_division(
+    division: str,
+    sources: Sources,
+    pie_mode: str = "svg",
+    projection: bool = False,
+    output_dir: str = "",
+    maps: Optional[Iterable[str]] = None,
+) -> List[Tuple[str, Callable[..., None], tuple]]:
+    """Build one division's frames from pre-loaded sources and return its map tasks.
+
+    Each task is ``(map_name, render, args)``; the args hold only the frames
+    already filtered for the division, so a task can run in another process.
+    ``pie_mode`` is passed to ``create_map_with_pie_charts``. Expected booths
+    also get their share of the votes of nearby closed last-election booths
+    (see ``transfer.transfer_votes``), and the markers map shows each booth's
+    simulated queue (see ``queues.simulate_queues``). With ``projection`` a map
+    of projected votes at the expected booths is added (see
+    ``projection.project_votes``). ``maps`` limits the tasks, and the frames
+    computed, to those of the named ``MAP_NAMES``. Maps are saved in
+    ``output_dir``, by default the working directory. When no votes were loaded
+    for the division or its neighbours (no votes file for its state), its vote
+    map tasks raise instead of drawing every booth grey.
+    """
+    if maps is None:
+        maps = MAP_NAMES if projection else MAP_NAMES[:-1]
+    maps = set(maps)
+
+    frames = filter_division(division, sources)
+    df_expected = frames.expected
+    prefix = os.path.join(output_dir, f"Division_of_{division}")
+    tasks = []
+
+    if "markers" in maps:
+        tasks.append(
+            (
+                "markers",
+                create_map_with_markers,
+                (
+                    df_expected.join(simulate_queues(df_expected)),
+                    division,
+                    f"{prefix}_expected_polling_day_locations.html",
+                ),
+            )
+        )
+    if maps.isdisjoint(MAP_NAMES[1:]):
+        return tasks
+
+    neighbours = sources.neighbours.get(division, [division])
+    if not any(neighbour in sources.votes for neighbour in neighbours):
+        message = (
+            f"No votes loaded for {division} or its neighbours; "
+            f"is there a votes file for {sources.states.get(division)}?"
+        )
+        return tasks + [
+            (name, _missing_votes, (message,)) for name in MAP_NAMES[1:] if name in maps
+        ]
+
+    Party_to_colour = party_colours(frames.votes["PartyNm"].unique())
+
+    if not maps.isdisjoint(["primary_vote", "pre_polling"]):
+        # Process votes by party
+        df_votes_by_party = party_votes_table(
+            frames.votes, Party_to_colour
+        ).reset_index()
+        df_pre_poll_votes_by_party = party_votes_table(
+            frames.votes_prepolling, Party_to_colour
+        ).reset_index()
+        df_primary_votes, df_primary_votes_prepolling = merge_party_votes(
+            frames, df_votes_by_party, df_pre_poll_votes_by_party
+        )
+
+    if "primary_vote" in maps:
+        df_primary_votes = fill_transferred_votes(
+            df_primary_votes,
+            _transferred_votes(
+                division, sources, df_expected, Party_to_colour
+            ).set_axis(df_primary_votes.index),
+        )
+        tasks.append(
+            (
+                "primary_vote",
+                create_map_with_pie_charts,
+                (
+                    df_primary_votes,
+                    Party_to_colour,
+                    f"{prefix}_expected_polling_day_locations_primary_vote_last_election.html",
+                    pie_mode,
+                ),
+            )
+        )
+    if "pre_polling" in maps:
+        tasks.append(
+            (
+                "pre_polling",
+                create_map_with_pie_charts,
+                (
+                    df_primary_votes_prepolling,
+                    Party_to_colour,
+                    f"{prefix}_pre_polling_primary_vote_last_election.html",
+                    pie_mode,
+                ),
+            )
+        )
+    if "projected_vote" in maps:
+        from polling_places.projection import project_votes
+
+        tasks.append(
+            (
+                "projected_vote",
+                create_map_with_pie_charts,
+                (
+                    project_votes(df_expected, frames.votes, Party_to_colour),
+                    Party_to_colour,
+                    f"{prefix}_expected_polling_day_locations_primary_vote_projected.html",
+                    pie_mode,
+                    "Projected",
+                ),
+            )
+        )
+    return tasks
+
+
+def process_division(division: str, sources: Sources) -> None:
+    """Build the maps for one division from pre-loaded, partitioned sources."""
+    for _, render, args in prepare_division(division, sources):
+        render(*args)
+
+
+def _run_task(render: Callable[..., None], args: tuple) -> Optional[str]:
+    """Run one render task, returning its error message instead of raising."""
+    try:
+        render(*args)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def _run_traced_task(
+    render: Callable[..., None], args: tuple, division: str, memory: bool
+) -> Tuple[Optional[str], List[Dict]]:
+    """Run one render task under a span, returning its error and new spans.
+
+    Worker processes start with profiling disabled, so it is enabled here.
+    """
+    if not profiling.is_enabled():
+        profiling.enable(memory)
+    start = len(profiling.records())
+    with span("render", division=division):
+        error = _run_task(render, args)
+    return error, profiling.records()[start:]
+
+
+def _render_all(tasks: List[tuple], jobs: int) -> List[Optional[str]]:
+    """Run ``(index, division, map name, render, args)`` tasks, returning errors.
+
+    While profiling, spans recorded in worker processes are added to this one.
+    """
+    renders = [task[3] for task in tasks]
+    args = [task[4] for task in tasks]
+    if not profiling.is_enabled():
+        if jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                return list(executor.map(_run_task, renders, args))
+        return list(map(_run_task, renders, args))
+
+    task_args = (
+        renders,
+        args,
+        [task[1] for task in tasks],
+        [profiling.memory_enabled()] * len(tasks),
     )
-    main("Moreton")
-    main("Ryan")
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            outcomes = list(executor.map(_run_traced_task, *task_args))
+        for _, spans in outcomes:
+            profiling.add_records(spans)
+    else:
+        outcomes = list(map(_run_traced_task, *task_args))
+    return [error for error, _ in outcomes]
+
+
+@traced
+def run_divisions(
+    divisions: List[str],
+    jobs: int = 1,
+    expected_polling_places_file: Optional[str] = None,
+    stream: bool = False,
+    pie_mode: str = "svg",
+    votes: Optional[VotesRegistry] = None,
+    projection: bool = False,
+) -> List[RenderResult]:
+    """Load every source once and build the maps for each division.
+
+    With ``jobs > 1`` the map renders run in a process pool. A failure in one
+    division or map is recorded in its result rather than stopping the run, and
+    results are returned in division then map order regardless of ``jobs``.
+    ``stream`` reads only the needed votes rows (see ``load_sources``) and
+    ``pie_mode`` selects how pie maps are drawn (see ``create_map_with_pie_charts``).
+    ``votes`` defaults to the files in ``CONFIG["votes_dir"]``, and
+    ``projection`` adds projected vote maps (see ``prepare_division``).
+    """
+    sources = load_sources(
+        divisions,
+        expected_polling_places_file=expected_polling_places_file,
+        votes=votes,
+        stream=stream,
+    )
+    return render_divisions(divisions, sources, jobs, pie_mode, projection)
+
+
+@traced
+def render_divisions(
+    divisions: List[str],
+    sources: Sources,
+    jobs: int = 1,
+    pie_mode: str = "svg",
+    projection: bool = False,
+) -> List[RenderResult]:
+    """Build the maps for each division from pre-loaded sources (see ``run_divisions``)."""
+    results: List[Optional[RenderResult]] = []
+    tasks = []
+    for division in divisions:
+        try:
+            with span("division", division=division):
+                division_tasks = prepare_division(
+                    division, sources, pie_mode, projection
+                )
+        except Exception as e:
+            results.append(
+                RenderResult(division, "prepare", f"{type(e).__name__}: {e}")
+            )
+            continue
+        for map_name, render, args in division_tasks:
+            results.append(None)
+            tasks.append((len(results) - 1, division, map_name, render, args))
+
+    errors = _render_all(tasks, jobs)
+
+    for (i, division, map_name, _, _), error in zip(tasks, errors):
+        results[i] = RenderResult(division, map_name, error)
+
+    for result in results:
+        if result.error:
+            print(f"Division of {result.division} ({result.map_name}): {result.error}")
+    return results
+
+
+def all_divisions(expected_polling_places_file: Optional[str] = None) -> List[str]:
+    """Return the names of every division in the gazette, across all states."""
+    df = read_expected_polling_places(
+        expected_polling_places_file or CONFIG["expected_polling_places_file"]
+    )
+    return sorted(df.loc[df["Status"] != "Abolition", "DivName"].unique())
+
+
+def main(division: str) -> None:
+    run_divisions([division])
+
+
+if __name__ == "__main__":
+    import sys
+
+    from polling_places.cli import main as cli_main
+
+    cli_main(["render", *sys.argv[1:]])
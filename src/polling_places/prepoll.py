@@ -0,0 +1,166 @@
+"""Home and absentee votes cast at shared premises, such as pre-poll centres.
+
+A pre-poll centre issues votes for its own division and, as absentee votes, for
+others: the last election lists one polling place per division served at the
+same premises. ``premises_votes`` breaks the votes at any set of premises down
+by polling day or pre-poll, home or absentee division and party in one grouped
+pass, so whole states can be analysed at once::
+
+    df_last = read_last_polling_places(CONFIG["last_polling_places_file"])
+    centres = prepoll_centres(df_last, "NSW")
+    premises_votes(read_votes(CONFIG["votes_file"]), df_last, centres)
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from polling_places.profiling import traced
+from polling_places.spatial import BoothTree, valid_coordinates
+
+# Nearby single-division booths that vote on a premises' home division
+HOME_NEIGHBOURS = 5
+
+# Columns identifying one premises site; names alone are not unique
+SITE = ["PremisesNm", "Latitude", "Longitude"]
+
+
+def prepoll_centres(df_last: pd.DataFrame, state: Optional[str] = None) -> List[str]:
+    """Return the premises that hosted a pre-poll centre, optionally in one state."""
+    if state:
+        df_last = df_last[df_last["State"] == state]
+    prepoll = df_last["PollingPlaceNm"].str.contains("PP")
+    return sorted(df_last.loc[prepoll, "PremisesNm"].dropna().unique())
+
+
+def home_divisions(df_last: pd.DataFrame, premises: List[str]) -> pd.Series:
+    """Return the division each premises site lies in, indexed by ``SITE``.
+
+    Sites are told apart by location as well as name, as unrelated premises
+    share names ("Cavanbah Centre"). Shared premises host a polling place for
+    every division they serve, so the home division is taken from the
+    ``HOME_NEIGHBOURS`` nearest polling-day booths in the same state at premises
+    serving only one division: the most common of them among the divisions the
+    site serves, or of all of them if it serves none. Each state is one KD-tree
+    query; sites without coordinates are left out.
+    """
+    located = df_last[valid_coordinates(df_last["Latitude"], df_last["Longitude"])]
+    served = (
+        located.loc[located["PremisesNm"].isin(premises), SITE + ["State"]]
+        .assign(DivisionNm=located["DivisionNm"].astype(object), Served=True)
+        .drop_duplicates()
+    )
+    sites = served.drop_duplicates(SITE)
+    single = located[
+        ~located["PollingPlaceNm"].str.contains("PP")
+        & (
+            located.groupby(["Latitude", "Longitude"])["DivisionNm"].transform(
+                "nunique"
+            )
+            == 1
+        )
+        & ~located["PremisesNm"].isin(premises)
+    ]
+
+    frames = []
+    for state, df_sites in sites.groupby("State", observed=True):
+        df_single = single[single["State"] == state]
+        if df_single.empty:
+            continue
+        k = min(HOME_NEIGHBOURS, len(df_single))
+        _, index = BoothTree(df_single["Latitude"], df_single["Longitude"]).nearest(
+            df_sites["Latitude"], df_sites["Longitude"], k=k
+        )
+        frames.append(
+            pd.DataFrame(
+                {
+                    **{
+                        column: np.repeat(df_sites[column].to_numpy(), k)
+                        for column in SITE
+                    },
+                    "DivisionNm": df_single["DivisionNm"]
+                    .astype(object)
+                    .to_numpy()[np.asarray(index).reshape(len(df_sites), k).ravel()],
+                }
+            )
+        )
+    if not frames:
+        return pd.Series(
+            [], index=pd.MultiIndex.from_tuples([], names=SITE), dtype=object
+        )
+
+    counts = (
+        pd.concat(frames)
+        .groupby(SITE + ["DivisionNm"], observed=True)
+        .size()
+        .reset_index(name="n")
+        .merge(served[SITE + ["DivisionNm", "Served"]], how="left")
+    )
+    counts["Served"] = counts["Served"].notna()
+    # Served, then most common division first, ties broken alphabetically
+    return (
+        counts.sort_values(["Served", "n"], ascending=False, kind="stable")
+        .drop_duplicates(SITE)
+        .set_index(SITE)["DivisionNm"]
+        .rename("HomeDivision")
+    )
+
+
+@traced
+def premises_votes(
+    df_votes: pd.DataFrame,
+    df_last: pd.DataFrame,
+    premises: List[str],
+    Party_to_colour: Optional[Dict[str, str]] = None,
+    home: Optional[Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """Sum the ordinary votes at each premises by voting period, voters and party.
+
+    Returns a tidy frame with one row per ``PremisesNm``, ``HomeDivision``,
+    ``Voting`` ("Polling day" or "Pre-poll"), ``Voters`` ("Home" when cast for
+    the premises' home division, otherwise "Absentee") and ``Party``, with the
+    ``Votes``. Home divisions come from ``home_divisions`` unless given by
+    premises name in ``home``, which then applies to every site of that name.
+    With ``Party_to_colour`` parties outside it are summed as "Other", as in
+    ``party_votes_table``.
+    """
+    places = df_last.loc[
+        df_last["PremisesNm"].isin(premises),
+        ["PollingPlaceID", "PollingPlaceNm"] + SITE,
+    ]
+    df = (
+        df_votes.loc[
+            df_votes["PollingPlaceID"].isin(places["PollingPlaceID"]),
+            ["PollingPlaceID", "DivisionNm", "PartyNm", "OrdinaryVotes"],
+        ]
+        .merge(places, on="PollingPlaceID")
+        .merge(home_divisions(df_last, premises).reset_index(), on=SITE, how="left")
+    )
+
+    home_division = df["HomeDivision"].astype(object)
+    if home:
+        home_division = df["PremisesNm"].astype(object).map(home).fillna(home_division)
+    party = df["PartyNm"].astype(object)
+    if Party_to_colour is not None:
+        party = party.where(party.isin(list(Party_to_colour)), "Other")
+
+    keys = pd.DataFrame(
+        {
+            "PremisesNm": df["PremisesNm"],
+            "HomeDivision": home_division,
+            "Voting": np.where(
+                df["PollingPlaceNm"].str.contains("PP"), "Pre-poll", "Polling day"
+            ),
+            "Voters": np.where(
+                df["DivisionNm"].astype(object) == home_division, "Home", "Absentee"
+            ),
+            "Party": party.fillna("Informal"),
+        }
+    )
+    return (
+        df["OrdinaryVotes"]
+        .groupby([keys[column] for column in keys.columns], dropna=False)
+        .sum()
+        .reset_index(name="Votes")
+    )
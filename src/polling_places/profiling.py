@@ -0,0 +1,212 @@
+"""Opt-in spans recording wall time, rows and peak allocation per pipeline stage.
+
+Functions decorated with ``traced`` and blocks wrapped in ``span`` are timed
+only while profiling is enabled; when it is disabled the cost is one flag check
+per call. Spans nest, inherit the division they run under, and can be written
+as a JSON report or as folded stacks for flame graph tools.
+"""
+
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+_enabled = False
+_memory = False
+_records: List[Dict[str, Any]] = []
+_local = threading.local()
+
+
+class Span:
+    """An open span; set ``rows_out`` when the result is not a frame."""
+
+    def __init__(
+        self, name: str, division: Optional[str], rows_in: Optional[int]
+    ) -> None:
+        self.name = name
+        self.division = division
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self.children_s = 0.0
+        self.peak = 0
+
+
+def enable(memory: bool = True) -> None:
+    """Start recording spans, tracing allocations too when ``memory`` is set."""
+    global _enabled, _memory
+    _enabled = True
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable() -> None:
+    """Stop recording spans (already recorded spans are kept)."""
+    global _enabled
+    _enabled = False
+    if _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def memory_enabled() -> bool:
+    return _enabled and _memory
+
+
+def reset() -> None:
+    """Forget all recorded spans."""
+    _records.clear()
+
+
+def records() -> List[Dict[str, Any]]:
+    """Return the spans recorded so far, in the order they finished."""
+    return list(_records)
+
+
+def add_records(spans: List[Dict[str, Any]]) -> None:
+    """Add spans recorded elsewhere, such as in a worker process."""
+    _records.extend(spans)
+
+
+def count_rows(value: Any) -> Optional[int]:
+    """Return the rows in a frame, or in the frames of a tuple, list or dict."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (tuple, list)):
+        counts = [count_rows(item) for item in value]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def _stack() -> List[Span]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def span(
+    name: str, division: Optional[str] = None, rows_in: Optional[int] = None
+) -> Iterator[Optional[Span]]:
+    """Record the enclosed block as a span named ``name``.
+
+    The span inherits its parent's division unless ``division`` is given.
+    Yields None when profiling is disabled.
+    """
+    if not _enabled:
+        yield None
+        return
+
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    current = Span(name, division or (parent.division if parent else None), rows_in)
+    if _memory:
+        traced_now, traced_peak = tracemalloc.get_traced_memory()
+        if parent:
+            # Resetting the peak below would lose the parent's peak so far
+            parent.peak = max(parent.peak, traced_peak)
+        tracemalloc.reset_peak()
+        start_memory = traced_now
+    path = ";".join([s.name for s in stack] + [name])
+    stack.append(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        wall = time.perf_counter() - start
+        stack.pop()
+        peak_bytes = None
+        if _memory:
+            current.peak = max(current.peak, tracemalloc.get_traced_memory()[1])
+            peak_bytes = current.peak - start_memory
+            if parent:
+                parent.peak = max(parent.peak, current.peak)
+        if parent:
+            parent.children_s += wall
+        _records.append(
+            {
+                "name": name,
+                "path": path,
+                "division": current.division,
+                "wall_s": wall,
+                "self_s": max(wall - current.children_s, 0.0),
+                "rows_in": current.rows_in,
+                "rows_out": current.rows_out,
+                "peak_bytes": peak_bytes,
+            }
+        )
+
+
+def traced(fn: Callable) -> Callable:
+    """Record each call of ``fn`` as a span, with rows of frames in and out."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return fn(*args, **kwargs)
+        rows_in = count_rows(list(args) + list(kwargs.values()))
+        with span(fn.__name__, rows_in=rows_in) as current:
+            result = fn(*args, **kwargs)
+            current.rows_out = count_rows(result)
+            return result
+
+    return wrapper
+
+
+def summary(spans: Optional[List[Dict[str, Any]]] = None) -> pd.DataFrame:
+    """Total calls, wall and self time and the largest peak allocation by span name."""
+    df = pd.DataFrame(records() if spans is None else spans)
+    if df.empty:
+        return df
+    return (
+        df.groupby("name")
+        .agg(
+            calls=("wall_s", "size"),
+            wall_s=("wall_s", "sum"),
+            self_s=("self_s", "sum"),
+            peak_bytes=("peak_bytes", "max"),
+        )
+        .sort_values("self_s", ascending=False)
+    )
+
+
+def folded_stacks(spans: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Return self time in microseconds per stack, in the folded flame graph format."""
+    totals: Dict[str, float] = defaultdict(float)
+    for record in records() if spans is None else spans:
+        totals[record["path"]] += record["self_s"]
+    return "".join(
+        f"{path} {round(seconds * 1e6)}\n" for path, seconds in sorted(totals.items())
+    )
+
+
+def write_report(path: str) -> None:
+    """Write the recorded spans: folded stacks for ``.folded``/``.txt``, else JSON."""
+    if path.endswith((".folded", ".txt")):
+        text = folded_stacks()
+    else:
+        text = json.dumps(
+            {
+                "spans": records(),
+                "summary": summary()
+                .reset_index()
+                .astype(object)
+                .where(lambda df: df.notna(), None)
+                .to_dict(orient="records"),
+            },
+            indent=2,
+        )
+    with open(path, "w") as f:
+        f.write(text)
@@ -0,0 +1,124 @@
+"""Queue simulation at every booth from its vote estimates and issuing officers.
+
+Voters arrive over polling hours following ``ARRIVAL_PROFILE`` and are issued
+ballot papers by the gazette's ordinary (``NoOrdIssuingOff``) and declaration
+(``NoOfDecIssuingOff``) issuing officers. Each run draws Poisson arrivals for
+all ``booths x time steps`` at once and the queue follows from the Lindley
+recursion in closed form: with ``S`` the running sum of arrivals less
+capacity, the queue is ``S - min(0, running min of S)``. Runs are averaged into
+expected peak queues and waits; the whole country takes a few seconds.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from polling_places.profiling import traced
+
+# Share of the day's voters arriving in each polling hour, 8 am to 6 pm
+ARRIVAL_PROFILE = np.array([0.11, 0.12, 0.12, 0.11, 0.10, 0.10, 0.09, 0.09, 0.08, 0.08])
+
+STEP_MINUTES = 5
+
+# Voters one issuing officer serves per hour: about a minute per ordinary vote
+# and three per declaration vote. The gazette allocates an officer per 400
+# expected ordinary or 125 declaration votes, so in the busiest hour (12% of
+# the day) a fully loaded officer meets 48 or 15 voters and, at these rates, a
+# booth staffed to the AEC's own ratio queues for well under the default limit.
+ORDINARY_PER_HOUR = 60
+DECLARATION_PER_HOUR = 20
+
+# Booths whose expected peak wait exceeds this are understaffed
+DEFAULT_MAX_WAIT_MINUTES = 20.0
+
+DEFAULT_RUNS = 20
+
+
+def _arrival_rates(votes: np.ndarray) -> np.ndarray:
+    """Return expected arrivals per time step as a ``booths x steps`` array."""
+    steps_per_hour = 60 // STEP_MINUTES
+    profile = np.repeat(ARRIVAL_PROFILE / ARRIVAL_PROFILE.sum(), steps_per_hour)
+    return votes[:, None] * profile[None, :] / steps_per_hour
+
+
+def _queue(arrivals: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+    """Return the queue after each step, for ``booths x steps`` arrivals."""
+    net = np.cumsum(arrivals - capacity[:, None], axis=1)
+    return net - np.minimum.accumulate(np.minimum(net, 0), axis=1)
+
+
+def _simulate(
+    votes: np.ndarray,
+    officers: np.ndarray,
+    per_hour: float,
+    runs: int,
+    rng: np.random.Generator,
+) -> pd.DataFrame:
+    """Return expected peak queue and peak and mean wait in minutes per booth."""
+    rates = _arrival_rates(votes.astype(float))
+    capacity = officers.astype(float) * per_hour * STEP_MINUTES / 60
+    peak_queue = np.zeros(len(votes))
+    queue_steps = np.zeros(len(votes))
+    for _ in range(runs):
+        queue = _queue(rng.poisson(rates), capacity)
+        peak_queue += queue.max(axis=1)
+        queue_steps += queue.sum(axis=1)
+    peak_queue /= runs
+    staffed = officers > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peak_wait = peak_queue / (officers * per_hour / 60)
+        # Little's law: mean wait is time spent queueing over voters served
+        mean_wait = queue_steps / runs * STEP_MINUTES / votes
+    return pd.DataFrame(
+        {
+            "PeakQueue": peak_queue,
+            "PeakWaitMin": np.where(staffed, peak_wait, np.nan),
+            "MeanWaitMin": np.where(
+                staffed, np.where(votes > 0, mean_wait, 0.0), np.nan
+            ),
+        }
+    )
+
+
+@traced
+def simulate_queues(
+    df_expected: pd.DataFrame,
+    max_wait_minutes: float = DEFAULT_MAX_WAIT_MINUTES,
+    runs: int = DEFAULT_RUNS,
+    seed: Optional[int] = 0,
+    ordinary_per_hour: float = ORDINARY_PER_HOUR,
+    declaration_per_hour: float = DECLARATION_PER_HOUR,
+) -> pd.DataFrame:
+    """Simulate polling-day queues at every booth in ``df_expected``.
+
+    Returns a frame indexed like ``df_expected`` with the expected peak queue
+    and peak and mean wait (minutes) for ordinary (``Ord``) and declaration
+    (``Dec``) voters, ``PeakWaitMin`` as the larger peak wait, ``Understaffed``
+    when it exceeds ``max_wait_minutes`` and ``NoIssuingOfficers`` for booths
+    expecting votes of a kind without officers to issue them (their waits are
+    NaN). ``ordinary_per_hour`` and ``declaration_per_hour`` are the voters one
+    officer issues per hour.
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+    for prefix, votes, officers, per_hour in (
+        ("Ord", "OrdVoteEst", "NoOrdIssuingOff", ordinary_per_hour),
+        ("Dec", "DecVoteEst", "NoOfDecIssuingOff", declaration_per_hour),
+    ):
+        frames.append(
+            _simulate(
+                df_expected[votes].to_numpy(),
+                df_expected[officers].to_numpy(),
+                per_hour,
+                runs,
+                rng,
+            ).add_prefix(prefix)
+        )
+    df = pd.concat(frames, axis=1).set_axis(df_expected.index)
+    df["PeakWaitMin"] = df[["OrdPeakWaitMin", "DecPeakWaitMin"]].max(axis=1)
+    df["Understaffed"] = df["PeakWaitMin"] > max_wait_minutes
+    df["NoIssuingOfficers"] = (
+        (df_expected["OrdVoteEst"] > 0) & (df_expected["NoOrdIssuingOff"] == 0)
+    ) | ((df_expected["DecVoteEst"] > 0) & (df_expected["NoOfDecIssuingOff"] == 0))
+    return df
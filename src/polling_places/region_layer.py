@@ -0,0 +1,78 @@
+"""Folium element drawing booths as canvas markers in one layer per division.
+
+The booths are embedded once as the columnar payload of
+``region_maps.booth_features``; a shared script turns them into GeoJSON points
+in a toggleable layer per division and builds each popup only when it is
+opened.
+"""
+
+import json
+from typing import Dict
+
+from branca.element import MacroElement, Template
+
+DIVISION_LAYERS_TEMPLATE = """
+{% macro script(this, kwargs) %}
+(function () {
+    var data = {{ this.payload }};
+    var map = {{ this._parent.get_name() }};
+    var renderer = L.canvas({padding: 0.5});
+
+    function escape(text) {
+        return String(text).replace(/[&<>"']/g, function (c) {
+            return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+        });
+    }
+
+    var b = data.booths;
+
+    function popup(layer) {
+        var i = layer.feature.properties.i;
+        var note = b.note ? b.note[i] : "";
+        return '<div style="font-family: Arial; font-size: 14px;">' +
+            '<b style="font-size: 16px; color: darkblue;">' + escape(b.name[i]) +
+            "</b><br><b>Division:</b> " + escape(data.divisions[b.d[i]]) + "<br>" +
+            "<b>Estimated Ordinary Votes:</b> " + b.ord[i] + "<br>" +
+            "<b>Estimated Declaration Votes:</b> " + b.dec[i] + "<br>" +
+            "<b>Wheelchair Access:</b> " + escape(b.wheelchair[i]) +
+            (note ? "<br>" + escape(note) : "") + "</div>";
+    }
+
+    var buckets = data.divisions.map(function () { return []; });
+    b.d.forEach(function (d, i) {
+        buckets[d].push({
+            type: "Feature",
+            geometry: {type: "Point", coordinates: [b.long[i], b.lat[i]]},
+            properties: {i: i}
+        });
+    });
+
+    var overlays = {};
+    buckets.forEach(function (features, d) {
+        var layer = L.geoJSON({type: "FeatureCollection", features: features}, {
+            pointToLayer: function (feature, latlng) {
+                var i = feature.properties.i;
+                return L.circleMarker(latlng, {
+                    renderer: renderer, radius: b.r[i], fill: true,
+                    fillColor: b.c[i], color: b.c[i], fillOpacity: 0.6
+                });
+            }
+        }).bindPopup(popup, {maxWidth: 300}).addTo(map);
+        overlays[data.divisions[d]] = layer;
+    });
+    L.control.layers(null, overlays, {collapsed: true}).addTo(map);
+})();
+{% endmacro %}
+"""
+
+
+class DivisionLayers(MacroElement):
+    """Folium element drawing ``booth_features`` as one layer per division."""
+
+    _template = Template(DIVISION_LAYERS_TEMPLATE)
+
+    def __init__(self, payload: Dict) -> None:
+        super().__init__()
+        self._name = "DivisionLayers"
+        # "</" would end the script element early if a name contained it
+        self.payload = json.dumps(payload, separators=(",", ":")).replace("</", "<\\/")
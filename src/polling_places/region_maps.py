@@ -0,0 +1,132 @@
+"""State-wide and national maps of expected polling places.
+
+All booths are embedded once as columnar arrays taken straight from the
+gazette frame, and a shared script draws them as canvas circle markers in one
+toggleable layer per division, with popups built only when opened. This keeps
+a map of the whole country (about 8,000 booths) responsive.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from polling_places.polling_places import (
+    CONFIG,
+    MARKERS_LEGEND_HTML,
+    add_legend,
+    read_expected_polling_places,
+)
+from polling_places.spatial import valid_coordinates
+
+# Region name for a map of every state and territory
+NATIONAL = "AUS"
+
+# Marker colours by WheelchairAccess, as on the division markers maps
+WHEELCHAIR_COLOURS = {"Full": "blue", "Assisted": "grey"}
+NO_ACCESS_COLOUR = "red"
+
+
+def booth_features(
+    df: pd.DataFrame,
+    colours: Optional[pd.Series] = None,
+    notes: Optional[pd.Series] = None,
+) -> Dict:
+    """Return expected booths as columnar arrays under ``booths``, with their divisions.
+
+    Each array is one column of the gazette frame: premises ``name``, division
+    index ``d`` into the returned ``divisions``, ``lat`` and ``long``, vote
+    estimates, wheelchair access and the marker colour ``c`` and radius ``r``
+    used on the division markers maps. ``colours`` (indexed like ``df``)
+    replaces the wheelchair colours, and ``notes`` adds a ``note`` column shown
+    as a line in each popup where it is not empty. Booths without coordinates
+    are left out.
+    """
+    df = df[valid_coordinates(df["Lat"], df["Long"])].sort_values(
+        ["DivName", "PremisesName"]
+    )
+    divisions, division_codes = np.unique(
+        df["DivName"].astype(str).to_numpy(), return_inverse=True
+    )
+    wheelchair = df["WheelchairAccess"].astype(object)
+    if colours is None:
+        colours = wheelchair.map(WHEELCHAIR_COLOURS).fillna(NO_ACCESS_COLOUR)
+    else:
+        colours = colours.reindex(df.index)
+
+    booths = {
+        "name": df["PremisesName"].fillna("").tolist(),
+        "d": division_codes.tolist(),
+        "lat": df["Lat"].round(6).tolist(),
+        "long": df["Long"].round(6).tolist(),
+        "ord": df["OrdVoteEst"].astype(int).tolist(),
+        "dec": df["DecVoteEst"].astype(int).tolist(),
+        "wheelchair": wheelchair.where(wheelchair.notna(), "No information").tolist(),
+        "c": colours.tolist(),
+        "r": ((df["OrdVoteEst"] + df["DecVoteEst"]) / 100).round(2).tolist(),
+    }
+    if notes is not None:
+        booths["note"] = notes.reindex(df.index).fillna("").tolist()
+    return {"divisions": divisions.tolist(), "booths": booths}
+
+
+def select_region(df_expected: pd.DataFrame, region: str) -> pd.DataFrame:
+    """Return the current booths in a state (``StateAb``) or, for ``NATIONAL``, all."""
+    df = df_expected[df_expected["Status"] != "Abolition"]
+    if region != NATIONAL:
+        df = df[df["StateAb"] == region]
+    return df
+
+
+def create_region_map(
+    df: pd.DataFrame,
+    name: str,
+    colours: Optional[pd.Series] = None,
+    notes: Optional[pd.Series] = None,
+    legend_html: str = MARKERS_LEGEND_HTML,
+) -> None:
+    """Create a map of expected polling places with a toggleable layer per division.
+
+    ``colours`` and ``notes`` are passed to ``booth_features``.
+    """
+    import folium
+
+    from polling_places.region_layer import DivisionLayers
+
+    if df.empty:
+        raise ValueError("No valid locations found.")
+
+    payload = booth_features(df, colours, notes)
+    lat, long = payload["booths"]["lat"], payload["booths"]["long"]
+    if not lat:
+        raise ValueError("No valid locations found.")
+
+    my_map = folium.Map(prefer_canvas=True)
+    my_map.fit_bounds([[min(lat), min(long)], [max(lat), max(long)]])
+    DivisionLayers(payload).add_to(my_map)
+    add_legend(my_map, legend_html)
+
+    my_map.save(name)
+    print(f"Map of {len(lat)} booths has been saved.")
+
+
+def region_map_name(region: str) -> str:
+    """Return the file name of a state or national markers map."""
+    if region == NATIONAL:
+        return "Australia_expected_polling_day_locations.html"
+    return f"State_of_{region}_expected_polling_day_locations.html"
+
+
+def build_region_maps(
+    regions: List[str], expected_polling_places_file: Optional[str] = None
+) -> None:
+    """Build the markers map for each state or ``NATIONAL`` from one gazette read."""
+    df_expected = read_expected_polling_places(
+        expected_polling_places_file or CONFIG["expected_polling_places_file"]
+    )
+    for region in regions:
+        df = select_region(df_expected, region)
+        if df.empty:
+            print(f"No expected polling places for {region}.")
+            continue
+        create_region_map(df, region_map_name(region))
@@ -0,0 +1,135 @@
+"""Column types for the gazette and AEC downloads, applied when they are parsed.
+
+Low-cardinality text is categorical, identifiers and counts use the narrowest
+integer type that holds them, coordinates are float64 and names are stripped of
+the gazette's padding. ``polling-places memory`` prints how much memory the
+schema saves on the configured files.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import pandas as pd
+
+
+class Schema(NamedTuple):
+    """Dtypes for a file's columns, and the columns needing extra parsing."""
+
+    dtypes: Dict[str, str]
+    # Names stripped of padding before any categorical conversion
+    strip: List[str]
+    # Parsed as float64, with blanks and stray text becoming NaN
+    coordinates: List[str]
+
+
+EXPECTED_POLLING_PLACES = Schema(
+    dtypes={
+        "StateCo": "int16",
+        "StateAb": "category",
+        "DivName": "category",
+        "DivId": "int16",
+        "DivCo": "int16",
+        "Status": "category",
+        "AddrStateAb": "category",
+        "Postcode": "float32",
+        "PPId": "int32",
+        "CCD": "int32",
+        "WheelchairAccess": "category",
+        "OrdVoteEst": "int32",
+        "DecVoteEst": "int32",
+        "NoOrdIssuingOff": "int16",
+        "NoOfDecIssuingOff": "int16",
+    },
+    strip=["DivName", "PPName", "PremisesName"],
+    coordinates=["Lat", "Long"],
+)
+
+LAST_POLLING_PLACES = Schema(
+    dtypes={
+        "State": "category",
+        "DivisionID": "int16",
+        "DivisionNm": "category",
+        "PollingPlaceID": "int32",
+        "PollingPlaceTypeID": "int16",
+        "PremisesStateAb": "category",
+        "PremisesPostCode": "float32",
+    },
+    strip=["DivisionNm", "PollingPlaceNm", "PremisesNm"],
+    coordinates=["Latitude", "Longitude"],
+)
+
+VOTES = Schema(
+    dtypes={
+        "StateAb": "category",
+        "DivisionID": "int16",
+        "DivisionNm": "category",
+        "PollingPlaceID": "int32",
+        "PollingPlace": "category",
+        "CandidateID": "int32",
+        "Surname": "category",
+        "GivenNm": "category",
+        "BallotPosition": "int16",
+        "Elected": "category",
+        "HistoricElected": "category",
+        "PartyAb": "category",
+        "PartyNm": "category",
+        "OrdinaryVotes": "int32",
+        "Swing": "float32",
+    },
+    strip=["DivisionNm", "PollingPlace"],
+    coordinates=[],
+)
+
+
+def csv_dtypes(
+    schema: Schema, columns: Optional[Iterable[str]] = None
+) -> Dict[str, object]:
+    """Return ``read_csv`` dtypes for ``columns`` that are safe to parse per chunk.
+
+    Categorical and stripped columns are read as objects, since categories
+    differ between chunks and padding must go before categorising; call
+    ``apply_schema`` on the combined frame.
+    """
+    columns = schema.dtypes if columns is None else columns
+    dtypes: Dict[str, object] = {}
+    for column in columns:
+        dtype = schema.dtypes.get(column)
+        if dtype is None or column in schema.coordinates:
+            continue
+        if dtype == "category" or column in schema.strip:
+            dtypes[column] = object
+        else:
+            dtypes[column] = dtype
+    return dtypes
+
+
+def apply_schema(df: pd.DataFrame, schema: Schema) -> pd.DataFrame:
+    """Return ``df`` with the schema's stripping, coordinates and dtypes applied.
+
+    Columns the schema names but ``df`` lacks (for example after ``usecols``)
+    are skipped.
+    """
+    df = df.copy()
+    for column in schema.strip:
+        if column in df:
+            df[column] = df[column].str.strip()
+    for column in schema.coordinates:
+        if column in df:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+    return df.astype(
+        {column: dtype for column, dtype in schema.dtypes.items() if column in df}
+    )
+
+
+def memory_report(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Return the rows, columns and deep memory use in MB of each frame."""
+    return pd.DataFrame(
+        [
+            {
+                "frame": name,
+                "rows": len(df),
+                "columns": df.shape[1],
+                "memory_mb": df.memory_usage(deep=True).sum() / 1e6,
+            }
+            for name, df in frames.items()
+        ]
+    ).set_index("frame")
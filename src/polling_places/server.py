@@ -0,0 +1,342 @@
+"""Local HTTP server rendering division maps on demand.
+
+The sources are loaded once (see ``load_sources``) and each map is rendered
+the first time it is requested, at ``/<division>/<map>`` where ``map`` is one
+of ``MAP_NAMES``. The rendered HTML is kept in a ``MapCache``, an LRU cache
+bounded by its total size in bytes, so later requests are answered from
+memory.
+
+At most every ``CHECK_SECONDS`` the source files are checked for changes. A
+new gazette snapshot, or a changed gazette, only drops the maps of the
+divisions whose booths changed and of their neighbours (see
+``snapshots.diff_snapshots`` and ``affected_divisions``). A changed
+polling places or votes file drops every map. Either way the sources are
+reloaded first.
+"""
+
+import collections
+import html
+import pathlib
+import tempfile
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from polling_places.polling_places import (
+    CONFIG,
+    MAP_NAMES,
+    VotesRegistry,
+    load_sources,
+    prepare_division,
+    read_expected_polling_places,
+)
+from polling_places.profiling import traced
+from polling_places.snapshots import changed_divisions, diff_snapshots, list_snapshots
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+
+# Total size of the rendered maps kept in memory
+DEFAULT_CACHE_BYTES = 256 * 2**20
+
+# Seconds between checks of the source files for changes
+CHECK_SECONDS = 1.0
+
+
+class MapCache:
+    """Rendered maps keyed by ``(division, map)``, least recently used first out.
+
+    Entries are evicted once their HTML totals more than ``max_bytes``; a map
+    larger than that on its own is not kept.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "collections.OrderedDict[Tuple[str, str], bytes]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+            return content
+
+    def put(self, key: Tuple[str, str], content: bytes) -> None:
+        with self._lock:
+            self._pop(key)
+            if len(content) > self.max_bytes:
+                return
+            self._entries[key] = content
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, divisions: Iterable[str]) -> None:
+        """Drop every map of the given divisions."""
+        divisions = set(divisions)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in divisions]:
+                self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _pop(self, key: Tuple[str, str]) -> None:
+        content = self._entries.pop(key, None)
+        if content is not None:
+            self.size -= len(content)
+
+
+def affected_divisions(
+    changed: Iterable[str], neighbours: Dict[str, List[str]]
+) -> List[str]:
+    """Return the changed divisions and every division neighbouring one.
+
+    A division's maps share votes with its neighbours' booths (see
+    ``load_sources``), so a change on either side of a boundary affects both.
+    """
+    changed = set(changed)
+    affected = set(changed)
+    for division, nearby in neighbours.items():
+        if division in changed:
+            affected.update(nearby)
+        elif changed.intersection(nearby):
+            affected.add(division)
+    return sorted(affected)
+
+
+class MapServer:
+    """Sources, rendered maps and change detection behind the HTTP handler.
+
+    With ``gazette_dir`` the latest gazette snapshot in that directory (see
+    ``snapshots.list_snapshots``) is served instead of
+    ``CONFIG["expected_polling_places_file"]``, and newer snapshots are picked
+    up as they are written.
+    """
+
+    def __init__(
+        self,
+        pie_mode: str = "svg",
+        max_bytes: int = DEFAULT_CACHE_BYTES,
+        gazette_dir: Optional[str] = None,
+    ) -> None:
+        self.pie_mode = pie_mode
+        self.gazette_dir = gazette_dir
+        self.cache = MapCache(max_bytes)
+        self._render_lock = threading.Lock()
+        # Guards _checked and _versions; taken before _render_lock
+        self._check_lock = threading.Lock()
+        self._checked = 0.0
+        self._versions: Dict[pathlib.Path, Tuple[int, int]] = {}
+        self._load(self._source_files())
+
+    def _expected_file(self) -> pathlib.Path:
+        if self.gazette_dir:
+            snapshots = list_snapshots(self.gazette_dir)
+            if snapshots:
+                return list(snapshots.values())[-1]
+        return pathlib.Path(CONFIG["expected_polling_places_file"])
+
+    def _source_files(self) -> List[pathlib.Path]:
+        """Return the gazette, then every other source file."""
+        return [
+            self._expected_file(),
+            pathlib.Path(CONFIG["last_polling_places_file"]),
+            *VotesRegistry.from_directory(CONFIG["votes_dir"]).files.values(),
+        ]
+
+    @traced
+    def _load(self, files: List[pathlib.Path]) -> None:
+        self.expected_file = files[0]
+        self.df_expected = read_expected_polling_places(self.expected_file)
+        self.divisions = sorted(
+            self.df_expected.loc[
+                self.df_expected["Status"] != "Abolition", "DivName"
+            ].unique()
+        )
+        self.sources = load_sources(
+            self.divisions, expected_polling_places_file=self.expected_file
+        )
+        self._versions = {path: _version(path) for path in files}
+
+    def refresh(self) -> None:
+        """Reload the sources and drop stale maps if any source file changed."""
+        with self._check_lock:
+            now = time.monotonic()
+            if now - self._checked < CHECK_SECONDS:
+                return
+            self._checked = now
+            files = self._source_files()
+            versions = {path: _version(path) for path in files}
+            if versions == self._versions:
+                return
+            with self._render_lock:
+                self._reload(files, versions)
+
+    def _reload(
+        self, files: List[pathlib.Path], versions: Dict[pathlib.Path, Tuple[int, int]]
+    ) -> None:
+        """Reload changed sources and drop the maps they make stale."""
+        df_old, old_neighbours = self.df_expected, self.sources.neighbours
+        gazette_only = _without(versions, files[0]) == _without(
+            self._versions, self.expected_file
+        )
+        self._load(files)
+        if not gazette_only:
+            self.cache.clear()
+            print("Sources changed: every map will be rendered again.")
+            return
+        changed = changed_divisions(diff_snapshots(df_old, self.df_expected))
+        # Neighbours before and after, in case a moved booth changed them
+        divisions = set(affected_divisions(changed, old_neighbours))
+        divisions.update(affected_divisions(changed, self.sources.neighbours))
+        self.cache.invalidate(divisions)
+        print(f"Gazette changed: dropped the maps of {len(divisions)} divisions.")
+
+    @traced
+    def render(self, division: str, map_name: str) -> bytes:
+        """Render one map of a division and return its HTML.
+
+        Only the frames that map needs are built (see ``prepare_division``).
+        """
+        with tempfile.TemporaryDirectory(prefix="polling-places-") as output_dir:
+            tasks = prepare_division(
+                division,
+                self.sources,
+                self.pie_mode,
+                output_dir=output_dir,
+                maps=[map_name],
+            )
+            if not tasks:
+                raise KeyError(map_name)
+            ((_, render, args),) = tasks
+            render(*args)
+            (path,) = pathlib.Path(output_dir).iterdir()
+            return path.read_bytes()
+
+    def map_html(self, division: str, map_name: str) -> Tuple[bytes, bool]:
+        """Return a map's HTML and whether it came from the cache."""
+        self.refresh()
+        key = (division, map_name)
+        content = self.cache.get(key)
+        if content is not None:
+            return content, True
+        # One render at a time, so a map requested twice is only rendered once
+        with self._render_lock:
+            content = self.cache.get(key)
+            if content is not None:
+                return content, True
+            content = self.render(division, map_name)
+            self.cache.put(key, content)
+            return content, False
+
+    def index_html(self) -> bytes:
+        """Return a page linking every map of every division."""
+        states = self.df_expected.drop_duplicates("DivName").set_index("DivName")[
+            "StateAb"
+        ]
+        rows = []
+        for division in self.divisions:
+            links = " ".join(
+                f'<a href="/{urllib.parse.quote(division)}/{name}">{name}</a>'
+                for name in MAP_NAMES
+            )
+            rows.append(
+                f"<li>{html.escape(division)} ({states[division]}): {links}</li>"
+            )
+        return (
+            "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+            "<title>Polling places</title></head><body>"
+            f"<h1>Polling places</h1><p>{html.escape(self.expected_file.name)}</p>"
+            f"<ul>{''.join(rows)}</ul></body></html>"
+        ).encode()
+
+
+def _version(path: pathlib.Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _without(
+    versions: Dict[pathlib.Path, Tuple[int, int]], path: pathlib.Path
+) -> Dict[pathlib.Path, Tuple[int, int]]:
+    return {other: version for other, version in versions.items() if other != path}
+
+
+def make_handler(server: MapServer) -> type:
+    """Return a request handler class serving ``server``'s maps."""
+
+    class MapRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            parts = [
+                urllib.parse.unquote(part)
+                for part in urllib.parse.urlsplit(self.path).path.split("/")
+                if part
+            ]
+            if not parts:
+                self._send(200, server.index_html())
+                return
+            if (
+                len(parts) != 2
+                or parts[0] not in server.sources.expected
+                or parts[1] not in MAP_NAMES
+            ):
+                self._send(404, b"Unknown division or map.", "text/plain")
+                return
+            try:
+                content, cached = server.map_html(*parts)
+            except Exception as e:
+                message = f"{type(e).__name__}: {e}"
+                self._send(500, message.encode(), "text/plain")
+                return
+            self._send(200, content, cache="hit" if cached else "miss")
+
+        def _send(
+            self,
+            status: int,
+            content: bytes,
+            content_type: str = "text/html",
+            cache: Optional[str] = None,
+        ) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(content)))
+            if cache:
+                self.send_header("X-Cache", cache)
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return MapRequestHandler
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    pie_mode: str = "svg",
+    max_bytes: int = DEFAULT_CACHE_BYTES,
+    gazette_dir: Optional[str] = None,
+) -> None:
+    """Load the sources and serve maps at ``http://host:port/`` until interrupted."""
+    server = MapServer(pie_mode, max_bytes, gazette_dir)
+    httpd = ThreadingHTTPServer((host, port), make_handler(server))
+    print(f"Serving {len(server.divisions)} divisions at http://{host}:{port}/")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped serving.")
+    finally:
+        httpd.server_close()
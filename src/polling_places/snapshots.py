@@ -0,0 +1,173 @@
+"""Gazette snapshot timeline and change detection between snapshots.
+
+Gazette files are named ``prdelms.gaz.statics.YYMMDD.HH.MM.SS.csv``. Booths are
+keyed on ``PPId`` and ``DivId``; abolition rows carry ``PPId`` 0 and are not
+booths in their own right, so an abolished booth is one whose key disappears.
+"""
+
+import pathlib
+import re
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from polling_places.polling_places import (
+    RenderResult,
+    read_expected_polling_places,
+    run_divisions,
+)
+
+SNAPSHOT_PATTERN = re.compile(
+    r"prdelms\.gaz\.statics\.(\d{6}\.\d{2}\.\d{2}\.\d{2})\.csv$"
+)
+
+KEY = ["PPId", "DivId"]
+
+# Change flags reported by diff_snapshots, in report column order
+CHANGES = [
+    "added",
+    "abolished",
+    "status_changed",
+    "moved",
+    "re_estimated",
+    "wheelchair_changed",
+]
+
+# Coordinates closer than this many degrees (about 10 cm) are not a move
+MOVE_TOLERANCE = 1e-6
+
+
+def list_snapshots(directory: str) -> Dict[str, pathlib.Path]:
+    """Return the gazette snapshots in ``directory`` keyed and ordered by stamp."""
+    snapshots = {}
+    for path in pathlib.Path(directory).iterdir():
+        match = SNAPSHOT_PATTERN.search(path.name)
+        if match:
+            snapshots[match.group(1)] = path
+    return dict(sorted(snapshots.items()))
+
+
+def _booths(df: pd.DataFrame) -> pd.DataFrame:
+    """Return the keyed booth rows of a gazette frame."""
+    df = df[(df["PPId"] != 0) & (df["Status"] != "Abolition")]
+    return df.assign(DivName=df["DivName"].str.strip())
+
+
+def diff_snapshots(df_old: pd.DataFrame, df_new: pd.DataFrame) -> pd.DataFrame:
+    """Compare two gazette snapshots booth by booth in one vectorised pass.
+
+    Returns one row per booth that changed, with the booth identifiers, a
+    boolean column per change in ``CHANGES`` and the old and new values of the
+    compared fields (suffixed ``_old`` and ``_new``).
+    """
+    columns = [
+        "DivName",
+        "PremisesName",
+        "Status",
+        "Lat",
+        "Long",
+        "OrdVoteEst",
+        "DecVoteEst",
+        "WheelchairAccess",
+    ]
+    merged = _booths(df_old)[KEY + columns].merge(
+        _booths(df_new)[KEY + columns],
+        on=KEY,
+        how="outer",
+        suffixes=("_old", "_new"),
+        indicator=True,
+    )
+    both = (merged["_merge"] == "both").to_numpy()
+
+    def changed(column: str) -> np.ndarray:
+        # Categorical columns from different snapshots have different categories
+        old = merged[f"{column}_old"].astype(object)
+        new = merged[f"{column}_new"].astype(object)
+        return both & ~((old == new) | (old.isna() & new.isna())).to_numpy()
+
+    lat_old, lat_new = merged["Lat_old"].to_numpy(), merged["Lat_new"].to_numpy()
+    long_old, long_new = merged["Long_old"].to_numpy(), merged["Long_new"].to_numpy()
+    moved = both & ~(
+        np.isclose(lat_old, lat_new, rtol=0, atol=MOVE_TOLERANCE, equal_nan=True)
+        & np.isclose(long_old, long_new, rtol=0, atol=MOVE_TOLERANCE, equal_nan=True)
+    )
+
+    flags = pd.DataFrame(
+        {
+            "added": (merged["_merge"] == "right_only").to_numpy(),
+            "abolished": (merged["_merge"] == "left_only").to_numpy(),
+            "status_changed": changed("Status"),
+            "moved": moved,
+            "re_estimated": changed("OrdVoteEst") | changed("DecVoteEst"),
+            "wheelchair_changed": changed("WheelchairAccess"),
+        },
+        index=merged.index,
+    )
+
+    merged["DivName"] = merged["DivName_new"].fillna(merged["DivName_old"])
+    merged["PremisesName"] = merged["PremisesName_new"].fillna(
+        merged["PremisesName_old"]
+    )
+    report = pd.concat(
+        [merged[KEY + ["DivName", "PremisesName"]], flags, merged[_value_columns()]],
+        axis=1,
+    )
+    return report[flags.any(axis=1)].reset_index(drop=True)
+
+
+def _value_columns() -> List[str]:
+    fields = ["Status", "Lat", "Long", "OrdVoteEst", "DecVoteEst", "WheelchairAccess"]
+    return [f"{field}_{side}" for field in fields for side in ("old", "new")]
+
+
+def change_summary(df_diff: pd.DataFrame) -> pd.DataFrame:
+    """Count each kind of change by division."""
+    return (
+        df_diff.groupby("DivName")[CHANGES]
+        .sum()
+        .astype(int)
+        .sort_values(CHANGES, ascending=False)
+    )
+
+
+def changed_divisions(df_diff: pd.DataFrame) -> List[str]:
+    """Return the sorted names of divisions with at least one changed booth."""
+    return sorted(df_diff["DivName"].unique())
+
+
+def diff_files(old_file: str, new_file: str) -> pd.DataFrame:
+    """Diff two gazette snapshot files."""
+    return diff_snapshots(
+        read_expected_polling_places(old_file), read_expected_polling_places(new_file)
+    )
+
+
+def refresh_changed(
+    df_diff: pd.DataFrame, new_file: str, jobs: int = 1
+) -> List[RenderResult]:
+    """Re-render maps from ``new_file`` only for the divisions in ``df_diff``."""
+    divisions = changed_divisions(df_diff)
+    if not divisions:
+        print("No booth changes between snapshots.")
+        return []
+    return run_divisions(divisions, jobs=jobs, expected_polling_places_file=new_file)
+
+
+def timeline(directory: str) -> pd.DataFrame:
+    """Summarise changes between each consecutive pair of snapshots in ``directory``."""
+    snapshots = list_snapshots(directory)
+    stamps = list(snapshots)
+    rows = []
+    for old, new in zip(stamps, stamps[1:]):
+        df_diff = diff_files(snapshots[old], snapshots[new])
+        counts = df_diff[CHANGES].sum().astype(int).to_dict()
+        rows.append(
+            {
+                "from": old,
+                "to": new,
+                **counts,
+                "divisions": len(changed_divisions(df_diff)),
+            }
+        )
+    return pd.DataFrame(rows)
@@ -0,0 +1,136 @@
+"""Spatial indexing of booth coordinates.
+
+Coordinates are mapped to points on the unit sphere so a Euclidean KD-tree
+answers great-circle (haversine) radius queries exactly: two points are within
+``d`` km along the surface when their chord is within ``2 sin(d / 2R)``.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from polling_places.profiling import traced
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Historical booths this close to a division's expected premises make their
+# division a neighbour
+DEFAULT_NEIGHBOUR_DISTANCE_KM = 0.2
+
+# Premises that hosted booths for more divisions than this (city halls,
+# interstate voting centres) say nothing about which divisions are adjacent
+MAX_SHARED_DIVISIONS = 4
+
+
+def unit_vectors(lat: np.ndarray, long: np.ndarray) -> np.ndarray:
+    """Convert latitude and longitude in degrees to 3D unit vectors."""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    long = np.radians(np.asarray(long, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack(
+        [cos_lat * np.cos(long), cos_lat * np.sin(long), np.sin(lat)]
+    )
+
+
+def chord_length(distance_km: float) -> float:
+    """Return the unit-sphere chord length for a great-circle distance."""
+    return 2 * np.sin(distance_km / (2 * EARTH_RADIUS_KM))
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Return great-circle distances in km for unit-sphere chord lengths."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def haversine_km(
+    lat1: np.ndarray, long1: np.ndarray, lat2: np.ndarray, long2: np.ndarray
+) -> np.ndarray:
+    """Element-wise great-circle distance in km between coordinate arrays."""
+    lat1, long1, lat2, long2 = map(np.radians, (lat1, long1, lat2, long2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((long2 - long1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def valid_coordinates(lat: pd.Series, long: pd.Series) -> np.ndarray:
+    """Return a mask of rows with usable (present, non-zero) coordinates."""
+    return (lat.notna() & long.notna() & (lat != 0) & (long != 0)).to_numpy()
+
+
+class BoothTree:
+    """KD-tree over booth coordinates answering haversine radius queries."""
+
+    def __init__(self, lat: np.ndarray, long: np.ndarray) -> None:
+        # Imported here so that loading data without a spatial query skips scipy
+        from scipy.spatial import cKDTree
+
+        self.tree = cKDTree(unit_vectors(lat, long))
+
+    def pairs_within(
+        self, lat: np.ndarray, long: np.ndarray, distance_km: float
+    ) -> np.ndarray:
+        """Return (query index, tree index, km) rows for all pairs within range.
+
+        All query points are answered in one batched tree-against-tree call.
+        """
+        other = type(self.tree)(unit_vectors(lat, long))
+        pairs = other.sparse_distance_matrix(
+            self.tree, chord_length(distance_km), output_type="ndarray"
+        )
+        return np.column_stack([pairs["i"], pairs["j"], chord_to_km(pairs["v"])])
+
+    def nearest(
+        self, lat: np.ndarray, long: np.ndarray, k: int = 1
+    ) -> "tuple[np.ndarray, np.ndarray]":
+        """Return great-circle distances (km) and tree indices of the k nearest."""
+        chord, index = self.tree.query(unit_vectors(lat, long), k=k)
+        return chord_to_km(chord), index
+
+
+@traced
+def neighbouring_divisions(
+    df_last_polling_places: pd.DataFrame,
+    df_expected: pd.DataFrame,
+    distance_km: float = DEFAULT_NEIGHBOUR_DISTANCE_KM,
+) -> Dict[str, List[str]]:
+    """Derive each expected division's neighbouring last-election divisions.
+
+    A last-election division (``DivisionNm``) neighbours an expected division
+    (stripped ``DivName``) when any of its polling-day booths lies within
+    ``distance_km`` of one of the expected division's premises. Each division is
+    listed first among its own neighbours, followed by the rest in alphabetical
+    order. All divisions are answered by a single batched query.
+    """
+    # Pre-poll centres and central hubs host booths for many divisions, so only
+    # polling-day booths at ordinary premises count towards neighbours
+    last = df_last_polling_places[
+        valid_coordinates(
+            df_last_polling_places["Latitude"], df_last_polling_places["Longitude"]
+        )
+        & ~df_last_polling_places["PollingPlaceNm"].str.contains("PP").to_numpy()
+    ]
+    shared = last.groupby(["Latitude", "Longitude"])["DivisionNm"].transform("nunique")
+    last = last[shared <= MAX_SHARED_DIVISIONS]
+    expected = df_expected[valid_coordinates(df_expected["Lat"], df_expected["Long"])]
+    expected_divisions = expected["DivName"].str.strip().to_numpy()
+
+    pairs = BoothTree(last["Latitude"], last["Longitude"]).pairs_within(
+        expected["Lat"], expected["Long"], distance_km
+    )
+    df_pairs = pd.DataFrame(
+        {
+            "DivName": expected_divisions[pairs[:, 0].astype(int)],
+            "DivisionNm": last["DivisionNm"].to_numpy()[pairs[:, 1].astype(int)],
+        }
+    ).drop_duplicates()
+
+    neighbours = {division: [] for division in np.unique(expected_divisions)}
+    for division, group in df_pairs.groupby("DivName"):
+        neighbours[division] = sorted(group["DivisionNm"])
+    for division, divisions in neighbours.items():
+        others = [d for d in divisions if d != division]
+        neighbours[division] = [division] + others
+    return neighbours
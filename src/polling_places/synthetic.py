@@ -0,0 +1,428 @@
+"""Synthetic gazette, polling place and first preferences files for benchmarks.
+
+The files follow the real AEC layouts (column order, banner rows, quoting,
+padded gazette names and CRLF line endings) so they go through the same
+parsers as the bundled ``data/`` files. ``scale=1`` is about the size of the
+bundled files (150 divisions, ~8,400 last-election booths), and the number of
+divisions grows with ``scale`` while booths per division stay realistic.
+"""
+
+import csv
+import json
+import pathlib
+from typing import Dict, Union
+
+import numpy as np
+import pandas as pd
+
+EVENT_ID = 27966
+SNAPSHOT_STAMP = "250405.09.00.02"
+BANNER_SUFFIX = (
+    f"[Event:{EVENT_ID} Phase:FinalResults Generated:2022-07-19T10:30:02 "
+    "Cycle:00000000-0000-0000-0000-000000000000 Created:2022-07-19T10:24:10 "
+    "Environment:SYNTHETIC Site:CANBERRA Server:TALLYROOM Version:10.9.9.0]"
+)
+
+# Divisions and booths at scale 1, matching the bundled files
+BASE_DIVISIONS = 150
+MEAN_BOOTHS_PER_DIVISION = 53
+
+# StateCo, centre latitude and longitude, and relative number of divisions
+STATES: Dict[str, tuple] = {
+    "NSW": (2, -33.0, 148.0, 47),
+    "VIC": (3, -37.5, 144.5, 39),
+    "QLD": (4, -25.0, 150.0, 30),
+    "WA": (5, -31.5, 116.5, 15),
+    "SA": (6, -34.5, 138.6, 10),
+    "TAS": (7, -42.0, 147.0, 5),
+    "ACT": (8, -35.3, 149.1, 3),
+    "NT": (9, -12.5, 131.0, 2),
+}
+
+PREPOLL_SHARE = 0.15
+ABOLISHED_SHARE = 0.1
+NEW_BOOTH_SHARE = 0.08
+MOVED_SHARE = 0.05
+
+# (PartyAb, PartyNm, mean primary share); a missing PartyNm occurs in real files
+MAJOR_PARTIES = [
+    ("ALP", "Labor", 0.32),
+    ("GRN", "The Greens", 0.12),
+    ("ON", "Pauline Hanson's One Nation", 0.05),
+    ("UAPP", "United Australia Party", 0.04),
+]
+COALITION_PARTIES = [("LP", "Liberal", 0.36), ("NP", "The Nationals", 0.36)]
+MINOR_PARTIES = [
+    ("IND", "Independent", 0.08),
+    ("LDP", "Liberal Democrats", 0.02),
+    ("AJP", "Animal Justice Party", 0.02),
+    ("IMO", "Informed Medical Options Party", 0.01),
+    ("SAP", "Sustainable Australia Party - Stop Overdevelopment / Corruption", 0.01),
+    ("NAFD", None, 0.01),
+]
+INFORMAL = ("", "Informal", 0.05)
+
+PLACE_WORDS = """
+Ash Bay Bell Birch Brook Cedar Clare Cliff Cove Dale East Elm Fair Fern
+Glen Green Grove Hall Hazel High Hill Holm Kings Lake Lea Mill Moor
+North Oak Park Pine Queens Red Ridge Rose South Spring Stone Vale West
+Wood York
+""".split()
+PLACE_SUFFIXES = ["ville", "field", "wood", "ton", "dale", "mere", "ford", "vale"]
+PREMISES_KINDS = [
+    "Public School",
+    "Primary School",
+    "High School",
+    "Community Hall",
+    "Community Centre",
+    "Uniting Church Hall",
+    "Scout Hall",
+    "Bowling Club",
+    "Senior Citizens Centre",
+    "Memorial Hall",
+    "Library",
+    "Sports Club",
+]
+STREET_KINDS = ["St", "Rd", "Ave", "Pde", "Cres", "Dr"]
+SURNAMES = """
+SMITH JONES WILLIAMS BROWN WILSON TAYLOR NGUYEN JOHNSON MARTIN WHITE
+ANDERSON WALKER THOMPSON KELLY
+""".split()
+GIVEN_NAMES = """
+James Sarah David Emma Michael Olivia Daniel Chloe Peter Mia Andrew
+Grace Thomas Lucy
+""".split()
+
+PathLike = Union[str, pathlib.Path]
+
+
+def _pick(rng: np.random.Generator, words: list, size: int) -> np.ndarray:
+    return np.asarray(words, dtype=object)[rng.integers(len(words), size=size)]
+
+
+def _place_names(rng: np.random.Generator, size: int) -> np.ndarray:
+    return _pick(rng, PLACE_WORDS, size) + _pick(rng, PLACE_SUFFIXES, size)
+
+
+def _divisions(rng: np.random.Generator, scale: float) -> pd.DataFrame:
+    count = max(1, round(BASE_DIVISIONS * scale))
+    states = list(STATES)
+    weights = np.array([STATES[s][3] for s in states], dtype=float)
+    state = np.asarray(states)[
+        rng.choice(len(states), size=count, p=weights / weights.sum())
+    ]
+    centre = np.array([STATES[s][1:3] for s in state])
+    names = [f"{name}{i:05d}" for i, name in enumerate(_place_names(rng, count))]
+    return pd.DataFrame(
+        {
+            "StateAb": state,
+            "StateCo": [STATES[s][0] for s in state],
+            "DivisionID": 100 + np.arange(count),
+            "DivisionNm": names,
+            "Lat": centre[:, 0] + rng.normal(0, 1.0, count),
+            "Long": centre[:, 1] + rng.normal(0, 1.0, count),
+        }
+    )
+
+
+def synthetic_last_polling_places(
+    rng: np.random.Generator, df_divisions: pd.DataFrame
+) -> pd.DataFrame:
+    """Return last-election booths in the ``GeneralPollingPlacesDownload`` layout."""
+    booths = rng.poisson(MEAN_BOOTHS_PER_DIVISION, len(df_divisions)) + 3
+    division = np.repeat(np.arange(len(df_divisions)), booths)
+    count = len(division)
+    df = df_divisions.iloc[division].reset_index(drop=True)
+
+    suburb = _place_names(rng, count)
+    prepoll = rng.random(count) < PREPOLL_SHARE
+    polling_place = np.where(
+        prepoll,
+        suburb + " " + df["DivisionNm"].str.upper() + " PPVC",
+        suburb,
+    )
+    return pd.DataFrame(
+        {
+            "State": df["StateAb"],
+            "DivisionID": df["DivisionID"],
+            "DivisionNm": df["DivisionNm"],
+            "PollingPlaceID": 10_000 + rng.permutation(count),
+            "PollingPlaceTypeID": np.where(prepoll, 5, 1),
+            "PollingPlaceNm": polling_place,
+            "PremisesNm": suburb + " " + _pick(rng, PREMISES_KINDS, count),
+            "PremisesAddress1": rng.integers(1, 400, count).astype(str)
+            + " "
+            + _pick(rng, PLACE_WORDS, count)
+            + " "
+            + _pick(rng, STREET_KINDS, count),
+            "PremisesAddress2": "",
+            "PremisesAddress3": "",
+            "PremisesSuburb": np.char.upper(suburb.astype(str)),
+            "PremisesStateAb": df["StateAb"],
+            "PremisesPostCode": rng.integers(800, 7470, count),
+            "Latitude": (df["Lat"] + rng.normal(0, 0.08, count)).round(6),
+            "Longitude": (df["Long"] + rng.normal(0, 0.08, count)).round(6),
+        }
+    )
+
+
+def synthetic_expected_polling_places(
+    rng: np.random.Generator, df_last_polling_places: pd.DataFrame
+) -> pd.DataFrame:
+    """Return a gazette snapshot derived from last-election booths.
+
+    Most polling-day booths continue (a few moved slightly), some are
+    abolished (``PPId`` 0 rows) and some new premises are appointed.
+    """
+    last = df_last_polling_places[df_last_polling_places["PollingPlaceTypeID"] == 1]
+    count = len(last)
+    fate = rng.random(count)
+    abolished = fate < ABOLISHED_SHARE
+    moved = (fate >= ABOLISHED_SHARE) & (fate < ABOLISHED_SHARE + MOVED_SHARE)
+
+    kept = last[~abolished].copy()
+    shift = np.where(moved[~abolished], 0.003, 0.0)
+    kept["Latitude"] = kept["Latitude"] + rng.normal(0, 1, len(kept)) * shift
+    kept["Longitude"] = kept["Longitude"] + rng.normal(0, 1, len(kept)) * shift
+    kept["Status"] = "Current"
+
+    new = last.sample(frac=NEW_BOOTH_SHARE, random_state=rng.integers(2**31)).copy()
+    new["PremisesNm"] = (
+        _place_names(rng, len(new)) + " " + _pick(rng, PREMISES_KINDS, len(new))
+    )
+    new["PollingPlaceNm"] = _place_names(rng, len(new))
+    new["Latitude"] = new["Latitude"] + rng.normal(0, 0.01, len(new))
+    new["Longitude"] = new["Longitude"] + rng.normal(0, 0.01, len(new))
+    new["PollingPlaceID"] = last["PollingPlaceID"].max() + 1 + np.arange(len(new))
+    new["Status"] = "Appointment"
+
+    booths = pd.concat([kept, new], ignore_index=True)
+    n = len(booths)
+    ord_est = np.round(rng.lognormal(6.5, 0.7, n)).astype(int)
+    dec_est = np.where(rng.random(n) < 0.1, rng.integers(1, 200, n), 0)
+    access = np.asarray(["Full", "Assisted", ""], dtype=object)[
+        rng.choice(3, size=n, p=[0.4, 0.43, 0.17])
+    ]
+    df_booths = pd.DataFrame(
+        {
+            "StateCo": booths["State"].map(lambda s: str(STATES[s][0])),
+            "StateAb": booths["State"],
+            "DivName": booths["DivisionNm"],
+            "DivId": booths["DivisionID"],
+            "DivCo": 1,
+            "PPName": booths["PollingPlaceNm"],
+            "Status": booths["Status"],
+            "PremisesName": booths["PremisesNm"],
+            "Address1": booths["PremisesAddress1"],
+            "Address2": "",
+            "Address3": "",
+            "Locality": booths["PremisesSuburb"],
+            "AddrStateAb": booths["State"],
+            "Postcode": booths["PremisesPostCode"].astype(str),
+            "PPId": booths["PollingPlaceID"],
+            "AdvPremisesName": booths["PremisesNm"],
+            "AdvAddress": booths["PremisesAddress1"],
+            "AdvLocality": booths["PremisesSuburb"],
+            "AdvBoothLocation": "Hall",
+            "AdvGateAccess": "",
+            "EntrancesDesc": "Entrance to polling place: Main door",
+            "Lat": booths["Latitude"].map(repr),
+            "Long": booths["Longitude"].map(repr),
+            "CCD": rng.integers(1_000_000, 9_100_000, n),
+            "WheelchairAccess": access,
+            "OrdVoteEst": ord_est,
+            "DecVoteEst": dec_est,
+            "NoOrdIssuingOff": np.ceil(ord_est / 400).astype(int),
+            "NoOfDecIssuingOff": (dec_est > 0).astype(int),
+        }
+    )
+    # The gazette pads some names to fixed widths
+    padded = rng.random(n) < 0.5
+    df_booths.loc[padded, "DivName"] = df_booths.loc[padded, "DivName"].str.ljust(32)
+    df_booths.loc[padded, "PPName"] = df_booths.loc[padded, "PPName"].str.ljust(64)
+
+    gone = last[abolished]
+    df_abolished = pd.DataFrame(
+        {column: "" for column in df_booths.columns}, index=range(len(gone))
+    )
+    df_abolished = df_abolished.assign(
+        StateCo=gone["State"].map(lambda s: str(STATES[s][0])).to_numpy(),
+        StateAb=gone["State"].to_numpy(),
+        DivName=gone["DivisionNm"].to_numpy(),
+        DivId=gone["DivisionID"].to_numpy(),
+        DivCo=1,
+        PPName=gone["PollingPlaceNm"].to_numpy(),
+        Status="Abolition",
+        **{
+            column: 0
+            for column in [
+                "PPId",
+                "CCD",
+                "OrdVoteEst",
+                "DecVoteEst",
+                "NoOrdIssuingOff",
+                "NoOfDecIssuingOff",
+            ]
+        },
+    )
+    return (
+        pd.concat([df_booths, df_abolished], ignore_index=True)
+        .sort_values(["DivId", "PPName"], kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def synthetic_votes(
+    rng: np.random.Generator, df_last_polling_places: pd.DataFrame
+) -> pd.DataFrame:
+    """Return first preferences by candidate and booth in the AEC layout."""
+    divisions = df_last_polling_places.drop_duplicates("DivisionNm")
+    candidates = []
+    candidate_id = 30_000
+    for state, division_id, division in zip(
+        divisions["State"], divisions["DivisionID"], divisions["DivisionNm"]
+    ):
+        field = list(MAJOR_PARTIES)
+        field.append(COALITION_PARTIES[int(rng.random() < 0.2)])
+        extra = rng.choice(len(MINOR_PARTIES), size=rng.integers(1, 5), replace=False)
+        field += [MINOR_PARTIES[i] for i in sorted(extra)]
+        shares = rng.dirichlet([share * 40 for _, _, share in field])
+        elected = int(np.argmax(shares))
+        order = rng.permutation(len(field))
+        for k, (party_ab, party_nm, _) in enumerate(field):
+            candidates.append(
+                (
+                    state,
+                    division_id,
+                    division,
+                    candidate_id,
+                    party_ab,
+                    party_nm,
+                    shares[k] * (1 - INFORMAL[2]),
+                    order[k] + 1,
+                    k == elected,
+                )
+            )
+            candidate_id += 1
+        candidates.append(
+            (
+                state,
+                division_id,
+                division,
+                candidate_id,
+                INFORMAL[0],
+                INFORMAL[1],
+                INFORMAL[2],
+                999,
+                False,
+            )
+        )
+        candidate_id += 1
+    df_candidates = pd.DataFrame(
+        candidates,
+        columns=[
+            "StateAb",
+            "DivisionID",
+            "DivisionNm",
+            "CandidateID",
+            "PartyAb",
+            "PartyNm",
+            "Share",
+            "BallotPosition",
+            "Elected",
+        ],
+    )
+    df_candidates["Surname"] = _pick(rng, SURNAMES, len(df_candidates))
+    df_candidates["GivenNm"] = _pick(rng, GIVEN_NAMES, len(df_candidates))
+
+    booths = df_last_polling_places[["DivisionNm", "PollingPlaceID", "PollingPlaceNm"]]
+    df = booths.merge(df_candidates, on="DivisionNm")
+    totals = np.round(rng.lognormal(6.8, 0.6, len(booths)))
+    booth_total = pd.Series(totals, index=booths["PollingPlaceID"])
+    # Each booth's shares vary around its division's candidate shares
+    weight = df["Share"].to_numpy() * rng.gamma(20, 1 / 20, len(df))
+    norm = pd.Series(weight).groupby(df["PollingPlaceID"].to_numpy()).transform("sum")
+    votes = np.round(
+        booth_total.loc[df["PollingPlaceID"]].to_numpy() * weight / norm.to_numpy()
+    )
+    return pd.DataFrame(
+        {
+            "StateAb": df["StateAb"],
+            "DivisionID": df["DivisionID"],
+            "DivisionNm": df["DivisionNm"],
+            "PollingPlaceID": df["PollingPlaceID"],
+            "PollingPlace": df["PollingPlaceNm"],
+            "CandidateID": df["CandidateID"],
+            "Surname": df["Surname"],
+            "GivenNm": df["GivenNm"],
+            "BallotPosition": df["BallotPosition"],
+            "Elected": np.where(df["Elected"], "Y", "N"),
+            "HistoricElected": np.where(df["Elected"], "Y", "N"),
+            "PartyAb": df["PartyAb"],
+            "PartyNm": df["PartyNm"],
+            "OrdinaryVotes": votes.astype(int),
+            "Swing": rng.normal(0, 4, len(df)).round(2),
+        }
+    )
+
+
+def _write_aec_csv(df: pd.DataFrame, path: pathlib.Path, banner: str) -> None:
+    """Write an AEC download: a banner line, then an unquoted CSV, CRLF endings."""
+    with open(path, "w", newline="") as f:
+        f.write(banner + "\r\n")
+        df.to_csv(f, index=False, lineterminator="\r\n")
+
+
+def generate_dataset(
+    directory: PathLike, scale: float = 1.0, seed: int = 0
+) -> Dict[str, pathlib.Path]:
+    """Write a synthetic gazette, polling places file and votes file per state.
+
+    Returns the written paths keyed by role (``expected``, ``last_polling_places``
+    and ``votes_<STATE>``) and records the scale, seed and row counts in
+    ``synthetic.json`` alongside them.
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    df_divisions = _divisions(rng, scale)
+    df_last = synthetic_last_polling_places(rng, df_divisions)
+    df_expected = synthetic_expected_polling_places(rng, df_last)
+    df_votes = synthetic_votes(rng, df_last)
+
+    paths = {
+        "expected": directory / f"prdelms.gaz.statics.{SNAPSHOT_STAMP}.csv",
+        "last_polling_places": directory
+        / f"GeneralPollingPlacesDownload-{EVENT_ID}.csv",
+    }
+    df_expected.to_csv(
+        paths["expected"],
+        index=False,
+        quoting=csv.QUOTE_NONNUMERIC,
+        lineterminator="\r\n",
+    )
+    _write_aec_csv(
+        df_last,
+        paths["last_polling_places"],
+        f"2022 Federal Election Polling Places {BANNER_SUFFIX}",
+    )
+    rows = {"expected": len(df_expected), "last_polling_places": len(df_last)}
+    for state, df_state in df_votes.groupby("StateAb", sort=True):
+        path = (
+            directory
+            / f"HouseStateFirstPrefsByPollingPlaceDownload-{EVENT_ID}-{state}.csv"
+        )
+        _write_aec_csv(
+            df_state,
+            path,
+            "2022 Federal Election House of Representatives First Preferences By "
+            f"Candidate By Polling Place for {state} {BANNER_SUFFIX}",
+        )
+        paths[f"votes_{state}"] = path
+        rows[f"votes_{state}"] = len(df_state)
+
+    (directory / "synthetic.json").write_text(
+        json.dumps({"scale": scale, "seed": seed, "rows": rows}, indent=2)
+    )
+    return paths
@@ -0,0 +1,145 @@
+"""Transfer of last-election votes onto the nearest expected booths.
+
+The votes of each last-election polling-day booth whose premises no expected
+booth was matched to (see ``unmatched_polling_places``) are shared among its
+``DEFAULT_TRANSFER_NEIGHBOURS`` nearest expected booths without a matched
+premises by inverse distance, so a booth that moved or replaced a closed one
+inherits the votes cast nearby. Votes of matched booths already sit on their
+expected booth and are not transferred, and each transferred booth's shares sum
+to its votes.
+The weights form a sparse ``expected x last`` matrix built from one KD-tree
+query, and the estimates for every booth and party are a single sparse
+product, so a whole state is transferred at once.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from polling_places.polling_places import party_votes_table
+from polling_places.profiling import traced
+from polling_places.spatial import BoothTree, valid_coordinates
+
+# Expected booths sharing each last-election booth's votes (1 for Voronoi cells)
+DEFAULT_TRANSFER_NEIGHBOURS = 3
+
+# Last-election booths with no expected booth this close are not transferred
+DEFAULT_TRANSFER_DISTANCE_KM = 10.0
+
+# Distances below this weigh as this, so a booth on the same site is not infinite
+MIN_TRANSFER_DISTANCE_KM = 0.05
+
+
+def transfer_matrix(
+    df_expected: pd.DataFrame,
+    df_last_polling_places: pd.DataFrame,
+    k: int = DEFAULT_TRANSFER_NEIGHBOURS,
+    max_distance_km: float = DEFAULT_TRANSFER_DISTANCE_KM,
+) -> sparse.csr_matrix:
+    """Return the ``expected x last`` share of each last booth's votes per booth.
+
+    Each column sums to 1, or to 0 for last booths without coordinates or
+    without an expected booth within ``max_distance_km``.
+    """
+    shape = (len(df_expected), len(df_last_polling_places))
+    expected = np.flatnonzero(
+        valid_coordinates(df_expected["Lat"], df_expected["Long"])
+    )
+    last = np.flatnonzero(
+        valid_coordinates(
+            df_last_polling_places["Latitude"], df_last_polling_places["Longitude"]
+        )
+    )
+    if not len(expected) or not len(last):
+        return sparse.csr_matrix(shape)
+
+    k = min(k, len(expected))
+    distance, index = BoothTree(
+        df_expected["Lat"].to_numpy()[expected],
+        df_expected["Long"].to_numpy()[expected],
+    ).nearest(
+        df_last_polling_places["Latitude"].to_numpy()[last],
+        df_last_polling_places["Longitude"].to_numpy()[last],
+        k=k,
+    )
+    # last booths x k
+    distance = np.asarray(distance).reshape(len(last), k)
+    index = np.asarray(index).reshape(len(last), k)
+    weight = np.where(
+        distance <= max_distance_km,
+        1 / np.maximum(distance, MIN_TRANSFER_DISTANCE_KM),
+        0.0,
+    )
+    total = weight.sum(axis=1, keepdims=True)
+    weight = np.divide(weight, total, out=np.zeros_like(weight), where=total > 0)
+
+    return sparse.csr_matrix(
+        (weight.ravel(), (expected[index].ravel(), np.repeat(last, k))),
+        shape=shape,
+    )
+
+
+def unmatched_polling_places(
+    df_last_polling_places: pd.DataFrame,
+    df_expected: pd.DataFrame,
+    neighbours: Dict[str, List[str]],
+) -> pd.DataFrame:
+    """Return the last booths whose votes no expected booth already holds.
+
+    A last booth is matched when an expected booth's matched ``PremisesNm`` (see
+    ``load_sources``) is its premises and its division neighbours the expected
+    booth's, as ``filter_division`` attributes votes; the same name elsewhere
+    does not count. ``df_expected`` should hold every expected booth the last
+    booths could have been matched to, such as a whole state's.
+    """
+    premises = df_expected.get("PremisesNm", df_expected["PremisesName"])
+    matched = pd.DataFrame(
+        [
+            (division, name)
+            for division, name in zip(df_expected["DivName"], premises)
+            if isinstance(name, str)
+            for division in neighbours.get(division, [division])
+        ],
+        columns=["DivisionNm", "PremisesNm"],
+    ).drop_duplicates()
+    keys = pd.DataFrame(
+        {
+            "DivisionNm": df_last_polling_places["DivisionNm"].astype(object),
+            "PremisesNm": df_last_polling_places["PremisesNm"].astype(object),
+        }
+    )
+    found = keys.merge(matched, how="left", indicator=True)["_merge"] == "both"
+    return df_last_polling_places[~found.to_numpy()]
+
+
+@traced
+def transfer_votes(
+    df_expected: pd.DataFrame,
+    df_last_polling_places: pd.DataFrame,
+    df_votes: pd.DataFrame,
+    Party_to_colour: Dict[str, str],
+    k: int = DEFAULT_TRANSFER_NEIGHBOURS,
+    max_distance_km: float = DEFAULT_TRANSFER_DISTANCE_KM,
+) -> pd.DataFrame:
+    """Share the votes of ``df_last_polling_places`` among nearby expected booths.
+
+    Returns a frame indexed like ``df_expected`` with one column per party in
+    ``Party_to_colour`` (see ``party_votes_table``). Votes of booths missing
+    from ``df_last_polling_places`` are not transferred, so pass only unmatched
+    booths (see ``unmatched_polling_places``). Shares are not rounded, so the
+    columns sum to the transferred booths' votes; ``df_expected`` should hold
+    every expected booth that could receive them, not just one division's.
+    """
+    votes = (
+        party_votes_table(df_votes, Party_to_colour, by="PollingPlaceID")
+        .reindex(df_last_polling_places["PollingPlaceID"].to_numpy(), fill_value=0)
+        .to_numpy(dtype=float)
+    )
+    weights = transfer_matrix(df_expected, df_last_polling_places, k, max_distance_km)
+    return pd.DataFrame(
+        weights @ votes,
+        index=df_expected.index,
+        columns=list(Party_to_colour),
+    )
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from polling_places.address_index import LocalAddressIndex, house_numbers
+
+# Rows in the format read_last_polling_places returns, postcodes as float32
+LAST_POLLING_PLACES = pd.DataFrame(
+    {
+        "PremisesNm": [
+            "Ashfield Town Hall",
+            "Exodus Foundation (Loaves and Fishes)",
+            "St Mary's Catholic Primary School and Early Learning Centre",
+        ],
+        "PremisesAddress1": ["260 Liverpool Rd", "180 Liverpool Rd", "90 Smith St"],
+        "PremisesAddress2": [np.nan, np.nan, np.nan],
+        "PremisesAddress3": [np.nan, np.nan, np.nan],
+        "PremisesSuburb": ["ASHFIELD", "ASHFIELD", "Darwin"],
+        "PremisesPostCode": np.array([2131, 2131, 800], dtype="float32"),
+        "Latitude": [-33.888913, -33.890432, -12.459160],
+        "Longitude": [151.124244, 151.127128, 130.838722],
+    }
+)
+
+# Rows in the format read_expected_polling_places returns
+EXPECTED = pd.DataFrame(
+    {
+        "Address1": ["Moil Primary School", np.nan],
+        "Address2": ["37 Lanyon Tce", np.nan],
+        "Address3": [np.nan, np.nan],
+        "Locality": ["MOIL", np.nan],
+        "Postcode": np.array([810, np.nan], dtype="float32"),
+        "Lat": [-12.388039, np.nan],
+        "Long": [130.880587, np.nan],
+    }
+)
+
+
+def build_index():
+    return LocalAddressIndex.from_frames(LAST_POLLING_PLACES, EXPECTED)
+
+
+def test_house_numbers_keep_suffixes_and_expand_ranges():
+    assert house_numbers("260A Liverpool Rd") == {"260a"}
+    assert house_numbers("24–26 Blue Gum Rd") == {"24", "25", "26"}
+    assert house_numbers("Shop 3, 12 Smith St") == {"12"}
+    assert house_numbers("Lot 2 Ocean Dr") == frozenset()
+
+
+def test_exact_address_resolves():
+    index = build_index()
+    assert index.geocode("260 Liverpool Rd, Ashfield, NSW 2131") == (
+        -33.888913,
+        151.124244,
+    )
+
+
+def test_suffixed_number_is_another_building():
+    index = build_index()
+    assert index.geocode("260A Liverpool Rd, Ashfield, NSW 2131") is None
+
+
+def test_leading_zero_postcode_is_kept():
+    index = build_index()
+    assert "0800" in index.by_postcode
+    assert "0810" in index.by_postcode
+    # Suburb spelt differently, so only the postcode finds the candidate
+    match = index.lookup("90 Smith St, Darwin City, NT 0800")
+    assert match is not None
+    assert match[0] == (-12.459160, 130.838722)
+
+
+def test_building_name_does_not_dilute_street():
+    index = build_index()
+    assert index.geocode("37 Lanyon Tce, Moil, NT 0810") == (-12.388039, 130.880587)
+    assert index.geocode("Moil Primary School, 37 Lanyon Tce, Moil, NT 0810") == (
+        -12.388039,
+        130.880587,
+    )
@@ -0,0 +1,77 @@
+import os
+
+import pandas as pd
+import pytest
+
+from polling_places import cache
+from polling_places.cache import cached_frame, clear_cache
+
+
+class CountingParser:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, file_path):
+        self.calls += 1
+        return pd.read_csv(file_path)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "votes.csv"
+    path.write_text("PollingPlaceID,OrdinaryVotes\n1,10\n2,20\n")
+    return path
+
+
+def test_unchanged_source_is_read_from_the_cache(source):
+    parse = CountingParser()
+    first = cached_frame(source, parse, "votes")
+    second = cached_frame(source, parse, "votes")
+    assert parse.calls == 1
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_touched_source_with_same_content_is_not_parsed_again(source):
+    parse = CountingParser()
+    cached_frame(source, parse, "votes")
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cached_frame(source, parse, "votes")
+    assert parse.calls == 1
+
+
+def test_changed_source_is_parsed_again(source):
+    parse = CountingParser()
+    cached_frame(source, parse, "votes")
+    source.write_text("PollingPlaceID,OrdinaryVotes\n1,10\n2,21\n")
+    df = cached_frame(source, parse, "votes")
+    assert parse.calls == 2
+    assert df["OrdinaryVotes"].tolist() == [10, 21]
+
+
+def test_new_cache_version_prunes_old_entries(source, monkeypatch):
+    parse = CountingParser()
+    cached_frame(source, parse, "votes")
+    monkeypatch.setattr(cache, "CACHE_VERSION", cache.CACHE_VERSION + 1)
+    cached_frame(source, parse, "votes")
+    assert parse.calls == 2
+    entries = sorted(path.suffix for path in (source.parent / ".cache").iterdir())
+    assert entries == [".json", ".pkl"]
+
+
+def test_unwritable_cache_still_returns_the_frame(source, tmp_path, capsys):
+    blocked = tmp_path / "not-a-directory"
+    blocked.write_text("")
+    parse = CountingParser()
+    df = cached_frame(source, parse, "votes", cache_dir=blocked / "cache")
+    assert df["OrdinaryVotes"].tolist() == [10, 20]
+    assert "Not caching votes.csv" in capsys.readouterr().out
+
+
+def test_clear_cache_removes_every_entry(source):
+    parse = CountingParser()
+    cached_frame(source, parse, "votes")
+    cached_frame(source, parse, "other")
+    assert clear_cache(source) == 4
+    cached_frame(source, parse, "votes")
+    assert parse.calls == 3
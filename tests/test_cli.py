@@ -0,0 +1,24 @@
+import pytest
+
+from polling_places.cli import main
+from polling_places.polling_places import CONFIG, load_expected_polling_places
+
+
+@pytest.fixture(autouse=True)
+def restore_config():
+    saved = dict(CONFIG)
+    yield
+    CONFIG.clear()
+    CONFIG.update(saved)
+
+
+def test_missing_gazette_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_expected_polling_places(str(tmp_path / "missing.csv"), "Sydney")
+
+
+def test_cli_reports_a_missing_file_and_exits(tmp_path):
+    with pytest.raises(SystemExit) as excinfo:
+        main(["analyse", "Sydney", "--data-dir", str(tmp_path)])
+    assert excinfo.value.code != 0
+    assert "was not found" in str(excinfo.value.code)
@@ -0,0 +1,115 @@
+import os
+
+from polling_places.feed import DirectoryFeed, ResultsFeed, read_snapshot
+from polling_places.polling_places import Sources
+
+BANNER = (
+    "2022 Federal Election House of Representatives First Preferences By "
+    "Candidate By Polling Place for NSW [Event:27966 Phase:FinalResults "
+    "Generated:{generated} Cycle:{cycle} Created:2022-07-19T10:24:10]\n"
+)
+HEADER = (
+    "StateAb,DivisionID,DivisionNm,PollingPlaceID,PollingPlace,CandidateID,"
+    "Surname,GivenNm,BallotPosition,Elected,HistoricElected,PartyAb,PartyNm,"
+    "OrdinaryVotes,Swing\n"
+)
+
+
+def rows(division, polling_place_id, votes):
+    return [
+        f"NSW,1,{division},{polling_place_id},Booth {polling_place_id},"
+        f"{candidate},NAME,Given,{position},N,N,{party[:3].upper()},{party},"
+        f"{count},0.0\n"
+        for position, (candidate, party, count) in enumerate(votes, start=1)
+    ]
+
+
+def snapshot_lines(generated="2022-07-19T10:30:02", cycle="c1", labor=500):
+    body = rows("Grayndler", 1, [(11, "Labor", labor), (12, "Liberal", 300)])
+    body += rows("Sydney", 2, [(21, "Labor", 400), (22, "Liberal", 200)])
+    body += rows("Sydney", 3, [(21, "Labor", 150), (22, "Liberal", 90)])
+    return [BANNER.format(generated=generated, cycle=cycle), HEADER] + body
+
+
+def make_feed():
+    sources = Sources(
+        expected={},
+        last_polling_places={},
+        votes={},
+        states={},
+        neighbours={"Sydney": ["Sydney", "Grayndler"], "Grayndler": ["Grayndler"]},
+    )
+    return ResultsFeed(["Grayndler", "Sydney"], sources)
+
+
+def test_truncated_then_full_snapshot_of_the_same_cycle():
+    lines = snapshot_lines()
+    feed = make_feed()
+
+    partial = read_snapshot("".join(lines[:4]).encode())
+    assert len(partial.votes) == 2
+    _, divisions = feed.update(partial)
+    assert divisions == ["Grayndler", "Sydney"]
+    assert "Sydney" not in feed.sources.votes
+
+    full = read_snapshot("".join(lines).encode())
+    assert full.cycle == partial.cycle
+    booths, divisions = feed.update(full)
+    assert sorted(booths) == [2, 3]
+    assert divisions == ["Sydney"]
+    assert len(feed.sources.votes["Sydney"]) == 4
+
+    # The same content again changes nothing
+    assert feed.update(read_snapshot("".join(lines).encode()))[1] == []
+
+
+def test_corrected_snapshot_of_the_same_cycle_is_applied():
+    feed = make_feed()
+    feed.update(read_snapshot("".join(snapshot_lines()).encode()))
+    booths, divisions = feed.update(
+        read_snapshot("".join(snapshot_lines(labor=510)).encode())
+    )
+    assert list(booths) == [1]
+    assert divisions == ["Grayndler", "Sydney"]
+    grayndler = feed.sources.votes["Grayndler"]
+    assert grayndler.loc[grayndler["CandidateID"] == 11, "OrdinaryVotes"].item() == 510
+
+
+def test_older_snapshot_is_ignored():
+    feed = make_feed()
+    feed.update(read_snapshot("".join(snapshot_lines()).encode()))
+    older = snapshot_lines(generated="2022-07-19T09:00:00", cycle="c0", labor=1)
+    assert feed.update(read_snapshot("".join(older).encode()))[1] == []
+
+
+def test_directory_feed_waits_for_a_file_to_settle(tmp_path):
+    lines = snapshot_lines()
+    path = tmp_path / "NSW.csv"
+    directory = DirectoryFeed(tmp_path)
+
+    path.write_text("".join(lines[:4]))
+    assert directory.poll() == []
+
+    # Still being written: it grew since the last poll
+    with open(path, "a") as f:
+        f.write("".join(lines[4:]))
+    assert directory.poll() == []
+
+    (snapshot,) = directory.poll()
+    assert len(snapshot.votes) == 6
+    assert directory.poll() == []
+
+
+def test_directory_feed_rereads_a_rewritten_file(tmp_path):
+    path = tmp_path / "NSW.csv"
+    directory = DirectoryFeed(tmp_path)
+    path.write_text("".join(snapshot_lines()))
+    directory.poll()
+    (first,) = directory.poll()
+
+    path.write_text("".join(snapshot_lines(labor=510)))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    directory.poll()
+    (second,) = directory.poll()
+    assert second.digest != first.digest
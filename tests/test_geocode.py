@@ -0,0 +1,75 @@
+import pytest
+from geopy.exc import GeocoderQueryError
+
+from polling_places.geocode import (
+    GeocodeCache,
+    GeocodeProvider,
+    geocode_addresses,
+    normalise_address,
+)
+
+
+class FakeProvider(GeocodeProvider):
+    name = "fake"
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def geocode(self, address):
+        self.calls.append(address)
+        if self.fail_on and self.fail_on in address:
+            raise GeocoderQueryError("bad request")
+        if address.startswith("nowhere"):
+            return None
+        return (-33.0, 151.0 + len(self.calls))
+
+
+def test_duplicates_are_looked_up_once_and_cached(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    provider = FakeProvider()
+    addresses = ["1 George St, Sydney", "1 george st ,sydney", "nowhere 5"]
+
+    first = geocode_addresses(addresses, provider, cache, rate=0)
+    assert first[0] == first[1]
+    assert first[2] is None
+    assert len(provider.calls) == 2
+
+    again = FakeProvider()
+    assert geocode_addresses(addresses, again, cache, rate=0) == first
+    assert again.calls == []
+
+
+def test_results_are_cached_before_the_batch_fails(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+
+    class Interrupted(FakeProvider):
+        def geocode(self, address):
+            if address.startswith("3"):
+                raise KeyboardInterrupt
+            return super().geocode(address)
+
+    addresses = ["1 George St", "2 George St", "3 George St"]
+    with pytest.raises(KeyboardInterrupt):
+        geocode_addresses(addresses, Interrupted(), cache, rate=0, workers=1)
+
+    cached = cache.get_many("fake", [normalise_address(a) for a in addresses])
+    assert set(cached) == {"1 george st", "2 george st"}
+
+
+def test_provider_error_loses_only_its_address(tmp_path):
+    cache = GeocodeCache(str(tmp_path / "cache.sqlite"))
+    addresses = ["1 George St", "bad address", "2 George St"]
+
+    coords = geocode_addresses(
+        addresses, FakeProvider(fail_on="bad"), cache, rate=0, workers=1
+    )
+
+    assert coords[1] is None
+    assert coords[0] is not None and coords[2] is not None
+    assert "bad address" not in cache.get_many("fake", ["bad address"])
+
+
+def test_provider_must_implement_geocode():
+    with pytest.raises(TypeError):
+        GeocodeProvider()
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from polling_places.matching import match_premises, normalise_name
+
+# Last-election booths: two in Sydney, a namesake in Grayndler about 6 km away
+LAST = pd.DataFrame(
+    {
+        "PremisesNm": [
+            "Ultimo Public School",
+            "St John's Anglican Church Hall",
+            "Ultimo Public School",
+        ],
+        "DivisionNm": ["Sydney", "Sydney", "Grayndler"],
+        "Latitude": [-33.8790, -33.8750, -33.9010],
+        "Longitude": [151.1980, 151.2150, 151.1450],
+    }
+)
+
+
+def expected(names, lats, longs, divisions=None):
+    return pd.DataFrame(
+        {
+            "PremisesName": names,
+            "DivName": divisions or ["Sydney"] * len(names),
+            "Lat": lats,
+            "Long": longs,
+        },
+        index=[f"booth{i}" for i in range(len(names))],
+    )
+
+
+def test_normalise_name_drops_punctuation_and_street_numbers():
+    assert normalise_name("3A St John's  Hall & Church") == "st johns hall and church"
+
+
+def test_identical_name_matches_the_nearest_namesake():
+    df = match_premises(
+        expected(["ULTIMO PUBLIC SCHOOL"], [-33.8791], [151.1982]), LAST
+    )
+    assert df.loc["booth0", "PremisesNm"] == "Ultimo Public School"
+    assert df.loc["booth0", "MatchScore"] == 1.0
+    assert df.loc["booth0", "MatchDistanceKm"] < 0.1
+
+
+def test_renamed_premises_on_the_same_site_matches():
+    df = match_premises(
+        expected(["St Johns Anglican Church"], [-33.8751], [151.2151]), LAST
+    )
+    assert df.loc["booth0", "PremisesNm"] == "St John's Anglican Church Hall"
+    assert 0.7 <= df.loc["booth0", "MatchScore"] < 1.0
+
+
+def test_similar_name_away_from_the_site_is_new_premises():
+    df = match_premises(
+        expected(["St Johns Anglican Church"], [-33.8650], [151.2150]), LAST
+    )
+    assert pd.isna(df.loc["booth0", "PremisesNm"])
+
+
+def test_unrelated_name_on_the_same_site_is_new_premises():
+    df = match_premises(expected(["Harris Street Hub"], [-33.8751], [151.2151]), LAST)
+    assert pd.isna(df.loc["booth0", "PremisesNm"])
+
+
+def test_missing_coordinates_still_match_by_name():
+    df = match_premises(
+        expected(["St John's Anglican Church Hall"], [np.nan], [np.nan]), LAST
+    )
+    assert df.loc["booth0", "PremisesNm"] == "St John's Anglican Church Hall"
+    assert pd.isna(df.loc["booth0", "MatchDistanceKm"])
+
+
+def test_divisions_restrict_candidates():
+    # Closer to the Grayndler namesake, but only Sydney booths are allowed
+    df_expected = expected(["Ultimo Public School"], [-33.9000], [151.1460])
+    df = match_premises(df_expected, LAST, divisions={"Sydney": ["Sydney"]})
+    assert df.loc["booth0", "PremisesNm"] == "Ultimo Public School"
+    assert df.loc["booth0", "MatchDistanceKm"] > 2
+    df = match_premises(df_expected, LAST, divisions={"Sydney": ["Wentworth"]})
+    assert pd.isna(df.loc["booth0", "PremisesNm"])
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from polling_places.polling_places import party_votes_table
+
+PARTY_TO_COLOUR = {"Labor": "red", "Liberal": "blue", "Other": "grey"}
+
+VOTES = pd.DataFrame(
+    {
+        "PremisesNm": ["Ultimo", "Ultimo", "Ultimo", "Pyrmont", "Pyrmont", "Glebe"],
+        "PartyNm": ["Labor", "Liberal", "Greens", "Labor", "Independent", np.nan],
+        "OrdinaryVotes": np.array([100, 80, 40, 50, 7, 3], dtype="int32"),
+    }
+)
+
+
+def test_matches_a_pivot_table():
+    df = party_votes_table(VOTES, PARTY_TO_COLOUR)
+    parties = VOTES["PartyNm"].where(VOTES["PartyNm"].isin(["Labor", "Liberal"]))
+    pivot = (
+        VOTES.assign(PartyNm=parties.fillna("Other"))
+        .pivot_table(
+            index="PremisesNm",
+            columns="PartyNm",
+            values="OrdinaryVotes",
+            aggfunc="sum",
+            fill_value=0,
+        )
+        .reindex(columns=["Labor", "Liberal", "Other"], fill_value=0)
+    )
+    pd.testing.assert_frame_equal(
+        df, pivot.astype("int32"), check_names=False, check_index_type=False
+    )
+
+
+def test_unmapped_and_missing_parties_are_other():
+    df = party_votes_table(VOTES, PARTY_TO_COLOUR)
+    assert list(df.columns) == ["Labor", "Liberal", "Other"]
+    assert df.loc["Ultimo"].tolist() == [100, 80, 40]
+    assert df.loc["Pyrmont"].tolist() == [50, 0, 7]
+    assert df.loc["Glebe"].tolist() == [0, 0, 3]
+    assert df.to_numpy().sum() == VOTES["OrdinaryVotes"].sum()
+
+
+def test_groups_by_several_columns():
+    df = party_votes_table(
+        VOTES.assign(DivisionNm="Sydney"),
+        PARTY_TO_COLOUR,
+        by=["DivisionNm", "PremisesNm"],
+    )
+    assert df.index.names == ["DivisionNm", "PremisesNm"]
+    assert df.loc[("Sydney", "Ultimo"), "Other"] == 40
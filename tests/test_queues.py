@@ -0,0 +1,40 @@
+import pandas as pd
+
+from polling_places.queues import simulate_queues
+
+
+def booths(ordinary_votes, ordinary_officers, declaration_votes=0, dec_officers=1):
+    return pd.DataFrame(
+        {
+            "OrdVoteEst": ordinary_votes,
+            "NoOrdIssuingOff": ordinary_officers,
+            "DecVoteEst": declaration_votes,
+            "NoOfDecIssuingOff": dec_officers,
+        }
+    )
+
+
+def test_booth_staffed_to_the_aec_ratio_is_not_understaffed():
+    # One officer per 400 ordinary and 125 declaration votes
+    df = simulate_queues(booths([390, 800], [1, 2], [120, 250], [1, 2]))
+    assert not df["Understaffed"].any()
+    assert (df["OrdPeakWaitMin"] < 10).all()
+
+
+def test_overloaded_booth_is_understaffed():
+    df = simulate_queues(booths([390, 900], [1, 1]))
+    assert df["Understaffed"].tolist() == [False, True]
+
+
+def test_slower_issuing_rate_lengthens_waits():
+    df = booths([390], [1])
+    default = simulate_queues(df)
+    slow = simulate_queues(df, ordinary_per_hour=40)
+    assert slow.loc[0, "OrdPeakWaitMin"] > default.loc[0, "OrdPeakWaitMin"]
+    assert slow.loc[0, "Understaffed"]
+
+
+def test_votes_without_officers_are_flagged():
+    df = simulate_queues(booths([100], [0]))
+    assert df.loc[0, "NoIssuingOfficers"]
+    assert pd.isna(df.loc[0, "OrdPeakWaitMin"])
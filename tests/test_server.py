@@ -0,0 +1,39 @@
+from polling_places.server import MapCache, affected_divisions
+
+NEIGHBOURS = {
+    "Sydney": ["Sydney", "Grayndler", "Wentworth"],
+    "Grayndler": ["Grayndler", "Sydney", "Reid"],
+    "Wentworth": ["Wentworth", "Sydney", "Kingsford Smith"],
+    "Reid": ["Reid", "Grayndler", "Bennelong"],
+    "Bennelong": ["Bennelong", "Reid"],
+}
+
+
+def test_neighbours_of_a_changed_division_are_affected():
+    assert affected_divisions(["Grayndler"], NEIGHBOURS) == [
+        "Grayndler",
+        "Reid",
+        "Sydney",
+    ]
+
+
+def test_divisions_listing_a_changed_division_are_affected():
+    # Kingsford Smith is not served but is Wentworth's neighbour
+    assert affected_divisions(["Kingsford Smith"], NEIGHBOURS) == [
+        "Kingsford Smith",
+        "Wentworth",
+    ]
+
+
+def test_unchanged_gazette_affects_nothing():
+    assert affected_divisions([], NEIGHBOURS) == []
+
+
+def test_invalidate_drops_only_the_given_divisions():
+    cache = MapCache(max_bytes=1000)
+    for division in NEIGHBOURS:
+        cache.put((division, "markers"), b"html")
+    cache.invalidate(affected_divisions(["Bennelong"], NEIGHBOURS))
+    assert cache.get(("Bennelong", "markers")) is None
+    assert cache.get(("Reid", "markers")) is None
+    assert cache.get(("Sydney", "markers")) == b"html"
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from polling_places.transfer import transfer_votes, unmatched_polling_places
+
+PARTIES = {"Labor": "red", "Liberal": "blue", "Other": "grey"}
+
+
+def last_booths():
+    return pd.DataFrame(
+        {
+            "PollingPlaceID": [1, 2, 3, 4],
+            "DivisionNm": ["Sydney", "Sydney", "Grayndler", "Cowper"],
+            "PremisesNm": [
+                "Town Hall",
+                "Glebe Public School",
+                "Glebe Public School",
+                "Town Hall",
+            ],
+            "PollingPlaceNm": ["Sydney", "Glebe", "Glebe North", "Coffs"],
+            "Latitude": [-33.8731, -33.8800, -33.8790, -30.2987],
+            "Longitude": [151.2064, 151.1850, 151.1860, 153.1182],
+        }
+    )
+
+
+def expected_booths():
+    return pd.DataFrame(
+        {
+            "DivName": ["Sydney", "Sydney"],
+            "PremisesName": ["Sydney Town Hall", "Ultimo Community Centre"],
+            "PremisesNm": ["Town Hall", np.nan],
+            "Lat": [-33.8731, -33.8790],
+            "Long": [151.2064, 151.1990],
+        },
+        index=[10, 11],
+    )
+
+
+def votes():
+    return pd.DataFrame(
+        {
+            "PollingPlaceID": [1, 1, 2, 2, 3, 4],
+            "PartyNm": ["Labor", "Liberal", "Labor", "Greens", "Liberal", "Labor"],
+            "OrdinaryVotes": [100, 50, 30, 20, 40, 70],
+        }
+    )
+
+
+def test_same_name_in_a_distant_division_is_not_a_match():
+    neighbours = {"Sydney": ["Sydney", "Grayndler"]}
+    unmatched = unmatched_polling_places(last_booths(), expected_booths(), neighbours)
+    # Town Hall is matched in Sydney but the Cowper booth of that name is not
+    assert unmatched["PollingPlaceID"].tolist() == [2, 3, 4]
+
+
+def test_transfer_conserves_votes_and_skips_matched_booths():
+    df_expected = expected_booths()
+    df_last = unmatched_polling_places(
+        last_booths(), df_expected, {"Sydney": ["Sydney", "Grayndler"]}
+    )
+    df_last = df_last[df_last["DivisionNm"] != "Cowper"]
+    recipients = df_expected[df_expected["PremisesNm"].isna()]
+
+    df = transfer_votes(recipients, df_last, votes(), PARTIES)
+
+    assert df.index.tolist() == [11]
+    assert df.loc[11].to_dict() == pytest.approx(
+        {"Labor": 30, "Liberal": 40, "Other": 20}
+    )
+
+
+def test_booths_beyond_the_transfer_distance_are_not_transferred():
+    df = transfer_votes(
+        expected_booths(),
+        last_booths().iloc[[3]],
+        votes(),
+        PARTIES,
+        max_distance_km=10,
+    )
+    assert df.to_numpy().sum() == 0